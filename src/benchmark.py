@@ -0,0 +1,436 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from multiprocessing import Process, Queue
+from config import TABLE_COUNTS, GROUP_SIZE_WEIGHTS, PROTOCOL
+from tables import TableStore
+from protocol import (
+    REQUEST_SEAT, CUSTOMER_DONE, SEATED, encode_request, decode_requests, customer_fifo_path, request_shard, table_shard,
+)
+from customer import customer_process
+from gui import FrameCoalescer
+from supervisor import CustomerSupervisor, customer_context
+from harness import quiet_stdout, running_manager, BenchClients
+
+"""
+Moduł benchmark:
+- pomiary wydajności poszczególnych elementów symulacji
+- bench_seating() – koszt sadzenia/zwalniania w TableStore w zależności od liczby stolików
+- bench_protocol_parse() – przepustowość dekodowania bufora wiadomości (text vs binary)
+- bench_manager_throughput() – ile wiadomości na sekundę obsługuje prawdziwy manager_process przez SERVER_FIFO
+- bench_manager_shards() – to samo dla 1, 2, 4 shardów managera (MANAGER_SHARDS); skalowanie zależy od liczby rdzeni
+- bench_seat_latency() – czas REQUEST_SEAT -> SEATED/REJECTED (percentyle) dla jednego klienta
+- bench_customer_spawn() – ile procesów customer_process na sekundę main() jest w stanie uruchomić i ile pamięci
+  zajmuje jeden klient, przy starcie przez fork z main i z forkserwera (CUSTOMER_START_METHOD)
+- bench_gui_drain() – ile komunikatów na sekundę GUI zdejmuje z gui_queue (przez FrameCoalescer)
+
+Procesy (manager, klienci) działają w katalogu tymczasowym (harness.py), więc benchmark nie rusza fifo/ ani pizzeria_log.txt.
+Wyniki można zapisać do JSON (--json), zapisać jako bazę (--save) i porównać z bazą (--compare):
+metryka gorsza od bazy o więcej niż --tolerance jest oznaczana jako regresja (kod wyjścia 1).
+
+Uruchamianie: python benchmark.py --save          (nowa baza)
+              python benchmark.py --compare       (porównanie z bazą)
+"""
+
+BASELINE_FILE = "benchmark_baseline.json"
+BENCHMARKS = ("seating", "protocol_parse", "manager_throughput", "manager_shards", "seat_latency", "customer_spawn", "gui_drain")
+ID_FIELDS = ("tables", "protocol", "shards", "start_method") # pola, które identyfikują wiersz wyniku, a nie są pomiarem
+
+
+def scaled_table_counts(scale: int) -> dict:
+    # TABLE_COUNTS pomnożone przez scale (tyle samo proporcji stolików, tylko więcej)
+    return {size: count * scale for size, count in TABLE_COUNTS.items()}
+
+
+def bench_seating(scales=(1, 10, 100, 1000, 10000), operations=100_000, seed=0):
+    """
+    Dla każdego scale: zapełniamy sale do połowy, a potem mierzymy średni czas
+    pary seat()+release() na losowych grupach. Wynik: lista słowników z ns na operację.
+    """
+    results = []
+    for scale in scales:
+        rng = random.Random(seed)
+        store = TableStore(scaled_table_counts(scale))
+        total_seats = sum(size * count for size, count in store.table_counts.items())
+
+        # wypełniamy sale do połowy, żeby kubełki nie były trywialne
+        seated = []
+        used = 0
+        while used < total_seats // 2:
+            group_size = rng.choice((1, 2, 3))
+            tbl = store.seat(group_size)
+            if tbl is None:
+                break
+            seated.append((tbl['table_id'], group_size))
+            used += group_size
+
+        groups = [rng.choice((1, 2, 3)) for _ in range(operations)]
+        start = time.perf_counter()
+        for group_size in groups:
+            tbl = store.seat(group_size)
+            if tbl is not None:
+                seated.append((tbl['table_id'], group_size))
+            # zwalniamy losową grupę, żeby obłożenie się nie zmieniało
+            if seated:
+                i = rng.randrange(len(seated))
+                seated[i], seated[-1] = seated[-1], seated[i]
+                table_id, size = seated.pop()
+                store.release(table_id, size)
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            'tables': len(store),
+            'ns_per_op': elapsed / operations * 1e9,
+        })
+    return results
+
+
+def bench_protocol_parse(messages=200_000, chunk_size=65536, seed=0):
+    """
+    Dekodujemy strumień wiadomości tak jak manager: kawałkami po chunk_size bajtów
+    (jak z os.read), z przeniesieniem niepełnej końcówki. Wynik: wiadomości/s dla każdego protokołu.
+    """
+    rng = random.Random(seed)
+    msgs = []
+    for customer_id in range(messages):
+        msg_type = REQUEST_SEAT if customer_id % 2 == 0 else CUSTOMER_DONE
+        msgs.append((msg_type, rng.choice((1, 2, 3)), customer_id, rng.randint(1, 8)))
+
+    results = []
+    for protocol in ("text", "binary"):
+        stream = b"".join(
+            encode_request(t, g, c, tb, customer_fifo_path(c), protocol=protocol) for t, g, c, tb in msgs
+        )
+
+        start = time.perf_counter()
+        decoded = 0
+        buffer = b""
+        for offset in range(0, len(stream), chunk_size):
+            buffer += stream[offset:offset + chunk_size]
+            batch, buffer = decode_requests(buffer, protocol=protocol)
+            decoded += len(batch)
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            'protocol': protocol,
+            'bytes_per_msg': len(stream) / messages,
+            'msgs_per_sec': decoded / elapsed,
+        })
+    return results
+
+
+def random_group_size(rng: random.Random) -> int:
+    return rng.choices(list(GROUP_SIZE_WEIGHTS), weights=list(GROUP_SIZE_WEIGHTS.values()))[0]
+
+
+def bench_manager_throughput(messages=20_000, clients=64, seed=0, shards=1):
+    """
+    Okno 'clients' klientów: każdy wysyła REQUEST_SEAT, a posadzeni od razu CUSTOMER_DONE.
+    Liczymy wszystkie wiadomości, które manager obsłużył, do ostatniej odpowiedzi.
+    Przy shards > 1 prośby idą do request_shard(customer_id), a CUSTOMER_DONE do shardu ze stolikiem - jak u klientów.
+    """
+    rng = random.Random(seed)
+    with running_manager(shards) as server_fds:
+        bench_clients = BenchClients(clients)
+        try:
+            handled = 0
+            start = time.perf_counter()
+            while handled < messages:
+                batches = [[] for _ in server_fds]
+                for customer_id in range(clients):
+                    batches[request_shard(customer_id, shards)].append(
+                        encode_request(REQUEST_SEAT, random_group_size(rng), customer_id, 0, customer_fifo_path(customer_id)))
+                for server_fd, batch in zip(server_fds, batches):
+                    os.write(server_fd, b"".join(batch))
+                done = [[] for _ in server_fds]
+                for customer_id, (msg_type, group_size, _, table_id) in bench_clients.replies(clients):
+                    if msg_type == SEATED:
+                        done[table_shard(table_id, shards)].append(encode_request(
+                            CUSTOMER_DONE, group_size, customer_id, table_id, customer_fifo_path(customer_id)))
+                for server_fd, batch in zip(server_fds, done):
+                    if batch:
+                        os.write(server_fd, b"".join(batch))
+                handled += clients + sum(len(batch) for batch in done)
+            # CUSTOMER_DONE nie ma odpowiedzi: dodatkowe REQUEST_SEAT do każdego shardu domyka pomiar (fifo zachowuje kolejność)
+            for shard, server_fd in enumerate(server_fds):
+                os.write(server_fd, encode_request(REQUEST_SEAT, 1, shard, 0, customer_fifo_path(shard)))
+            bench_clients.replies(len(server_fds))
+            elapsed = time.perf_counter() - start
+        finally:
+            bench_clients.close()
+
+    return {'messages': handled, 'msgs_per_sec': handled / elapsed}
+
+
+def bench_manager_shards(shard_counts=(1, 2, 4), messages=20_000, clients=64):
+    """bench_manager_throughput dla kolejnych liczb shardów; przyrost jest ograniczony liczbą rdzeni (os.cpu_count())."""
+    return [dict(bench_manager_throughput(messages, clients, shards=shards), shards=shards) for shards in shard_counts]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_seat_latency(requests=2000, seed=0):
+    """Jeden klient naraz: czas od zapisu REQUEST_SEAT do odebrania odpowiedzi (ms)."""
+    rng = random.Random(seed)
+    latencies = []
+    with running_manager() as (server_fd,):
+        bench_clients = BenchClients(1)
+        fifo = customer_fifo_path(0)
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                os.write(server_fd, encode_request(REQUEST_SEAT, random_group_size(rng), 0, 0, fifo))
+                (_, (msg_type, group_size, _, table_id)), = bench_clients.replies(1)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if msg_type == SEATED:
+                    os.write(server_fd, encode_request(CUSTOMER_DONE, group_size, 0, table_id, fifo))
+        finally:
+            bench_clients.close()
+
+    latencies.sort()
+    return {
+        'p50_ms': percentile(latencies, 0.50),
+        'p90_ms': percentile(latencies, 0.90),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1],
+    }
+
+
+def customer_memory_kb(pid: int):
+    # (Rss, prywatne = Private_Clean + Private_Dirty) procesu w kB z /proc (Linux); None, gdy się nie da
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = dict(line.split()[:2] for line in f if line.endswith("kB\n"))
+    except OSError:
+        return None
+    return int(fields['Rss:']), int(fields['Private_Clean:']) + int(fields['Private_Dirty:'])
+
+
+def customer_spawn_run(start_method: str, customers: int, sample: int, seed: int) -> dict:
+    """
+    Jeden pomiar bench_customer_spawn dla danego CUSTOMER_START_METHOD:
+    - pamięć: 'sample' grup jednoosobowych siedzi przy stolikach (MAX_EAT_TIME), w tym czasie czytamy /proc
+    - przepustowość: klienci z ustawionym close_event tylko proszą o stolik i wychodzą
+    """
+    rng = random.Random(seed)
+    context = customer_context(start_method)
+    fire_event, close_event = context.Event(), context.Event()
+    with running_manager():
+        with quiet_stdout():
+            seated = CustomerSupervisor(sample, context=context)
+            for customer_id in range(sample):
+                seated.spawn(customer_process, (fire_event, close_event, 1, customer_id), f"Customer-{customer_id}", customer_id)
+            deadline = time.monotonic() + 10
+            while seated.spawn_ready.count < sample and time.monotonic() < deadline:
+                seated.wait(0.1)
+            memory = [m for m in (customer_memory_kb(p.pid) for p, _ in seated.procs.values()) if m is not None]
+            close_event.set()
+            seated.join_all()
+            seated.close()
+
+            supervisor = CustomerSupervisor(customers, context=context)
+            start = time.perf_counter()
+            for customer_id in range(sample, sample + customers):
+                supervisor.spawn(customer_process, (fire_event, close_event, random_group_size(rng), customer_id),
+                                 f"Customer-{customer_id}", customer_id)
+            spawned = time.perf_counter() - start
+            supervisor.join_all()
+            finished = time.perf_counter() - start
+            supervisor.close()
+
+    return {
+        'start_method': start_method,
+        'spawns_per_sec': customers / spawned,
+        'lifecycles_per_sec': customers / finished,
+        'ready_p50_ms': supervisor.spawn_ready.percentile(0.5) * 1000,
+        'rss_kb': sum(rss for rss, _ in memory) / len(memory) if memory else 0.0,
+        'private_kb': sum(private for _, private in memory) / len(memory) if memory else 0.0,
+    }
+
+
+def bench_customer_spawn(customers=200, start_methods=("fork", "forkserver"), sample=8, seed=0):
+    """
+    Uruchamiamy procesy customer_process tak jak main() (CustomerSupervisor), bez odstępów między nimi,
+    dla każdego sposobu startu. spawns_per_sec liczy same start(), lifecycles_per_sec - aż wszyscy się zakończą,
+    ready_p50_ms to start() -> wysłana prośba o stolik; rss_kb / private_kb - pamięć jednego klienta
+    (prywatne strony to jego rzeczywisty koszt, reszta Rss jest współdzielona z procesem, z którego powstał).
+    Każdy sposób w osobnym interpreterze (forkserwer i jego preload są jedne na proces), uruchomionym przez -c,
+    żeby dziecko forkserwera nie wykonywało ponownie benchmark.py jako modułu głównego.
+    """
+    rows = []
+    for start_method in start_methods:
+        code = (f"import json, benchmark; "
+                f"print(json.dumps(benchmark.customer_spawn_run({start_method!r}, {customers}, {sample}, {seed})))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        rows.append(json.loads(result.stdout.splitlines()[-1]))
+    return rows
+
+
+def gui_producer(gui_queue: Queue, messages: int, tables: int):
+    # jak manager bez board: aktualizacje stolików przeplatane z profitem
+    profit = 0
+    for i in range(messages):
+        if i % 2:
+            profit += 10
+            gui_queue.put(("PROFIT_UPDATE", profit))
+        else:
+            gui_queue.put(("TABLE_UPDATE", (i % tables + 1, i % 4, 4)))
+
+
+def bench_gui_drain(messages=100_000, frame_messages=256):
+    """
+    Osobny proces wrzuca komunikaty do gui_queue, a my zdejmujemy je jak poll_queue w GUI:
+    FrameCoalescer.apply() dla każdego komunikatu i take_changes() co frame_messages komunikatów.
+    """
+    gui_queue = Queue()
+    tables = sum(TABLE_COUNTS.values())
+    producer = Process(target=gui_producer, args=(gui_queue, messages, tables))
+    producer.start()
+
+    coalescer = FrameCoalescer()
+    msg_type, data = gui_queue.get() # liczymy od pierwszego komunikatu, bez startu procesu
+    start = time.perf_counter()
+    coalescer.apply(msg_type, data)
+    for i in range(1, messages):
+        msg_type, data = gui_queue.get()
+        coalescer.apply(msg_type, data)
+        if i % frame_messages == 0:
+            coalescer.take_changes()
+    coalescer.take_changes()
+    elapsed = time.perf_counter() - start
+    producer.join()
+
+    return {'msgs_per_sec': (messages - 1) / elapsed}
+
+
+def run_benchmarks(names=BENCHMARKS, operations=100_000) -> dict:
+    runners = {
+        'seating': lambda: bench_seating(operations=operations),
+        'protocol_parse': bench_protocol_parse,
+        'manager_throughput': bench_manager_throughput,
+        'manager_shards': bench_manager_shards,
+        'seat_latency': bench_seat_latency,
+        'customer_spawn': bench_customer_spawn,
+        'gui_drain': bench_gui_drain,
+    }
+    results = {}
+    for name in names:
+        print(f"[Benchmark] {name}...", flush=True)
+        results[name] = runners[name]()
+    return results
+
+
+def flatten_metrics(results: dict) -> dict:
+    # {"seating[tables=8].ns_per_op": ..., "manager_throughput.msgs_per_sec": ...}
+    flat = {}
+    for name, result in results.items():
+        rows = result if isinstance(result, list) else [result]
+        for row in rows:
+            ids = ",".join(f"{field}={row[field]}" for field in ID_FIELDS if field in row)
+            prefix = f"{name}[{ids}]" if ids else name
+            for field, value in row.items():
+                if field not in ID_FIELDS:
+                    flat[f"{prefix}.{field}"] = value
+    return flat
+
+
+def metric_direction(metric: str) -> int:
+    # 1 - im więcej tym lepiej, -1 - im mniej tym lepiej, 0 - tylko informacyjnie (nie porównujemy)
+    if metric.endswith("_per_sec"):
+        return 1
+    if metric.endswith("_ms") or metric.endswith("ns_per_op") or metric.endswith("_kb"):
+        return -1
+    return 0
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float):
+    """Zwraca listę (metryka, baza, teraz, zmiana względna, czy regresja) dla metryk obecnych w obu wynikach."""
+    now, base = flatten_metrics(current), flatten_metrics(baseline)
+    rows = []
+    for metric, old in base.items():
+        direction = metric_direction(metric)
+        if direction == 0 or metric not in now or not old:
+            continue
+        change = (now[metric] - old) / old
+        rows.append((metric, old, now[metric], change, change * direction < -tolerance))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarki pizzerii")
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--only", action="append", choices=BENCHMARKS, help="tylko wybrane benchmarki (można podać wiele razy)")
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="plik z bazą do --save / --compare")
+    parser.add_argument("--save", action="store_true", help="zapisz wyniki jako bazę")
+    parser.add_argument("--compare", action="store_true", help="porównaj wyniki z bazą")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="dopuszczalne pogorszenie względem bazy (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only or BENCHMARKS, args.operations)
+
+    print("--- seat_customer_group / TableStore ---")
+    for row in results.get('seating', []):
+        print(f"  stolików={row['tables']:>7}  {row['ns_per_op']:8.0f} ns/operację")
+
+    print("--- dekodowanie wiadomości managera ---")
+    for row in results.get('protocol_parse', []):
+        print(f"  {row['protocol']:>6}  {row['bytes_per_msg']:5.1f} B/wiadomość  {row['msgs_per_sec']:12.0f} wiadomości/s")
+
+    if 'manager_throughput' in results:
+        print("--- manager przez SERVER_FIFO ---")
+        print(f"  {results['manager_throughput']['msgs_per_sec']:12.0f} wiadomości/s")
+    if 'manager_shards' in results:
+        print(f"--- shardy managera (rdzeni: {os.cpu_count()}) ---")
+        for row in results['manager_shards']:
+            print(f"  shardów={row['shards']}  {row['msgs_per_sec']:12.0f} wiadomości/s")
+    if 'seat_latency' in results:
+        r = results['seat_latency']
+        print("--- REQUEST_SEAT -> odpowiedź ---")
+        print(f"  p50={r['p50_ms']:.3f} ms  p90={r['p90_ms']:.3f} ms  p99={r['p99_ms']:.3f} ms  max={r['max_ms']:.3f} ms")
+    if 'customer_spawn' in results:
+        print("--- uruchamianie klientów ---")
+        for r in results['customer_spawn']:
+            print(f"  {r['start_method']:>10}  {r['spawns_per_sec']:8.0f} start()/s  {r['lifecycles_per_sec']:8.0f} pełnych klientów/s  "
+                  f"gotowy p50={r['ready_p50_ms']:.1f} ms  Rss={r['rss_kb']:.0f} kB  prywatne={r['private_kb']:.0f} kB")
+    if 'gui_drain' in results:
+        print("--- opróżnianie gui_queue ---")
+        print(f"  {results['gui_drain']['msgs_per_sec']:12.0f} komunikatów/s")
+
+    document = {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'protocol': PROTOCOL,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    regressions = 0
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"--- porównanie z {args.baseline} ({baseline.get('created')}) ---")
+        for metric, old, new, change, regression in compare_results(results, baseline['results'], args.tolerance):
+            flag = "  REGRESJA" if regression else ""
+            print(f"  {metric:<45} {old:14.3f} -> {new:14.3f}  {change * 100:+7.1f}%{flag}")
+            regressions += regression
+        print(f"[Benchmark] Regresji: {regressions}")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"[Benchmark] Zapisano bazę do {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,141 @@
+import struct
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+"""
+Moduł board – tablica zajętości stolików w pamięci współdzielonej (multiprocessing.shared_memory):
+- manager zapisuje stan stolików i profit w miejscu, bez kolejki i bez pickle
+- dowolna liczba czytelników (GUI, metryki, testy) robi snapshot() kiedy chce
+
+Układ pamięci:
+    nagłówek HEADER: generation, profit, liczba wierszy, flagi (FLAG_FIRE)
+    wiersz ROW na stolik (indeks = table_id - 1): used_seats, capacity, group_size (0 = brak), state
+
+Pożar to sama flaga FLAG_FIRE (jeden zapis zamiast przepisywania wszystkich wierszy): snapshot() pokazuje wtedy
+wszystkie stoliki tej tablicy jako TABLE_FIRE, a po otwarciu manager zapisuje tylko stoliki, które się zmieniły.
+Usunięty stolik to wiersz TABLE_ABSENT, stolik zamknięty (nie przyjmuje nowych grup) - TABLE_CLOSED.
+
+Jeden pisarz, spójność jak w seqlocku: pisarz ustawia nieparzyste generation na czas zapisu,
+a czytelnik ponawia odczyt, jeśli generation było nieparzyste albo zmieniło się w trakcie kopiowania.
+Przy kilku shardach managera (MANAGER_SHARDS) każdy shard pisze do własnej tablicy,
+a czytelnik widzi je razem przez ShardedBoard.
+"""
+
+HEADER = struct.Struct("<QqII")
+ROW = struct.Struct("<iiii")
+
+TABLE_ABSENT = 0 # wiersz nieużywany
+TABLE_OPEN = 1
+TABLE_FIRE = 2
+TABLE_CLOSED = 3
+
+FLAG_FIRE = 1
+
+
+class TableBoard:
+    def __init__(self, shm: shared_memory.SharedMemory, max_tables: int):
+        self.shm = shm
+        self.max_tables = max_tables
+
+    @classmethod
+    def create(cls, max_tables: int) -> "TableBoard":
+        shm = shared_memory.SharedMemory(create=True, size=HEADER.size + ROW.size * max_tables)
+        shm.buf[:len(shm.buf)] = bytes(len(shm.buf))
+        board = cls(shm, max_tables)
+        HEADER.pack_into(shm.buf, 0, 0, 0, max_tables, 0)
+        return board
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # --- pisarz (manager) ---
+
+    @contextmanager
+    def write(self):
+        """Wszystkie zmiany w bloku with są widoczne dla czytelników naraz."""
+        generation = self._generation()
+        self._set_generation(generation + 1)
+        try:
+            yield self
+        finally:
+            self._set_generation(generation + 2)
+
+    def set_table(self, table_id: int, used_seats: int, capacity: int, group_size, state: int = TABLE_OPEN):
+        ROW.pack_into(self.shm.buf, HEADER.size + ROW.size * (table_id - 1),
+                      used_seats, capacity, group_size or 0, state)
+
+    def set_profit(self, profit: int):
+        struct.pack_into("<q", self.shm.buf, 8, profit)
+
+    def set_fire(self, on_fire: bool):
+        flags = FLAG_FIRE if on_fire else 0
+        struct.pack_into("<I", self.shm.buf, 20, flags)
+
+    # --- czytelnicy ---
+
+    def snapshot(self) -> dict:
+        """
+        Spójna kopia tablicy:
+        {'generation', 'profit', 'fire', 'tables': {table_id: (used_seats, capacity, group_size, state)}}
+        """
+        buf = self.shm.buf
+        while True:
+            before = self._generation()
+            if before % 2:
+                continue # pisarz w trakcie zapisu
+            data = bytes(buf)
+            if self._generation() == before:
+                break
+
+        generation, profit, rows, flags = HEADER.unpack_from(data, 0)
+        tables = {}
+        for i, row in enumerate(ROW.iter_unpack(data[HEADER.size:HEADER.size + ROW.size * rows])):
+            if row[3] != TABLE_ABSENT:
+                tables[i + 1] = row if not flags & FLAG_FIRE else row[:3] + (TABLE_FIRE,)
+        return {
+            'generation': generation,
+            'profit': profit,
+            'fire': bool(flags & FLAG_FIRE),
+            'tables': tables,
+        }
+
+    def generation(self) -> int:
+        # czytelnik może tanio sprawdzić, czy coś się zmieniło od ostatniego snapshotu
+        return self._generation()
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+    def _generation(self) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+    def _set_generation(self, generation: int):
+        struct.pack_into("<Q", self.shm.buf, 0, generation)
+
+
+class ShardedBoard:
+    """
+    Tablice wszystkich shardów widziane jak jedna (dla GUI): profit sumowany, stoliki połączone,
+    pożar jeśli którykolwiek shard go zgłasza. Każdy shard ma swój seqlock, więc pisarze sobie nie przeszkadzają.
+    """
+
+    def __init__(self, boards):
+        self.boards = list(boards)
+
+    def snapshot(self) -> dict:
+        merged = {'generation': 0, 'profit': 0, 'fire': False, 'tables': {}}
+        for board in self.boards:
+            snap = board.snapshot()
+            merged['generation'] += snap['generation']
+            merged['profit'] += snap['profit']
+            merged['fire'] = merged['fire'] or snap['fire']
+            merged['tables'].update(snap['tables'])
+        return merged
+
+    def generation(self) -> int:
+        # generation każdej tablicy tylko rośnie, więc suma zmienia się przy każdym zapisie
+        return sum(board.generation() for board in self.boards)
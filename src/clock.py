@@ -0,0 +1,52 @@
+import os
+import time
+from config import TIME_SCALE
+
+"""
+Moduł clock – czas modelu pizzerii niezależny od zegara ściennego:
+- wszystkie czasy modelu z config.py (MAX_EAT_TIME, FIRE_INTERVAL, CLOSURE_DURATION_AFTER_FIRE,
+  CUSTOMER_ARRIVAL_INTERVAL, WAITLIST_MAX_WAIT) są w sekundach symulacji; Clock.real() zamienia je na sekundy
+  rzeczywiste, dzieląc przez skalę (TIME_SCALE = 50 - cykl pożar / otwarcie trwa ok. sekundy zamiast 40)
+- skala jest wspólna dla wszystkich procesów: get_clock() czyta zmienną środowiskową PIZZERIA_TIME_SCALE
+  (dziedziczą ją procesy z fork, forkserwera i subprocess), a bez niej bierze TIME_SCALE z config.py
+- czasy infrastruktury (odpytywanie fifo, ponawianie odpowiedzi, metryki opóźnień, SLO ewakuacji) zostają rzeczywiste
+
+Uruchamianie przyspieszone: PIZZERIA_TIME_SCALE=50 python main.py
+"""
+
+TIME_SCALE_ENV = "PIZZERIA_TIME_SCALE"
+
+
+class Clock:
+    def __init__(self, scale: float = TIME_SCALE):
+        if scale <= 0:
+            raise ValueError(f"Skala czasu musi być dodatnia: {scale!r}")
+        self.scale = scale
+
+    def real(self, seconds: float) -> float:
+        """Sekundy symulacji -> sekundy rzeczywiste."""
+        return seconds / self.scale
+
+    def sleep(self, seconds: float):
+        time.sleep(self.real(seconds))
+
+    def now(self) -> float:
+        """Czas symulacji w sekundach (wspólny dla procesów, ma sens tylko jako różnica)."""
+        return time.monotonic() * self.scale
+
+
+_clock = None
+
+def get_clock() -> Clock:
+    global _clock
+    if _clock is None:
+        _clock = Clock(float(os.environ.get(TIME_SCALE_ENV, TIME_SCALE)))
+    return _clock
+
+
+def set_time_scale(scale: float) -> Clock:
+    """Skala dla bieżącego procesu i wszystkich uruchomionych po tym wywołaniu (forkserwer musi startować później)."""
+    global _clock
+    _clock = Clock(scale)
+    os.environ[TIME_SCALE_ENV] = str(scale)
+    return _clock
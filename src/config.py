@@ -12,8 +12,13 @@ SHUTDOWN_SIGNAL = signal.SIGINT
 
 # fifo będą w osobnym folderze
 SERVER_FIFO = "fifo/manager_fifo"
+CONTROL_FIFO = "fifo/manager_control" # polecenia do działającego managera (control.py): dodawanie / usuwanie stolików
 CUSTOMER_FIFO_DIR = "fifo/"
 
+# Liczba procesów managera (shardów); każdy ma swoje fifo (SERVER_FIFO, SERVER_FIFO-1, ...) i co K-ty stolik,
+# grupa bez miejsca przechodzi do następnego shardu. 1 = jeden manager jak dawniej
+MANAGER_SHARDS = 1
+
 # Stoliki: X1, X2, X3, X4
 TABLE_COUNTS = {
     1: 2,  # X1
@@ -26,7 +31,95 @@ TABLE_COUNTS = {
 MIN_GROUP_SIZE = 1  
 MAX_GROUP_SIZE = 3  
 CLOSURE_DURATION_AFTER_FIRE = 5 # na ile sekund pizzeria się zamyka po pożarze
+EVACUATION_SLO_SECONDS = 0.5 # od sygnału pożaru do wyjścia ostatniego klienta; dłużej = naruszenie SLO (metryka managera)
+FIRE_INTERVAL = (30, 45) # pożar co 30..45 sekund (losowo)
+# Przyspieszenie czasu modelu (clock.py): jedzenie, pożary, zamknięcie, przyjścia i lista oczekujących trwają
+# TIME_SCALE razy krócej; zmienna środowiskowa PIZZERIA_TIME_SCALE nadpisuje tę wartość (np. 50 w testach)
+TIME_SCALE = 1.0
+
+# Jak często pojawiają się grupy danego rozmiaru (by częściej się pojawiały mniejsze grupy)
+GROUP_SIZE_WEIGHTS = {1: 0.4, 2: 0.4, 3: 0.2}
+
+PROFIT_PER_PERSON = (10, 25) # ile płaci jedna osoba (losowo z przedziału)
 
 MAX_CONCURRENT_CUSTOMERS = 30 # limity aktywnych na raz klientów
+CUSTOMER_START_METHOD = "forkserver" # klienci z małego procesu-serwera (supervisor.py); "fork" - kopia main jak dawniej
+CUSTOMER_REAP_POLL = 0.1 # main czeka na koniec klienta najwyżej tyle sekund naraz, potem sprawdza czy symulacja trwa
+
+MAX_EAT_TIME = 1
+
+# Manager czeka na FIFO w selectorze najwyżej tyle sekund (potem sprawdza fire/close_event)
+MANAGER_POLL_TIMEOUT = 0.1
+FIFO_READ_CHUNK = 65536 # ile bajtów czytamy z FIFO na raz
+
+# Nowy klient co CUSTOMER_ARRIVAL_INTERVAL sekund (losowo z przedziału)
+CUSTOMER_ARRIVAL_INTERVAL = (0.5, 1)
+
+# Pula procesów-klientów: 0 = jak dawniej osobny proces dla każdej grupy,
+# N > 0 = N procesów roboczych, z których każdy obsługuje wiele grup naraz
+CUSTOMER_POOL_WORKERS = 0
+CUSTOMER_POOL_MAX_GROUPS = 20000 # limit aktywnych na raz grup w trybie puli
+
+# Co ile sekund wspólny scheduler timerów sprawdza eventy pożaru / zamknięcia
+TIMER_EVENT_POLL = 0.01
+
+# Format wiadomości klient <-> manager: "binary" (rekordy stałej długości) albo "text" (linie, do debugowania)
+PROTOCOL = "binary"
+
+# Skrzynka nadawcza managera (outbox.py)
+OUTBOX_RETRY_INTERVAL = 0.005 # co ile ponawiamy otwarcie fifo klienta, który jeszcze go nie otworzył
+OUTBOX_PENDING_TIMEOUT = 5 # po tylu sekundach bez odbioru odpowiedzi klient uznawany jest za martwego
+OUTBOX_IDLE_TIMEOUT = 30 # po tylu sekundach bezczynności zamykamy deskryptor do fifo klienta
+OUTBOX_EXPIRY_SCAN_INTERVAL = 0.5
+OUTBOX_MAX_CHANNELS = 4096 # maksymalnie tyle otwartych deskryptorów do klientów
+
+# Stan stolików dla GUI w pamięci współdzielonej (board.py) zamiast komunikatów w gui_queue
+USE_SHARED_BOARD = True
+BOARD_MAX_TABLES = 1024 # tyle wierszy rezerwujemy w tablicy (co najmniej tyle ile stolików)
+
+# GUI: budżet czasu jednej klatki i zakres odstępu między klatkami (dopasowywany do obciążenia)
+GUI_FRAME_BUDGET_MS = 16
+GUI_POLL_MIN_MS = 16
+GUI_POLL_MAX_MS = 200
+
+# Metryki managera (metrics.py) w formacie Prometheusa pod http://METRICS_HOST:METRICS_PORT/metrics, 0 = wyłączone
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+SUPERVISOR_METRICS_PORT = 9463 # metryki procesów klientów w main (supervisor.py), 0 = wyłączone
+
+# Logi procesów (log.py): próg poziomu ("DEBUG" = każda wiadomość jak dawniej, "INFO" = tylko najważniejsze zdarzenia),
+# plik (None = stdout), co ile sekund wątek zapisujący wypisuje zebrane wpisy, rozmiar bufora wpisów na proces,
+# ile sekund najwyżej czekamy, aż pełny nieblokujący stdout znów przyjmie dane (potem paczka przepada)
+LOG_LEVEL = "INFO"
+LOG_FILE = None
+LOG_FLUSH_INTERVAL = 0.05
+LOG_RING_SIZE = 65536
+LOG_WRITE_TIMEOUT = 1.0
+
+# Przebieg symulacji w czasie (timeline.py): plik JSONL (None = wyłączone), co ile sekund jeden rekord,
+# rotacja po przekroczeniu rozmiaru i liczba zachowanych starszych plików
+TIMELINE_FILE = "pizzeria_timeline.jsonl"
+TIMELINE_INTERVAL = 1.0
+TIMELINE_MAX_BYTES = 64 * 1024 * 1024
+TIMELINE_BACKUPS = 5
+
+# Ślad przebiegu (runtrace.py): binarny zapis przyjść, pożarów i odpowiedzi managera do odtworzenia (None = wyłączone)
+TRACE_FILE = "pizzeria_trace.bin"
+# Ziarno losowania przyjść, pożarów i profitu (każdy proces ma własny strumień); None = za każdym razem inaczej
+RANDOM_SEED = None
+
+# Profilowanie procesów (profiling.py): None = wyłączone, "cprofile" (deterministyczny, czas procesora)
+# albo "sample" (próbki stosów co PROFILE_SAMPLE_INTERVAL s); zmienna PIZZERIA_PROFILE ma pierwszeństwo
+PROFILE_MODE = None
+PROFILE_DIR = "profiles"
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Lista oczekujących (waitlist.py): zamiast od razu REJECTED grupa może poczekać na zwolnienie miejsc
+# (przed zamówieniem, więc nikt nie czeka z gorącą pizzą); najwyżej tyle grup każdego rozmiaru i tyle sekund
+WAITLIST_ENABLED = False
+WAITLIST_MAX_PER_SIZE = 10
+WAITLIST_MAX_WAIT = 2.0
 
-MAX_EAT_TIME = 1
\ No newline at end of file
+# Strategia wyboru stolika (policies.py): "first_fit" (najmniejszy pasujący stolik, jak dawniej),
+# "best_fit" (najmniej wolnych miejsc po posadzeniu), "lookahead" (według zaobserwowanego rozkładu wielkości grup)
+SEATING_POLICY = "first_fit"
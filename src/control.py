@@ -0,0 +1,96 @@
+import os
+import sys
+import argparse
+from config import MANAGER_SHARDS
+from protocol import control_fifo_path, table_shard
+from utils import split_lines
+
+"""
+Moduł control – zmiany sali w działającym managerze, bez restartu i bez przebudowy wszystkich stolików:
+    ADD capacity [count]  - nowe wolne stoliki (table_id kolejne wolne w danym shardzie)
+    REMOVE table_id       - usunięcie; zajęty stolik najpierw jest zamknięty i znika, gdy wyjdzie ostatnia grupa
+    CLOSE table_id        - stolik nie przyjmuje nowych grup (siedzący jedzą dalej)
+    OPEN table_id         - ponowne otwarcie zamkniętego stolika
+    RESET                 - wszystkie stoliki wolne w miejscu (indeksy i GUI zmieniają się tylko dla zajętych)
+
+Polecenia to linie tekstu w fifo control_fifo_path(shard) (CONTROL_FIFO w config.py); manager czyta je
+w tej samej pętli co prośby klientów. Polecenie dla stolika trafia do shardu, który go ma (table_shard),
+RESET do wszystkich shardów, ADD do --shard.
+
+Uruchamianie (w katalogu działającej symulacji): python control.py ADD 4 10
+                                                 python control.py REMOVE 7
+                                                 python control.py RESET
+"""
+
+COMMANDS = {
+    "ADD": (1, 2), # liczba argumentów: od, do
+    "REMOVE": (1, 1),
+    "CLOSE": (1, 1),
+    "OPEN": (1, 1),
+    "RESET": (0, 0),
+}
+
+
+def encode_command(name: str, *args) -> bytes:
+    return bytes(" ".join([name] + [str(int(arg)) for arg in args]) + "\n", "utf-8")
+
+
+def decode_commands(buffer: bytes):
+    """Zwraca (lista (polecenie, argumenty), niezdekodowana reszta bufora); błędne linie - ("INVALID", (linia,))."""
+    lines, rest = split_lines(buffer)
+    commands = []
+    for raw_line in lines:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        tokens = line.split()
+        name = tokens[0].upper()
+        try:
+            args = tuple(int(token) for token in tokens[1:])
+        except ValueError:
+            commands.append(("INVALID", (line,)))
+            continue
+        low, high = COMMANDS.get(name, (None, None))
+        if low is None or not low <= len(args) <= high or any(arg <= 0 for arg in args):
+            commands.append(("INVALID", (line,)))
+            continue
+        commands.append((name, args))
+    return commands, rest
+
+
+def command_shards(name: str, args: tuple, shards: int, add_shard: int = 0) -> list:
+    if name == "RESET":
+        return list(range(shards))
+    if name == "ADD":
+        return [add_shard]
+    return [table_shard(args[0], shards)]
+
+
+def send_command(name: str, args: tuple = (), shards: int = MANAGER_SHARDS, add_shard: int = 0):
+    """Zapis do fifo sterującego; OSError, gdy manager nie działa (brak fifo albo nikt go nie czyta)."""
+    message = encode_command(name, *args)
+    for shard in command_shards(name, args, shards, add_shard):
+        fd = os.open(control_fifo_path(shard), os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            os.write(fd, message)
+        finally:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Polecenia dla działającego managera pizzerii")
+    parser.add_argument("command", type=str.upper, choices=COMMANDS)
+    parser.add_argument("args", type=int, nargs="*")
+    parser.add_argument("--shards", type=int, default=MANAGER_SHARDS)
+    parser.add_argument("--shard", type=int, default=0, help="shard, który dostaje nowe stoliki (ADD)")
+    args = parser.parse_args()
+
+    low, high = COMMANDS[args.command]
+    if not low <= len(args.args) <= high:
+        parser.error(f"{args.command} przyjmuje {low}..{high} argumentów")
+    try:
+        send_command(args.command, tuple(args.args), args.shards, args.shard)
+    except OSError as e:
+        print(f"[Control] Manager nie przyjmuje poleceń: {e}")
+        sys.exit(1)
+    print(f"[Control] Wysłano: {encode_command(args.command, *args.args).decode().strip()}")
@@ -1,10 +1,20 @@
-import time
 import threading
-from config import SERVER_FIFO, CUSTOMER_FIFO_DIR, MAX_EAT_TIME
+from config import MAX_EAT_TIME, MANAGER_POLL_TIMEOUT, FIFO_READ_CHUNK, SHUTDOWN_SIGNAL, TRACE_FILE
+from protocol import REQUEST_SEAT, CUSTOMER_DONE, SEATED, REJECTED, LEAVE, encode_request, decode_replies, customer_fifo_path, server_fifo_path, request_shard, table_shard, describe
+from utils import read_available
+from timers import get_scheduler
+from clock import get_clock
+from supervisor import notify, READY, EXITING
+from runtrace import TraceWriter
+from profiling import profiled
+import log
 import traceback
 from multiprocessing import Event
 from setproctitle import setproctitle
 import os
+import select
+import time
+import signal
 
 """
 Moduł customer: 
@@ -14,63 +24,76 @@ Moduł customer:
 
 
 def person_in_group(thread_id: int, customer_id: int, close_event: Event, fire_event: Event):
-    print(f"    [Customer-{customer_id} thread-{thread_id}] Jem...")
-    ctime = time.time()
+    log.get_logger(f"Customer-{customer_id} thread-{thread_id}").debug("Jem...")
 
-    while True:
-        if close_event.is_set() or fire_event.is_set():
-            # w czasie jedzenia polecial event, ktory zmusza do wyjscia
-            return
-        if time.time() - ctime > MAX_EAT_TIME:
-            # delay minął
-            return
+    # wątek śpi aż minie MAX_EAT_TIME (czasu modelu) albo poleci event, który zmusza do wyjścia
+    get_scheduler().sleep(get_clock().real(MAX_EAT_TIME), (close_event, fire_event))
 
-def customer_process( fire_event: Event, close_event: Event, group_size: int, customer_id: int):
+@profiled
+def customer_process( fire_event: Event, close_event: Event, group_size: int, customer_id: int, notify_conn=None):
     
     """
-    1. Wysyła {my_fifo}:REQUEST_SEAT {group_size} {customer_id} do managera, by poprosić o stolik
+    1. Wysyła REQUEST_SEAT (group_size, customer_id) do managera, by poprosić o stolik (format: protocol.py);
+       przy kilku shardach managera do request_shard(customer_id), CUSTOMER_DONE do shardu ze stolikiem
     2. Czeka na "SEATED", "LEAVE" lub "REJECTED" od managera
     3. Jeśli "SEATED", tworzy wątki (person_in_group) dla każdej osoby w grupie
        Każdy wątek 'je' (sleep). Następnie wysyła "CUSTOMER_DONE" do managera
     4. Jeśli "REJECTED", kończy proces a klient 'wychodzi'
     5. Jeśli "LEAVE" (pożar) lub fire_event.is_set() – klient 'ucieka'
+    notify_conn - potok do CustomerSupervisor w main (zgłoszenie gotowości i wyjścia), None bez nadzorcy
+    Pierwszą odpowiedź managera i czas czekania na nią zapisuje do śladu przebiegu (TRACE_FILE).
     """
     
     setproctitle(f"CustomerProcess-{customer_id}-pid({os.getpid()})")
+    # zamknięcie przychodzi przez close_event od main; Ctrl+C trafia do całej grupy procesów,
+    # a klient z forkserwera nie dziedziczy obsługi sygnału z main
+    signal.signal(SHUTDOWN_SIGNAL, signal.SIG_IGN)
+    logger = log.get_logger(f"Customer-{customer_id}")
     
     # Tworzymy fifo dla klienta w folderze 'fifo'
-    my_fifo = CUSTOMER_FIFO_DIR + f"Customer_fifo_{customer_id}"
-    if os.path.exists(my_fifo):
-        os.remove(my_fifo)
-    os.mkfifo(my_fifo)
-
-    req_line = f"{my_fifo}:REQUEST_SEAT {group_size} {customer_id}\n"
-    write_to_server_fifo(req_line)
-
-    print(f"[Customer-{customer_id}] Klient (ilość osób={group_size}). Prośba o stolik.")
+    my_fifo = create_my_fifo(customer_id)
 
+    # otwieramy swoje fifo zanim poprosimy o stolik, żeby manager od razu mógł odpowiedzieć;
+    # dodatkowy koniec do zapisu sprawia, że select nie zgłasza EOF gdy manager zamknie swój
     mf = os.open(my_fifo, os.O_RDONLY | os.O_NONBLOCK)
-    mff = os.fdopen(mf, "r")
+    keepalive_fd = os.open(my_fifo, os.O_WRONLY | os.O_NONBLOCK)
 
-    try:
-        while not close_event.is_set():
-            # łapiemy fifo jako plik
-            line = None
-            line = mff.readline()
-            
-            if line == None: continue
-            
-            line = line.strip()
+    trace = TraceWriter(TRACE_FILE)
+    buffer = b""
 
-            if line == "": continue
-            print(f"[Customer-{customer_id}] Odebrano: {line}.")
+    try:
+        sent_at = time.time()
+        try:
+            write_to_server_fifo(encode_request(REQUEST_SEAT, group_size, customer_id, 0, my_fifo, sent_at=sent_at), request_shard(customer_id))
+        except OSError as e:
+            # manager zamknął już swoje fifo (koniec symulacji tuż po starcie klienta) - nie ma kogo prosić o stolik
+            logger.debug("Manager nie przyjmuje próśb (%s). Klient wychodzi.", e)
+            return
 
-            tokens = line.split()
-            resp_type = tokens[0]
-            table_id = tokens[2]
+        logger.debug("Klient (ilość osób=%s). Prośba o stolik.", group_size)
+        notify(notify_conn, READY, customer_id)
 
-            if resp_type == "SEATED":
-                print(f"[Customer-{customer_id}] Miejsce znalezione. Delektuje się pizzą...")
+        while not close_event.is_set():
+            # czekamy na odpowiedź managera (z limitem czasu, żeby zauważyć close_event)
+            ready, _, _ = select.select([mf], [], [], MANAGER_POLL_TIMEOUT)
+            if not ready: continue
+
+            buffer += read_available(mf, FIFO_READ_CHUNK)
+            replies, buffer = decode_replies(buffer)
+            if not replies: continue
+
+            reply = replies[0]
+            if logger.enabled(log.DEBUG):
+                logger.debug("Odebrano: %s.", describe(reply))
+
+            resp_type = reply[0]
+            table_id = reply[3]
+            received_at = time.time()
+            trace.outcome(customer_id, resp_type, table_id, received_at - sent_at, received_at)
+            trace.close()
+
+            if resp_type == SEATED:
+                logger.debug("Miejsce znalezione. Delektuje się pizzą...")
                 
                 # Każdy proces (grupa) ma wątki (osoby)
                 threads = []
@@ -90,45 +113,55 @@ def customer_process( fire_event: Event, close_event: Event, group_size: int, cu
                     break
 
                 if fire_event.is_set():
-                    print(f"[Customer-{customer_id}] Pożar! Klient ucieka.")
+                    # zgłaszamy wyjście, żeby manager wiedział, kiedy ewakuacja się skończyła
+                    logger.debug("Pożar! Klient ucieka.")
+                    write_to_server_fifo(encode_request(CUSTOMER_DONE, group_size, customer_id, table_id, my_fifo), table_shard(table_id))
                     break
 
-                done_line = f"{my_fifo}:CUSTOMER_DONE {group_size} {table_id}\n"
-                write_to_server_fifo(done_line)
+                write_to_server_fifo(encode_request(CUSTOMER_DONE, group_size, customer_id, table_id, my_fifo), table_shard(table_id))
 
-                print(f"[Customer-{customer_id}] Pizza zjedzona. Klient wychodzi.")
+                logger.debug("Pizza zjedzona. Klient wychodzi.")
                 return
             
-            elif resp_type == "REJECTED":
-                print(f"[Customer-{customer_id}] Brak miejsc. Klient wychodzi.")
+            elif resp_type == REJECTED:
+                logger.debug("Brak miejsc. Klient wychodzi.")
                 return
                     
-            elif resp_type == "LEAVE":
-                print(f"[Customer-{customer_id}] Manager powiedział że jest pożar. Klient wychodzi.")
+            elif resp_type == LEAVE:
+                logger.debug("Manager powiedział że jest pożar. Klient wychodzi.")
                 return
             
-        # usuwamy fifo managera
-        try:
-            mff.close()
-            os.close(mf)
-        except:
-            pass
-        print(f"[Customer-{customer_id}] Wychodzi.")
+        logger.debug("Wychodzi.")
     
     except Exception as e:
-        print(f"[Customer-{customer_id}] ERROR: {e}")
+        logger.error("ERROR: %s", e)
         traceback.print_exc()
         remove_my_fifo(customer_id, my_fifo)
     finally:
+        for fd in (mf, keepalive_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
         remove_my_fifo(customer_id, my_fifo)
-        print(f"[Customer-{customer_id}] Zakańczanie.")
+        trace.close()
+        logger.debug("Zakańczanie.")
+        log.flush()
+        notify(notify_conn, EXITING, customer_id)
+
+def create_my_fifo(customer_id):
+    my_fifo = customer_fifo_path(customer_id)
+    if os.path.exists(my_fifo):
+        os.remove(my_fifo)
+    os.mkfifo(my_fifo)
+    return my_fifo
 
-def write_to_server_fifo(req_line):
-    sf = os.open(SERVER_FIFO, os.O_WRONLY | os.O_NONBLOCK)
-    os.write(sf, bytes(req_line, "utf-8"))
+def write_to_server_fifo(message: bytes, shard: int = 0):
+    sf = os.open(server_fifo_path(shard), os.O_WRONLY | os.O_NONBLOCK)
+    os.write(sf, message)
     os.close(sf)
 
 def remove_my_fifo(customer_id, name):
-    print(f"[Customer-{customer_id}] Usuwam fifo ->{name}")
+    log.get_logger(f"Customer-{customer_id}").debug("Usuwam fifo ->%s", name)
     if os.path.exists(name):
         os.remove(name)
\ No newline at end of file
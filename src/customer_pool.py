@@ -0,0 +1,244 @@
+import os
+import time
+import selectors
+import traceback
+from collections import deque
+from multiprocessing import Process, Pipe, Value, Event, Condition
+from setproctitle import setproctitle
+from config import MAX_EAT_TIME, MANAGER_POLL_TIMEOUT, FIFO_READ_CHUNK, TRACE_FILE, CUSTOMER_REAP_POLL
+from customer import create_my_fifo, remove_my_fifo
+from utils import read_available, raise_fd_limit
+from protocol import REQUEST_SEAT, CUSTOMER_DONE, SEATED, REJECTED, LEAVE, encode_request, decode_replies, server_fifo_path, request_shard, table_shard
+from timers import TimerHeap
+from clock import get_clock
+from runtrace import TraceWriter
+from profiling import profiled
+import log
+
+"""
+Moduł customer_pool (tryb CUSTOMER_POOL_WORKERS > 0):
+- CustomerPool – stała pula N procesów roboczych, main rozdziela między nie nowe grupy
+- customer_worker_process() – jeden proces obsługujący wiele grup klientów naraz
+
+Każda grupa zachowuje się jak customer_process: ma własne fifo, wysyła REQUEST_SEAT,
+po SEATED je przez MAX_EAT_TIME i wysyła CUSTOMER_DONE, po REJECTED/LEAVE wychodzi,
+a w czasie pożaru ucieka od stolika. Protokół z managerem jest ten sam, odpowiedź trafia do śladu przebiegu (TRACE_FILE).
+Zamiast wątku na osobę jest jeden selector na fifo oczekujących grup i kopiec terminów końca jedzenia.
+Wiadomości do managera nie blokują pracownika: przy pełnym fifo czekają w kolejce na EVENT_WRITE w tym samym selectorze.
+"""
+
+
+class CustomerPool:
+    def __init__(self, workers: int, fire_event: Event, close_event: Event):
+        self.active_groups = Value('i', 0) # ile grup jest teraz w puli (dla limitu w main)
+        # pracownicy budzą main, gdy grupy wychodzą - main nie musi odpytywać active()
+        self.slot_freed = Condition(self.active_groups.get_lock())
+        self.conns = []
+        self.procs = []
+        self.next_worker = 0
+
+        for worker_id in range(workers):
+            recv_conn, send_conn = Pipe(duplex=False)
+            p = Process(
+                target=customer_worker_process,
+                args=(worker_id, recv_conn, fire_event, close_event, self.active_groups, self.slot_freed),
+                name=f"CustomerWorker-{worker_id}"
+            )
+            p.start()
+            recv_conn.close()
+            self.conns.append(send_conn)
+            self.procs.append(p)
+
+    def active(self) -> int:
+        return self.active_groups.value
+
+    def wait_for_slot(self, max_groups: int, should_stop, poll: float = CUSTOMER_REAP_POLL) -> bool:
+        """Blokuje, aż w puli będzie mniej niż max_groups grup. False - should_stop() w trakcie."""
+        with self.slot_freed:
+            while self.active_groups.value >= max_groups:
+                if should_stop():
+                    return False
+                self.slot_freed.wait(poll)
+        return True
+
+    def submit(self, group_size: int, customer_id: int):
+        # grupy rozdzielamy po kolei między procesy robocze
+        with self.active_groups.get_lock():
+            self.active_groups.value += 1
+        self.conns[self.next_worker].send((group_size, customer_id))
+        self.next_worker = (self.next_worker + 1) % len(self.conns)
+
+    def join(self):
+        for conn in self.conns:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        for p in self.procs:
+            p.join()
+
+
+@profiled
+def customer_worker_process(worker_id: int, conn, fire_event: Event, close_event: Event, active_groups: Value, slot_freed: Condition):
+    setproctitle(f"CustomerWorker-{worker_id}-pid({os.getpid()})")
+    raise_fd_limit()
+
+    selector = selectors.DefaultSelector()
+    selector.register(conn, selectors.EVENT_READ, None)
+
+    waiting = {} # fd -> grupa czekająca na odpowiedź managera
+    eating = TimerHeap() # terminy końca jedzenia grup
+    finished = 0 # ile grup wyszło od ostatniej aktualizacji active_groups
+
+    server_fds = {} # shard managera -> nieblokujący deskryptor do jego fifo
+    server_pending = {} # shard -> wiadomości czekające, aż fifo managera zwolni miejsce
+    server_blocked = set() # shardy, których fifo czeka w selectorze na EVENT_WRITE
+    trace = TraceWriter(TRACE_FILE)
+
+    def write_to_server(message, shard):
+        """
+        Jeden deskryptor do fifo każdego shardu na cały proces. Przy pełnym fifo wiadomość czeka w kolejce,
+        a pętla pracownika (i terminy jedzenia jego grup) działa dalej.
+        Zwraca False, gdy manager nie czyta już fifo (koniec symulacji) - wiadomość przepada.
+        """
+        if shard not in server_fds:
+            try:
+                server_fds[shard] = os.open(server_fifo_path(shard), os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                logger.debug("Manager (shard %s) nie przyjmuje wiadomości: %s", shard, e)
+                return False
+            server_pending[shard] = deque()
+        server_pending[shard].append(message)
+        return flush_to_server(shard)
+
+    def flush_to_server(shard):
+        # każda wiadomość osobnym zapisem: < PIPE_BUF, więc atomowa także przy fifo dzielonym z klientami
+        pending = server_pending[shard]
+        while pending:
+            try:
+                os.write(server_fds[shard], pending[0])
+            except BlockingIOError:
+                if shard not in server_blocked:
+                    server_blocked.add(shard)
+                    selector.register(server_fds[shard], selectors.EVENT_WRITE, ("server", shard))
+                return True
+            except OSError as e:
+                # BrokenPipeError - manager zamknął fifo, reszta kolejki przepada
+                logger.debug("Manager (shard %s) nie czyta fifo: %s", shard, e)
+                close_server(shard)
+                return False
+            pending.popleft()
+        if shard in server_blocked:
+            server_blocked.discard(shard)
+            selector.unregister(server_fds[shard])
+        return True
+
+    def close_server(shard):
+        if shard in server_blocked:
+            server_blocked.discard(shard)
+            selector.unregister(server_fds[shard])
+        os.close(server_fds.pop(shard))
+        server_pending.pop(shard, None)
+
+    def start_group(group_size, customer_id):
+        nonlocal finished
+        my_fifo = create_my_fifo(customer_id)
+        # otwieramy swój koniec przed wysłaniem prośby, żeby manager od razu mógł odpowiedzieć
+        fd = os.open(my_fifo, os.O_RDONLY | os.O_NONBLOCK)
+        group = {
+            'customer_id': customer_id,
+            'group_size': group_size,
+            'fifo': my_fifo,
+            'fd': fd,
+            'buffer': b"",
+        }
+        waiting[fd] = group
+        selector.register(fd, selectors.EVENT_READ, group)
+        group['sent_at'] = time.time()
+        if not write_to_server(encode_request(REQUEST_SEAT, group_size, customer_id, 0, my_fifo, sent_at=group['sent_at']),
+                               request_shard(customer_id)):
+            # nie ma kogo prosić o stolik - grupa od razu wychodzi
+            stop_waiting(group)
+            finished += 1
+
+    def stop_waiting(group):
+        selector.unregister(group['fd'])
+        del waiting[group['fd']]
+        os.close(group['fd'])
+        remove_my_fifo(group['customer_id'], group['fifo'])
+
+    def handle_reply(group):
+        nonlocal finished
+        group['buffer'] += read_available(group['fd'], FIFO_READ_CHUNK)
+        replies, group['buffer'] = decode_replies(group['buffer'])
+        for resp_type, _, _, table_id in replies:
+            if resp_type in (SEATED, REJECTED, LEAVE):
+                received_at = time.time()
+                trace.outcome(group['customer_id'], resp_type, table_id, received_at - group['sent_at'], received_at)
+            if resp_type == SEATED:
+                group['table_id'] = table_id
+                stop_waiting(group)
+                eating.push(time.time() + get_clock().real(MAX_EAT_TIME), group)
+                return
+            elif resp_type in (REJECTED, LEAVE):
+                stop_waiting(group)
+                finished += 1
+                return
+
+    logger = log.get_logger(f"CustomerWorker-{worker_id}")
+    logger.info("Rozpoczynanie.")
+
+    try:
+        while not close_event.is_set():
+            if fire_event.is_set() and eating:
+                # pożar - wszyscy jedzący uciekają; CUSTOMER_DONE mówi managerowi, że już wyszli (czas ewakuacji)
+                logger.info("Pożar! %s grup ucieka.", len(eating))
+                for group in eating.pop_expired(float("inf")):
+                    write_to_server(encode_request(CUSTOMER_DONE, group['group_size'], group['customer_id'], group['table_id'], group['fifo']),
+                                    table_shard(group['table_id']))
+                    finished += 1
+
+            timeout = MANAGER_POLL_TIMEOUT
+            deadline = eating.next_deadline()
+            if deadline is not None:
+                timeout = max(0, min(timeout, deadline - time.time()))
+
+            for key, _ in selector.select(timeout=timeout):
+                if key.data is None:
+                    # nowe grupy od main
+                    try:
+                        while conn.poll():
+                            group_size, customer_id = conn.recv()
+                            start_group(group_size, customer_id)
+                    except EOFError:
+                        selector.unregister(conn)
+                elif isinstance(key.data, tuple):
+                    # fifo managera znów przyjmuje dane
+                    flush_to_server(key.data[1])
+                elif key.fd in waiting:
+                    handle_reply(key.data)
+
+            # grupy które skończyły jeść zwalniają stolik
+            for group in eating.pop_expired(time.time()):
+                write_to_server(encode_request(CUSTOMER_DONE, group['group_size'], group['customer_id'], group['table_id'], group['fifo']),
+                                table_shard(group['table_id']))
+                finished += 1
+
+            if finished:
+                with slot_freed:
+                    active_groups.value -= finished
+                    slot_freed.notify_all()
+                finished = 0
+
+    except Exception as e:
+        logger.error("ERROR: %s", e)
+        traceback.print_exc()
+    finally:
+        for group in list(waiting.values()):
+            stop_waiting(group)
+        for shard in list(server_fds):
+            close_server(shard)
+        selector.close()
+        trace.close()
+        logger.info("Zakańczanie.")
+        log.flush()
@@ -0,0 +1,54 @@
+from config import EVACUATION_SLO_SECONDS
+
+"""
+Moduł evacuation – pomiar ewakuacji przy pożarze (od sygnału pożaru do wyjścia ostatniego klienta):
+- na zewnątrz muszą się znaleźć grupy siedzące przy stolikach w chwili pożaru (uciekając, wysyłają CUSTOMER_DONE)
+  i wszyscy, którym manager odpowiedział LEAVE (wyszli, gdy odpowiedź do nich dotarła - nie czeka w skrzynce nadawczej)
+- czas ewakuacji dłuższy niż EVACUATION_SLO_SECONDS to naruszenie SLO (licznik w metrykach managera)
+- jeśli do ponownego otwarcia ktoś się nie zgłosił (np. klient padł), ewakuacja kończy się jako niepełna
+"""
+
+
+class Evacuation:
+    def __init__(self, signal_at: float, seated_groups: int, slo: float = EVACUATION_SLO_SECONDS):
+        self.signal_at = signal_at
+        self.seated = seated_groups # grupy przy stolikach, które jeszcze nie zgłosiły wyjścia
+        self.slo = slo
+        self.leaving = set() # fifo klientów, do których LEAVE jeszcze nie dotarło
+        self.last_out = signal_at
+        self.done_at = None
+        self.complete = False
+
+    def leave_sent(self, client_fifo: str):
+        self.leaving.add(client_fifo)
+
+    def customer_out(self, now: float):
+        """Grupa spod stolika zgłosiła wyjście (CUSTOMER_DONE w trakcie pożaru)."""
+        if self.seated > 0:
+            self.seated -= 1
+            self.last_out = max(self.last_out, now)
+
+    def update(self, outbox, now: float) -> bool:
+        """Sprawdza, czy wszyscy wyszli. True - ewakuacja właśnie się zakończyła."""
+        if self.done_at is not None:
+            return False
+        delivered = [client_fifo for client_fifo in self.leaving if not outbox.pending(client_fifo)]
+        if delivered:
+            self.leaving.difference_update(delivered)
+            self.last_out = max(self.last_out, now)
+        if self.seated or self.leaving:
+            return False
+        self.done_at = self.last_out
+        self.complete = True
+        return True
+
+    def abandon(self, now: float):
+        """Ponowne otwarcie przed wyjściem wszystkich - liczymy czas do teraz."""
+        if self.done_at is None:
+            self.done_at = now
+
+    def duration(self) -> float:
+        return self.done_at - self.signal_at
+
+    def breached(self) -> bool:
+        return not self.complete or self.duration() > self.slo
@@ -1,69 +1,63 @@
-import time
 import random
 import traceback
 from multiprocessing import Event
 from setproctitle import setproctitle
-from config import CLOSURE_DURATION_AFTER_FIRE, FIRE_SIGNAL
+from config import CLOSURE_DURATION_AFTER_FIRE, FIRE_SIGNAL, FIRE_INTERVAL, TRACE_FILE
+from timers import get_scheduler
+from clock import get_clock
+from utils import seed_random
+from runtrace import TraceWriter
+from profiling import profiled
+import log
 import os
 
 """
 Moduł firefighter:
 - wywołuje pożary w pizzerii co pewien losowy czas
 - gasi pożar
+- chwile pożaru i ugaszenia zapisuje do śladu przebiegu (TRACE_FILE)
 """
 
-def firefighter_process(manager_pid: int, fire_event: Event, close_event: Event):
+@profiled
+def firefighter_process(manager_pids: list, fire_event: Event, close_event: Event):
     setproctitle(f"FirefighterProcess")
-    print("[Firefighter] Rozpoczynanie. Będzie wysyłać sygnały co 30 - 45 sekund.")
+    logger = log.get_logger("Firefighter")
+    logger.info("Rozpoczynanie. Będzie wysyłać sygnały co %s - %s sekund.", FIRE_INTERVAL[0], FIRE_INTERVAL[1])
     
-    kill_firefighter = False
+    scheduler = get_scheduler()
+    clock = get_clock() # FIRE_INTERVAL i CLOSURE_DURATION_AFTER_FIRE to czas modelu
+    seed_random("Firefighter")
+    trace = TraceWriter(TRACE_FILE)
     try:
         while not close_event.is_set():
-            delay = random.randint(30,45)
-            print(f"[Firefighter] Następny pożar za ~{delay} sekund...")
+            delay = random.randint(*FIRE_INTERVAL)
+            logger.info("Następny pożar za ~%s sekund...", delay)
 
-            ctime = time.time()
-
-            kill_firefighter = False
-            while True:
-                if close_event.is_set():
-                    # w czasie trwania delay poleciał close_event więc zamykamy process
-                    kill_firefighter = True
-                    break
-                if time.time() - ctime > delay:
-                    # delay minął
-                    break
-            
-            if kill_firefighter:
+            # śpimy do pożaru; jeśli w czasie trwania delay poleci close_event to zamykamy process
+            if not scheduler.sleep(clock.real(delay), (close_event,)):
                 break
 
-            # wysyłanie sygnału do managera
-            os.kill(manager_pid, FIRE_SIGNAL) # informacja dla maina
-            fire_event.set() # informacja dla pozostałych
-            print("[Firefighter] Wysłano sygnału pożaru.", flush=True)
+            # najpierw fire_event, potem sygnał - obudzony manager musi już widzieć pożar,
+            # inaczej zauważyłby go dopiero przy następnym wybudzeniu
+            fire_event.set()
+            trace.fire()
+            for manager_pid in manager_pids:
+                os.kill(manager_pid, FIRE_SIGNAL)
+            logger.info("Wysłano sygnału pożaru.")
 
-            # aktualny czas w sekundach
-            ctime = time.time()
-
-            kill_firefighter = False
-            while True:
-                if close_event.is_set():
-                    # w czasie trwania delay poleciał close_event więc zamykamy process
-                    kill_firefighter = True
-                    break
-                if time.time() - ctime > CLOSURE_DURATION_AFTER_FIRE:
-                    # delay minął
-                    break
-            
-            if kill_firefighter:
+            # czas zamknięcia pizzerii, też przerywany przez close_event
+            if not scheduler.sleep(clock.real(CLOSURE_DURATION_AFTER_FIRE), (close_event,)):
                 break
             
             #gasi pozar
-            print("[Firefighter] Pożar ugaszony.")
+            logger.info("Pożar ugaszony.")
             fire_event.clear()
+            trace.fire_end()
 
     except Exception as e:
-        print("[Firefighter] ERROR:", e)
+        logger.error("ERROR: %s", e)
         traceback.print_exc()
     finally:
-        print("[Firefighter] Zakańczanie.")
+        logger.info("Zakańczanie.")
+        trace.close()
+        log.flush()
@@ -1,8 +1,11 @@
-import tkinter as tk
 from multiprocessing import Queue, Event
-from config import TABLE_COUNTS
+from config import TABLE_COUNTS, GUI_FRAME_BUDGET_MS, GUI_POLL_MIN_MS, GUI_POLL_MAX_MS
 import queue as queue_module
+import time
 from setproctitle import setproctitle
+from board import TableBoard, TABLE_FIRE, TABLE_CLOSED
+from profiling import profiled
+import log
 
 """
 Moduł GUI:
@@ -10,10 +13,18 @@ Moduł GUI:
 - odpowiednio maluje stoły na czerwono jeśli są całkowicie zajęte, żółto jeśli po części, zielono jeśli są wolne
 - maluje stoły na czarno gdy jest pożar
 - wyświetla dotychczasowy profit
+- stan czyta z tablicy w pamięci współdzielonej (board), a bez niej z gui_queue
+- w każdej klatce scala komunikaty do najnowszego stanu stolików (FrameCoalescer) i rysuje tylko zmienione,
+  pilnuje budżetu czasu klatki i dopasowuje częstotliwość odświeżania do obciążenia
+- stoliki dodane w trakcie działania (control.py) dostają nowe koło, usunięte znikają, zamknięte są szare
 """
 
-def gui_process(gui_queue: Queue, close_event: Event):
+@profiled
+def gui_process(gui_queue: Queue, close_event: Event, board: TableBoard = None):
+    # board może też być ShardedBoard (kilka managerów) - ma te same snapshot() i generation()
+    import tkinter as tk # dopiero w procesie GUI - main i klienci nie ładują Tcl/Tk
     setproctitle(f"GUIProcess")
+    logger = log.get_logger("GUI")
     all_tables = []
     table_id_counter = 1
     for size, count in TABLE_COUNTS.items():
@@ -35,7 +46,7 @@ def gui_process(gui_queue: Queue, close_event: Event):
     profit_label.pack(pady=10)
 
     canvas = tk.Canvas(root, width=380, height=300, bg="#0a0a2b", highlightthickness=0)
-    canvas.pack()
+    canvas.pack(fill="both", expand=True)
 
     # table_id -> (circle_id, text_id)
     circle_map = {}
@@ -55,56 +66,249 @@ def gui_process(gui_queue: Queue, close_event: Event):
         else:
             return "orange" # częściowo zajęte
 
-    # Stoły reprezentowane przez koła
-    for i, tbl in enumerate(all_tables):
-        row = i // per_row
-        col = i % per_row
+    # Stoły reprezentowane przez koła; miejsce w gridzie wynika z table_id, więc nowe stoliki trafiają na koniec
+    def create_circle(table_id, capacity):
+        row = (table_id - 1) // per_row
+        col = (table_id - 1) % per_row
         x = start_x + col * spacing_x
         y = start_y + row * spacing_y
         r = 30 
 
         c_id = canvas.create_oval(x-r, y-r, x+r, y+r, fill="green", outline="#0a0a2b")
-        t_id = canvas.create_text(x, y, text=f"ID:{tbl['table_id']}\n0/{tbl['capacity']}", fill="white", font=("Arial", 10, "bold"))
+        t_id = canvas.create_text(x, y, text=f"ID:{table_id}\n0/{capacity}", fill="white", font=("Arial", 10, "bold"))
 
-        circle_map[tbl['table_id']] = (c_id, t_id)
+        circle_map[table_id] = (c_id, t_id)
+        if y + spacing_y > int(canvas["height"]):
+            canvas.config(height=y + spacing_y - r)
 
-    # Na razie sprawdzamy gui_queue co 100ms
+    for tbl in all_tables:
+        create_circle(tbl['table_id'], tbl['capacity'])
+
+    # Osobny napis z czasem klatki i opóźnieniem kolejki
+    stats_label = tk.Label(root, text="", fg="gray", bg="#0a0a2b", font=("Arial", 9))
+    stats_label.pack(pady=4)
+
+    coalescer = FrameCoalescer()
+    stats = GuiFrameStats()
+    last_generation = [None]
+    interval = [GUI_POLL_MAX_MS]
+
+    def draw_table(table_id, used_seats, capacity, closed=False):
+        if table_id not in circle_map:
+            create_circle(table_id, capacity)
+        c_id, t_id = circle_map[table_id]
+        fill_color = "gray" if closed else color_for_table(used_seats, capacity)
+        canvas.itemconfig(c_id, fill=fill_color)
+        canvas.itemconfig(t_id, text=f"ID:{table_id}\n{used_seats}/{capacity}" + ("\nZAMKN." if closed else ""))
+
+    def remove_circle(table_id):
+        for item in circle_map.pop(table_id, ()):
+            canvas.delete(item)
+
+    def draw_fire(table_id):
+        if table_id in circle_map:
+            c_id, t_id = circle_map[table_id]
+            canvas.itemconfig(c_id, fill="black")
+            canvas.itemconfig(t_id, text=f"ID:{table_id}\nPOŻAR")
+
+    board_tables = set() # stoliki z poprzedniego snapshotu - tych, których już nie ma, usuwamy z rysunku
+
+    def read_board():
+        # tanie sprawdzenie czy manager coś zmienił od ostatniej klatki
+        generation = board.generation()
+        if generation == last_generation[0]:
+            return
+        snap = board.snapshot()
+        last_generation[0] = snap['generation']
+        coalescer.apply("PROFIT_UPDATE", snap['profit'])
+        for table_id, (used_seats, capacity, _, state) in snap['tables'].items():
+            if state == TABLE_FIRE:
+                coalescer.apply("TABLE_FIRE", table_id)
+            elif state == TABLE_CLOSED:
+                coalescer.apply("TABLE_CLOSED", (table_id, used_seats, capacity))
+            else:
+                coalescer.apply("TABLE_UPDATE", (table_id, used_seats, capacity))
+        for table_id in board_tables - snap['tables'].keys():
+            coalescer.apply("TABLE_REMOVE", table_id)
+        board_tables.clear()
+        board_tables.update(snap['tables'])
+
+    def draw_change(table_id, state):
+        if state[0] == "TABLE_FIRE":
+            draw_fire(table_id)
+        elif state[0] == "TABLE_REMOVE":
+            remove_circle(table_id)
+        else:
+            draw_table(table_id, state[1], state[2], state[0] == "TABLE_CLOSED")
+
+    # Jedna klatka: zbieramy komunikaty do najnowszego stanu, potem rysujemy tylko zmienione stoliki
     def poll_queue():
-        while True:
-            try:
-                msg_type, data = gui_queue.get_nowait()
-            except queue_module.Empty:
-                break
-
-            if msg_type == "TABLE_UPDATE":
-                table_id, used_seats, capacity = data
-                # Aktualizujemy kolor i liczbe w kole
-                if table_id in circle_map:
-                    c_id, t_id = circle_map[table_id]
-                    fill_color = color_for_table(used_seats, capacity)
-                    canvas.itemconfig(c_id, fill=fill_color)
-                    canvas.itemconfig(t_id, text=f"ID:{table_id}\n{used_seats}/{capacity}")
-            elif msg_type == "PROFIT_UPDATE":
-                # data = total_profit
-                profit_label["text"] = f"Profit: {data}"
-            elif msg_type == "TABLE_FIRE":
-                table_id = data
-                if table_id in circle_map:
-                    c_id, t_id = circle_map[table_id]
-                    canvas.itemconfig(c_id, fill="black")
-                    canvas.itemconfig(t_id, text=f"ID:{table_id}\nPOŻAR")
-                
+        frame_start = time.perf_counter()
+        budget = GUI_FRAME_BUDGET_MS / 1000
+
+        if board is not None:
+            read_board()
+
+        # na zbieranie komunikatów przeznaczamy połowę budżetu klatki
+        drained, backlog = drain_queue(gui_queue, coalescer, frame_start + budget / 2)
+
+        # rysujemy w ramach reszty budżetu, czego nie zdążymy zostaje na następną klatkę
+        changes, profit = coalescer.take_changes()
+        if profit is not None:
+            profit_label["text"] = f"Profit: {profit}"
+        if draw_changes(coalescer, changes, draw_change, frame_start + budget):
+            backlog = True
+
+        frame_time = time.perf_counter() - frame_start
+        stats.record(frame_time, drained, backlog)
+        interval[0] = next_poll_interval(interval[0], drained, bool(changes), backlog)
+
+        stats_label["text"] = (
+            f"Klatka: {frame_time * 1000:.1f} ms | Opóźnienie kolejki: {stats.queue_lag() * 1000:.0f} ms | "
+            f"Odświeżanie co {interval[0]} ms"
+        )
+
         if not close_event.is_set():
-            root.after(100, poll_queue)
+            root.after(interval[0], poll_queue)
         else:
             # Jak close_event no to zamykamy
+            logger.info("%s", stats.summary())
             root.destroy()
 
-    root.after(100, poll_queue)
+    root.after(interval[0], poll_queue)
 
     try:
         root.mainloop()
     except KeyboardInterrupt:
-        print("[GUI] KeyboardInterrupt => Zakańczanie...")
+        logger.info("KeyboardInterrupt => Zakańczanie...")
         close_event.set()
-        root.destroy()
\ No newline at end of file
+        root.destroy()
+    finally:
+        log.flush()
+
+
+def drain_queue(gui_queue, coalescer, deadline: float, clock=time.perf_counter):
+    """Przenosi komunikaty z kolejki do coalescera do chwili 'deadline'. Zwraca (ile zebrano, czy coś zostało)."""
+    drained = 0
+    while True:
+        # zegar sprawdzamy co 64 komunikaty - samo sprawdzanie też kosztuje
+        if drained % 64 == 0 and clock() > deadline:
+            return drained, True
+        try:
+            msg_type, data = gui_queue.get_nowait()
+        except queue_module.Empty:
+            return drained, False
+        coalescer.apply(msg_type, data)
+        drained += 1
+
+
+def draw_changes(coalescer, changes, draw, deadline: float, clock=time.perf_counter) -> bool:
+    """Rysuje zmiany do chwili 'deadline', resztę oddaje coalescerowi na następną klatkę. True, gdy coś zostało."""
+    for i, (table_id, state) in enumerate(changes):
+        if clock() > deadline:
+            coalescer.postpone(changes[i:])
+            return True
+        draw(table_id, state)
+    return False
+
+
+def next_poll_interval(interval: int, drained: int, changed: bool, backlog: bool) -> int:
+    """Przy zaległościach odpytujemy częściej, przy ciszy coraz rzadziej (GUI_POLL_MIN_MS .. GUI_POLL_MAX_MS)."""
+    if backlog:
+        return GUI_POLL_MIN_MS
+    if drained or changed:
+        return max(GUI_POLL_MIN_MS, interval // 2)
+    return min(GUI_POLL_MAX_MS, int(interval * 1.5) + 1)
+
+
+class FrameCoalescer:
+    """
+    Zbiera komunikaty GUI między klatkami: dla każdego stolika zostaje tylko najnowszy stan,
+    dla profitu tylko ostatnia wartość. take_changes() oddaje to, co różni się od narysowanego.
+    Po pożarze manager wysyła jeden FLOOR_OPEN i tylko stoliki, które się zmieniły - pozostałe wracają
+    do stanu sprzed pożaru zapamiętanego w tables.
+    """
+
+    def __init__(self):
+        self.pending = {} # table_id -> ("TABLE_UPDATE" / "TABLE_CLOSED", used, capacity), ("TABLE_FIRE",) albo ("TABLE_REMOVE",)
+        self.tables = {} # table_id -> ostatni stan stolika poza pożarem
+        self.profit = None
+        self.shard_profits = {} # shard managera -> jego profit (MANAGER_SHARDS > 1)
+        self.drawn = {}
+        self.drawn_profit = None
+
+    def apply(self, msg_type, data):
+        if msg_type in ("TABLE_UPDATE", "TABLE_CLOSED"):
+            table_id, used_seats, capacity = data
+            self.pending[table_id] = self.tables[table_id] = (msg_type, used_seats, capacity)
+        elif msg_type == "TABLE_REMOVE":
+            self.tables.pop(data, None)
+            self.pending[data] = ("TABLE_REMOVE",)
+        elif msg_type == "FLOOR_OPEN":
+            # koniec pożaru - stoliki wracają do ostatniego znanego stanu (zmienione przyjdą osobno jako TABLE_UPDATE)
+            for table_id in data:
+                if table_id in self.tables:
+                    self.pending[table_id] = self.tables[table_id]
+        elif msg_type == "TABLE_FIRE":
+            self.pending[data] = ("TABLE_FIRE",)
+        elif msg_type == "FLOOR_FIRE":
+            # pożar - jeden komunikat od managera (shardu) na wszystkie jego stoliki
+            for table_id in data:
+                self.pending[table_id] = ("TABLE_FIRE",)
+        elif msg_type == "PROFIT_UPDATE":
+            if isinstance(data, tuple):
+                # (shard, profit) od jednego z kilku managerów - pokazujemy sumę
+                shard, profit = data
+                self.shard_profits[shard] = profit
+                self.profit = sum(self.shard_profits.values())
+            else:
+                self.profit = data
+
+    def take_changes(self):
+        changes = [(table_id, state) for table_id, state in self.pending.items() if self.drawn.get(table_id) != state]
+        self.pending.clear()
+        for table_id, state in changes:
+            self.drawn[table_id] = state
+
+        profit = None
+        if self.profit is not None and self.profit != self.drawn_profit:
+            profit = self.drawn_profit = self.profit
+        self.profit = None
+        return changes, profit
+
+    def postpone(self, changes):
+        # nienarysowane zmiany wracają do kolejnej klatki (chyba że przyjdzie nowszy stan)
+        for table_id, state in changes:
+            self.drawn.pop(table_id, None)
+            self.pending.setdefault(table_id, state)
+
+
+class GuiFrameStats:
+    """Czas klatki i opóźnienie kolejki (jak długo kolejka nie była opróżniona do końca)."""
+
+    def __init__(self):
+        self.frames = 0
+        self.total_frame_time = 0.0
+        self.max_frame_time = 0.0
+        self.messages = 0
+        self.last_drained = time.monotonic()
+        self.max_queue_lag = 0.0
+
+    def record(self, frame_time: float, drained: int, backlog: bool):
+        self.frames += 1
+        self.total_frame_time += frame_time
+        self.max_frame_time = max(self.max_frame_time, frame_time)
+        self.messages += drained
+        if not backlog:
+            self.last_drained = time.monotonic()
+        self.max_queue_lag = max(self.max_queue_lag, self.queue_lag())
+
+    def queue_lag(self) -> float:
+        return time.monotonic() - self.last_drained
+
+    def summary(self) -> str:
+        avg = self.total_frame_time / self.frames if self.frames else 0.0
+        return (
+            f"Klatek={self.frames}, komunikatów={self.messages}, średni czas klatki={avg * 1000:.2f} ms, "
+            f"maks. czas klatki={self.max_frame_time * 1000:.2f} ms, maks. opóźnienie kolejki={self.max_queue_lag * 1000:.0f} ms"
+        )
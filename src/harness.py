@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import shutil
+import selectors
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import Process, Queue, Event
+from config import TABLE_COUNTS, FIFO_READ_CHUNK, USE_SHARED_BOARD, BOARD_MAX_TABLES
+from protocol import decode_replies, customer_fifo_path, server_fifo_path
+from utils import read_available
+from board import TableBoard
+from manager import manager_process
+
+"""
+Moduł harness – prawdziwy manager_process do pomiarów, testów i narzędzi (benchmark, runtrace replay, loadgen, test.py):
+- running_manager() – manager (albo kilka shardów) w katalogu tymczasowym z własnym fifo/,
+  więc nie rusza fifo/ ani pizzeria_log.txt działającej symulacji
+- BenchClients – fifo odpowiedzi udawanych klientów i odczyt odpowiedzi managera
+- quiet_stdout() – wyciszenie stdout procesów potomnych (logi managera)
+"""
+
+
+@contextmanager
+def quiet_stdout():
+    # procesy potomne dziedziczą deskryptor 1, więc wyciszamy go na poziomie fd, a nie sys.stdout
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+@contextmanager
+def running_manager(shards: int = 1, fire_event: Event = None, manager_pids: list = None):
+    """
+    Uruchamia manager_process (albo 'shards' shardów) w katalogu tymczasowym (z własnym fifo/)
+    i czeka, aż każdy będzie czytał swoje fifo. Zwraca listę otwartych, blokujących deskryptorów
+    do zapisu, po jednym na shard (przy jednym managerze [deskryptor SERVER_FIFO]).
+    fire_event - pożar sterowany z zewnątrz (np. odtwarzanie runtrace.py); do manager_pids dopisujemy
+    pid-y managerów, żeby można im było wysłać FIRE_SIGNAL.
+    """
+    old_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="pizzeria_bench_")
+    os.chdir(workdir)
+    os.makedirs("fifo")
+
+    # jak w main - zapas wierszy na stoliki dodane w trakcie (control.py ADD)
+    boards = [TableBoard.create(max(BOARD_MAX_TABLES, sum(TABLE_COUNTS.values()))) for _ in range(shards)] if USE_SHARED_BOARD else []
+    fire_event = fire_event or Event()
+    close_event = Event()
+    stats_queue = Queue() if shards > 1 else None
+    procs = []
+    with quiet_stdout():
+        for shard in range(shards):
+            proc = Process(target=manager_process,
+                           args=(Queue(), fire_event, close_event, time.time(), boards[shard] if boards else None,
+                                 shard, shards, stats_queue),
+                           name=f"ManagerProcess-{shard}")
+            proc.start()
+            procs.append(proc)
+            if manager_pids is not None:
+                manager_pids.append(proc.pid)
+
+    server_fds = []
+    try:
+        deadline = time.monotonic() + 10
+        for shard, proc in enumerate(procs):
+            server_fd = None
+            while server_fd is None:
+                try:
+                    server_fd = os.open(server_fifo_path(shard), os.O_WRONLY | os.O_NONBLOCK)
+                except OSError:
+                    # jeszcze nie ma fifo albo manager go nie otworzył
+                    if time.monotonic() > deadline or not proc.is_alive():
+                        raise RuntimeError("manager nie wystartował")
+                    time.sleep(0.01)
+            os.set_blocking(server_fd, True)
+            server_fds.append(server_fd)
+        yield server_fds
+    finally:
+        for server_fd in server_fds:
+            os.close(server_fd)
+        close_event.set()
+        if stats_queue is not None:
+            for _ in procs:
+                try:
+                    stats_queue.get(timeout=10)
+                except Exception:
+                    break
+        for proc in procs:
+            proc.join(10)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        for board in boards:
+            board.close()
+            board.unlink()
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+class BenchClients:
+    """Fifo odpowiedzi dla 'count' udawanych klientów; czyta odpowiedzi managera tak jak customer_process."""
+
+    def __init__(self, count: int):
+        self.selector = selectors.DefaultSelector()
+        self.fds = []
+        self.buffers = {}
+        for customer_id in range(count):
+            fifo = customer_fifo_path(customer_id)
+            os.mkfifo(fifo)
+            fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+            # własny koniec do zapisu - bez niego po zamknięciu fifo przez managera select zgłaszałby EOF
+            keepalive = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+            self.fds += [fd, keepalive]
+            self.buffers[customer_id] = b""
+            self.selector.register(fd, selectors.EVENT_READ, customer_id)
+
+    def replies(self, expected: int, timeout: float = 10):
+        """Zwraca listę (customer_id, odpowiedź) po odebraniu 'expected' odpowiedzi."""
+        received = []
+        deadline = time.monotonic() + timeout
+        while len(received) < expected:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"manager nie odpowiedział ({len(received)}/{expected})")
+            for key, _ in self.selector.select(timeout=0.1):
+                customer_id = key.data
+                replies, self.buffers[customer_id] = decode_replies(
+                    self.buffers[customer_id] + read_available(key.fd, FIFO_READ_CHUNK))
+                received += [(customer_id, reply) for reply in replies]
+        return received
+
+    def close(self):
+        self.selector.close()
+        for fd in self.fds:
+            os.close(fd)
@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import selectors
+from contextlib import contextmanager
+from config import MANAGER_SHARDS, MAX_EAT_TIME, FIFO_READ_CHUNK, GROUP_SIZE_WEIGHTS
+from protocol import (
+    REQUEST_SEAT, CUSTOMER_DONE, SEATED, REJECTED, LEAVE, encode_request, decode_replies,
+    customer_fifo_path, server_fifo_path, request_shard, table_shard,
+)
+from timers import TimerHeap
+from clock import get_clock
+from utils import read_available, raise_fd_limit
+from harness import running_manager
+
+"""
+Moduł loadgen – generator obciążenia w pętli otwartej dla fifo managera (szukanie punktu nasycenia):
+- prośby REQUEST_SEAT wychodzą według harmonogramu (proces Poissona o zadanym tempie), niezależnie od tego,
+  czy manager nadąża odpowiadać - w przeciwieństwie do main(), gdzie nowy klient czeka na wolne miejsce
+- tryb "poisson": stałe tempo przez --duration sekund; tryb "ramp": tempo rośnie schodkami
+  (--start, --step co --step-seconds, aż do --max)
+- posadzone grupy "jedzą" (TimerHeap, MAX_EAT_TIME w czasie modelu - clock.py) i wysyłają CUSTOMER_DONE
+  do shardu ze stolikiem, jak customer_process
+- odpowiedź czytamy z fifo klienta (pula --clients fifo, jedno zajęte od prośby do odpowiedzi / końca jedzenia)
+- czas odpowiedzi liczymy od zaplanowanej chwili wysłania, więc spóźnienie samego generatora też się wlicza
+- błędy: pełne fifo managera (EAGAIN - prośba przepada), brak wolnego fifo klienta, brak odpowiedzi w --timeout
+
+Wynik dla każdego schodka: tempo zadane i osiągnięte, odpowiedzi na sekundę, SEATED / REJECTED / LEAVE,
+percentyle czasu odpowiedzi i błędy; nasycenie to pierwszy schodek, na którym manager przestaje nadążać.
+
+Uruchamianie: python loadgen.py ramp --start 200 --step 200 --max 4000     (własny manager w katalogu tymczasowym)
+              python loadgen.py poisson --rate 1000 --duration 10 --attach  (działająca symulacja: fifo/ w bieżącym katalogu)
+"""
+
+ID_BASE = 1_000_000 # customer_id generatora - poza numeracją klientów z main(), żeby nie dzielić z nimi fifo
+
+
+def poisson_arrivals(steps, rng: random.Random):
+    """Chwile wysłania (od startu) i numer schodka; steps = [(początek, koniec, tempo na sekundę)]."""
+    for index, (begin, end, rate) in enumerate(steps):
+        if rate <= 0:
+            continue
+        t = begin + rng.expovariate(rate)
+        while t < end:
+            yield t, index
+            t += rng.expovariate(rate)
+
+
+def constant_steps(rate: float, duration: float) -> list:
+    return [(0.0, duration, rate)]
+
+
+def ramp_steps(start: float, step: float, max_rate: float, step_seconds: float) -> list:
+    steps = []
+    rate = start
+    while rate <= max_rate + 1e-9:
+        begin = len(steps) * step_seconds
+        steps.append((begin, begin + step_seconds, rate))
+        if step <= 0:
+            break
+        rate += step
+    return steps
+
+
+class StepStats:
+    def __init__(self, begin: float, end: float, rate: float):
+        self.begin, self.end, self.rate = begin, end, rate
+        self.scheduled = 0
+        self.sent = 0
+        self.outcomes = {SEATED: 0, REJECTED: 0, LEAVE: 0}
+        self.latencies = []
+        self.send_lag_max = 0.0
+        self.fifo_full = 0 # EAGAIN przy zapisie do fifo managera
+        self.no_client = 0 # wszystkie fifo klientów zajęte
+        self.timeouts = 0
+        self.last_reply = None
+
+    def result(self) -> dict:
+        duration = self.end - self.begin
+        latencies = sorted(self.latencies)
+        replies = len(latencies)
+        # odpowiedzi na sekundę: do ostatniej odpowiedzi na prośbę z tego schodka (nie wcześniej niż koniec schodka)
+        reply_window = max(duration, (self.last_reply or self.end) - self.begin)
+        result = {
+            'offered_per_sec': self.rate,
+            'scheduled': self.scheduled,
+            'sent_per_sec': self.sent / duration if duration > 0 else 0.0,
+            'replies_per_sec': replies / reply_window if reply_window > 0 else 0.0,
+            'seated': self.outcomes[SEATED],
+            'rejected': self.outcomes[REJECTED],
+            'leave': self.outcomes[LEAVE],
+            'send_lag_max_ms': self.send_lag_max * 1000,
+            'errors': self.fifo_full + self.no_client + self.timeouts,
+            'fifo_full': self.fifo_full,
+            'no_client': self.no_client,
+            'timeouts': self.timeouts,
+        }
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            result[f"{name}_ms"] = latencies[min(replies - 1, int(fraction * replies))] * 1000 if latencies else 0.0
+        result['max_ms'] = latencies[-1] * 1000 if latencies else 0.0
+        return result
+
+
+class LoadGenerator:
+    def __init__(self, server_fds: list, clients: int = 1024, eat_time: float = None, timeout: float = 2.0, seed: int = 0):
+        self.server_fds = server_fds
+        self.shards = len(server_fds)
+        self.eat_time = get_clock().real(MAX_EAT_TIME) if eat_time is None else eat_time
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.group_sizes = list(GROUP_SIZE_WEIGHTS)
+        self.group_weights = list(GROUP_SIZE_WEIGHTS.values())
+        for server_fd in server_fds:
+            os.set_blocking(server_fd, False) # pętla otwarta: pełne fifo managera to błąd, a nie czekanie
+
+        raise_fd_limit()
+        self.selector = selectors.DefaultSelector()
+        self.clients = {} # fd -> klient (fifo, customer_id, stan bieżącej prośby)
+        self.free = []
+        for slot in range(clients):
+            customer_id = ID_BASE + slot
+            fifo = customer_fifo_path(customer_id)
+            if os.path.exists(fifo):
+                os.remove(fifo)
+            os.mkfifo(fifo)
+            fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+            # własny koniec do zapisu - bez niego po zamknięciu fifo przez managera select zgłaszałby EOF
+            keepalive = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+            self.clients[fd] = {'customer_id': customer_id, 'fifo': fifo, 'keepalive': keepalive, 'buffer': b"", 'request': None}
+            self.selector.register(fd, selectors.EVENT_READ)
+            self.free.append(fd)
+
+    def close(self):
+        self.selector.close()
+        for fd, client in self.clients.items():
+            os.close(fd)
+            os.close(client['keepalive'])
+            if os.path.exists(client['fifo']):
+                os.remove(client['fifo'])
+
+    def run(self, steps: list) -> list:
+        stats = [StepStats(*step) for step in steps]
+        arrivals = poisson_arrivals(steps, self.rng)
+        meals = TimerHeap() # fd klienta, który je
+        deadlines = TimerHeap() # (fd, prośba) bez odpowiedzi
+
+        def send(message, shard) -> bool:
+            try:
+                os.write(self.server_fds[shard], message)
+                return True
+            except BlockingIOError:
+                return False
+
+        def request_seat(scheduled, index, now):
+            step = stats[index]
+            step.scheduled += 1
+            if not self.free:
+                step.no_client += 1
+                return
+            fd = self.free.pop()
+            client = self.clients[fd]
+            group_size = self.rng.choices(self.group_sizes, weights=self.group_weights)[0]
+            message = encode_request(REQUEST_SEAT, group_size, client['customer_id'], 0, client['fifo'])
+            if not send(message, request_shard(client['customer_id'], self.shards)):
+                step.fifo_full += 1
+                self.free.append(fd)
+                return
+            step.sent += 1
+            step.send_lag_max = max(step.send_lag_max, now - scheduled)
+            client['request'] = {'scheduled': scheduled, 'step': step, 'group_size': group_size}
+            deadlines.push(scheduled + self.timeout, (fd, client['request']))
+
+        def leave_table(fd):
+            client = self.clients[fd]
+            request = client['request']
+            message = encode_request(CUSTOMER_DONE, request['group_size'], client['customer_id'], request['table_id'], client['fifo'])
+            shard = table_shard(request['table_id'], self.shards)
+            while not send(message, shard):
+                # CUSTOMER_DONE nie może przepaść (stolik zostałby zajęty na zawsze), więc czekamy na miejsce w fifo
+                time.sleep(0.0005)
+            client['request'] = None
+            self.free.append(fd)
+
+        def handle_reply(fd, now):
+            client = self.clients[fd]
+            client['buffer'] += read_available(fd, FIFO_READ_CHUNK)
+            replies, client['buffer'] = decode_replies(client['buffer'])
+            for msg_type, _, _, table_id in replies:
+                request = client['request']
+                if request is None or 'table_id' in request:
+                    continue # odpowiedź bez prośby (np. LEAVE do jedzącego) - nie dotyczy pomiaru
+                step = request['step']
+                if not request.get('timed_out'):
+                    step.latencies.append(now - request['scheduled'])
+                    step.outcomes[msg_type] = step.outcomes.get(msg_type, 0) + 1
+                    step.last_reply = now
+                if msg_type == SEATED:
+                    request['table_id'] = table_id
+                    meals.push(now + self.eat_time, fd)
+                else:
+                    client['request'] = None
+                    self.free.append(fd)
+
+        start = time.perf_counter()
+        next_arrival = next(arrivals, None)
+        try:
+            while True:
+                now = time.perf_counter() - start
+                while next_arrival is not None and next_arrival[0] <= now:
+                    request_seat(*next_arrival, now)
+                    next_arrival = next(arrivals, None)
+
+                for fd in meals.pop_expired(now):
+                    leave_table(fd)
+                for fd, request in deadlines.pop_expired(now):
+                    if self.clients[fd]['request'] is request and 'table_id' not in request:
+                        # fifo zostaje zajęte, aż odpowiedź jednak przyjdzie - nie pomylimy jej z następną prośbą
+                        request['timed_out'] = True
+                        request['step'].timeouts += 1
+
+                waiting = len(self.clients) - len(self.free) - len(meals)
+                if next_arrival is None and (waiting == 0 or not deadlines):
+                    break
+
+                timeout = 0.05
+                for deadline in (next_arrival[0] if next_arrival else None, meals.next_deadline(), deadlines.next_deadline()):
+                    if deadline is not None:
+                        timeout = min(timeout, max(0.0, deadline - now))
+                for key, _ in self.selector.select(timeout=timeout):
+                    handle_reply(key.fd, time.perf_counter() - start)
+        finally:
+            # koniec pomiaru - wszyscy jedzący od razu zwalniają stoliki (manager zostaje w czystym stanie)
+            for fd in meals.pop_expired(float("inf")):
+                leave_table(fd)
+        return [step.result() for step in stats]
+
+
+def saturation(results: list, max_p99_ms: float = 100.0, min_ratio: float = 0.95):
+    """
+    Pierwszy schodek, na którym manager nie nadąża: odpowiedzi < min_ratio tempa wysłanych próśb, błędy albo p99 > max_p99_ms.
+    Porównujemy z wysłanymi, a nie z offered_per_sec - proces Poissona w krótkim schodku losuje mniej albo więcej próśb.
+    """
+    for result in results:
+        if (result['replies_per_sec'] < min_ratio * result['sent_per_sec'] or result['errors']
+                or result['p99_ms'] > max_p99_ms):
+            return result
+    return None
+
+
+@contextmanager
+def attached_manager(shards: int = MANAGER_SHARDS):
+    """Fifo działającej symulacji (manager uruchomiony przez main.py w bieżącym katalogu)."""
+    server_fds = []
+    try:
+        for shard in range(shards):
+            server_fds.append(os.open(server_fifo_path(shard), os.O_WRONLY | os.O_NONBLOCK))
+        yield server_fds
+    finally:
+        for server_fd in server_fds:
+            os.close(server_fd)
+
+
+def run_load(steps: list, attach: bool = False, shards: int = MANAGER_SHARDS, **kwargs) -> list:
+    if attach:
+        manager = attached_manager(shards)
+    else:
+        manager = running_manager(shards) # własny manager w katalogu tymczasowym
+    with manager as server_fds:
+        generator = LoadGenerator(server_fds, **kwargs)
+        try:
+            return generator.run(steps)
+        finally:
+            generator.close()
+
+
+def print_results(results: list, saturated: dict):
+    print(f"{'zadane/s':>9} {'wysłane/s':>10} {'odp./s':>9} {'SEATED':>7} {'REJECTED':>9} {'LEAVE':>6} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'maks. ms':>9} {'błędy':>6}")
+    for r in results:
+        print(f"{r['offered_per_sec']:9.0f} {r['sent_per_sec']:10.0f} {r['replies_per_sec']:9.0f} {r['seated']:7} {r['rejected']:9} "
+              f"{r['leave']:6} {r['p50_ms']:8.2f} {r['p90_ms']:8.2f} {r['p99_ms']:8.2f} {r['max_ms']:9.2f} {r['errors']:6}"
+              + (f"  (pełne fifo={r['fifo_full']}, brak fifo klienta={r['no_client']}, bez odpowiedzi={r['timeouts']})" if r['errors'] else ""))
+    if saturated is None:
+        print("[Loadgen] Manager nadążał na wszystkich schodkach.")
+    else:
+        print(f"[Loadgen] Nasycenie przy ~{saturated['offered_per_sec']:.0f} próśb/s "
+              f"(odpowiedzi {saturated['replies_per_sec']:.0f}/s, p99={saturated['p99_ms']:.2f} ms, błędy={saturated['errors']}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generator obciążenia managera pizzerii (pętla otwarta)")
+    modes = parser.add_subparsers(dest="mode", required=True)
+    poisson_parser = modes.add_parser("poisson", help="stałe tempo przyjść (proces Poissona)")
+    poisson_parser.add_argument("--rate", type=float, default=500, help="próśb na sekundę")
+    poisson_parser.add_argument("--duration", type=float, default=10, help="sekundy")
+    ramp_parser = modes.add_parser("ramp", help="tempo rosnące schodkami")
+    ramp_parser.add_argument("--start", type=float, default=100)
+    ramp_parser.add_argument("--step", type=float, default=100)
+    ramp_parser.add_argument("--max", type=float, default=2000)
+    ramp_parser.add_argument("--step-seconds", type=float, default=3)
+    for mode_parser in (poisson_parser, ramp_parser):
+        mode_parser.add_argument("--attach", action="store_true", help="obciąż działającą symulację (fifo/ w bieżącym katalogu)")
+        mode_parser.add_argument("--shards", type=int, default=MANAGER_SHARDS)
+        mode_parser.add_argument("--clients", type=int, default=1024, help="ile fifo klientów (równocześnie czekających / jedzących)")
+        mode_parser.add_argument("--eat", type=float, default=None, help="czas jedzenia w sekundach (domyślnie MAX_EAT_TIME w czasie modelu)")
+        mode_parser.add_argument("--timeout", type=float, default=2.0, help="po ilu sekundach brak odpowiedzi to błąd")
+        mode_parser.add_argument("--max-p99-ms", type=float, default=100.0, help="p99 powyżej tego = nasycenie")
+        mode_parser.add_argument("--seed", type=int, default=0)
+        mode_parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    if args.mode == "poisson":
+        steps = constant_steps(args.rate, args.duration)
+    else:
+        steps = ramp_steps(args.start, args.step, args.max, args.step_seconds)
+
+    try:
+        results = run_load(steps, args.attach, args.shards, clients=args.clients, eat_time=args.eat,
+                           timeout=args.timeout, seed=args.seed)
+    except OSError as e:
+        print(f"[Loadgen] Brak managera do obciążenia: {e}")
+        sys.exit(1)
+
+    saturated = saturation(results, args.max_p99_ms)
+    print_results(results, saturated)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'steps': results, 'saturation': saturated}, f, indent=2)
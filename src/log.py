@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import atexit
+import select
+import threading
+import multiprocessing.util
+from collections import deque
+from config import LOG_LEVEL, LOG_FILE, LOG_FLUSH_INTERVAL, LOG_RING_SIZE, LOG_WRITE_TIMEOUT
+
+"""
+Moduł log – buforowane logowanie zamiast print(flush=True) w gorących pętlach:
+- poziomy DEBUG < INFO < WARNING < ERROR, próg z LOG_LEVEL; wpis poniżej progu kończy się na jednym porównaniu
+- wpis to krotka (poziom, nazwa, format, argumenty) dopisywana do bufora pierścieniowego procesu (deque z maxlen,
+  append jest atomowy, więc bez blokad); tekst powstaje dopiero w wątku zapisującym
+- wątek zapisujący co LOG_FLUSH_INTERVAL formatuje wszystko, co się zebrało, i zapisuje paczką
+  do stdout albo do LOG_FILE (całe linie, po najwyżej PIPE_BUF bajtów na zapis, więc procesy nie przeplatają linii)
+- każdy proces ma własny bufor i wątek (po fork zaczynamy od pustego bufora)
+- przed końcem procesu wołamy flush() w finally; dodatkowo flush() jest rejestrowane w atexit i w finalizerach
+  multiprocessing (procesy potomne kończą się przez os._exit, bez atexit)
+
+Argumenty formatowane są później, więc zmienne obiekty (słowniki, listy) trzeba przekazywać jako kopie.
+
+Użycie:
+    log = get_logger("Manager")
+    log.debug("Klient %s zajął miejsce przy stoliku %s", customer_id, table_id)   # -> "[Manager] Klient ..."
+"""
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+PIPE_BUF = 4096 # zapisy do potoku do tej wielkości są atomowe
+
+_level = LEVELS[LOG_LEVEL]
+_ring = deque(maxlen=LOG_RING_SIZE)
+_dropped = [0] # wpisy nadpisane, bo wątek zapisujący nie nadążał
+_drain_lock = threading.Lock()
+_writer = None # wątek zapisujący tego procesu, uruchamiany przy pierwszym wpisie
+_out_fd = None
+
+
+class Logger:
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: int) -> bool:
+        return level >= _level
+
+    def debug(self, fmt: str, *args):
+        if _level <= DEBUG:
+            _append(DEBUG, self.name, fmt, args)
+
+    def info(self, fmt: str, *args):
+        if _level <= INFO:
+            _append(INFO, self.name, fmt, args)
+
+    def warning(self, fmt: str, *args):
+        if _level <= WARNING:
+            _append(WARNING, self.name, fmt, args)
+
+    def error(self, fmt: str, *args):
+        # błędy zapisujemy od razu, proces może zaraz się skończyć
+        _append(ERROR, self.name, fmt, args)
+        flush()
+
+
+def get_logger(name: str) -> Logger:
+    return Logger(name)
+
+
+def set_level(level):
+    global _level
+    _level = LEVELS[level] if isinstance(level, str) else level
+
+
+def flush():
+    """Formatuje i zapisuje wszystko z bufora tego procesu (wywoływać w finally procesów)."""
+    with _drain_lock:
+        _drain()
+
+
+def _append(level, name, fmt, args):
+    if len(_ring) == LOG_RING_SIZE:
+        _dropped[0] += 1
+    _ring.append((level, name, fmt, args))
+    if _writer is None:
+        _start_writer()
+
+
+def _start_writer():
+    global _writer
+    with _drain_lock:
+        if _writer is not None:
+            return
+        _writer = threading.Thread(target=_writer_loop, name="log-writer", daemon=True)
+        _writer.start()
+    # proces potomny multiprocessing uruchamia przy wyjściu swoje finalizery, ale nie atexit
+    multiprocessing.util.Finalize(None, flush, exitpriority=0)
+
+
+def _writer_loop():
+    stop = threading.Event() # tylko do czekania z limitem czasu
+    while True:
+        stop.wait(LOG_FLUSH_INTERVAL)
+        with _drain_lock:
+            _drain()
+
+
+def _format(level, name, fmt, args) -> str:
+    try:
+        message = fmt % args if args else fmt
+    except (TypeError, ValueError) as e:
+        message = f"{fmt} {args!r} (błąd formatowania: {e})"
+    return f"[{name}] {message}\n"
+
+
+def _drain():
+    if not _ring and not _dropped[0]:
+        return
+    lines = []
+    if _dropped[0]:
+        lines.append(f"[Log] Pominięto {_dropped[0]} wpisów (pełny bufor).\n")
+        _dropped[0] = 0
+    while True:
+        try:
+            entry = _ring.popleft()
+        except IndexError:
+            break
+        lines.append(_format(*entry))
+    _write_lines(lines)
+
+
+def _write_lines(lines):
+    global _out_fd
+    if _out_fd is None:
+        if LOG_FILE:
+            _out_fd = os.open(LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        else:
+            sys.stdout.flush() # to, co ktoś wypisał print(), ma się pojawić przed naszymi liniami
+            try:
+                _out_fd = sys.stdout.fileno()
+            except (AttributeError, ValueError, OSError):
+                _out_fd = -1 # stdout podmieniony (np. przechwytywany w testach) - piszemy przez sys.stdout
+
+    if _out_fd == -1:
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
+        return
+
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        if chunk and size + len(data) > PIPE_BUF:
+            _write_all(b"".join(chunk))
+            chunk, size = [], 0
+        chunk.append(data)
+        size += len(data)
+    if chunk:
+        _write_all(b"".join(chunk))
+
+
+def _write_all(data: bytes):
+    deadline = None
+    while data:
+        try:
+            written = os.write(_out_fd, data)
+        except BlockingIOError:
+            # nieblokujący potok jest pełny - czekamy, aż czytelnik coś zabierze, zamiast kręcić się w pętli
+            if deadline is None:
+                deadline = time.monotonic() + LOG_WRITE_TIMEOUT
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([], [_out_fd], [], remaining)[1]:
+                return # czytelnik nic nie zabiera - porzucamy resztę paczki
+            continue
+        except OSError:
+            return # np. stdout zamknięty (EPIPE) - logów nie ma gdzie pisać
+        data = data[written:]
+
+
+def _after_fork_in_child():
+    # wpisy rodzica zapisze rodzic; dziecko startuje z pustym buforem i własnym wątkiem
+    global _ring, _drain_lock, _writer
+    _ring = deque(maxlen=LOG_RING_SIZE)
+    _dropped[0] = 0
+    _drain_lock = threading.Lock()
+    _writer = None
+
+
+atexit.register(flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,40 +1,67 @@
-from multiprocessing import Value, Process, Queue, Event
+from multiprocessing import Value, Process, Queue, get_context
 import signal
-from config import MAX_CONCURRENT_CUSTOMERS, SHUTDOWN_SIGNAL, FIRE_SIGNAL
-from manager import manager_process
-from firefighter import firefighter_process
-from gui import gui_process
+from config import MAX_CONCURRENT_CUSTOMERS, SHUTDOWN_SIGNAL, FIRE_SIGNAL, CUSTOMER_ARRIVAL_INTERVAL, CUSTOMER_POOL_WORKERS, CUSTOMER_POOL_MAX_GROUPS, TABLE_COUNTS, USE_SHARED_BOARD, BOARD_MAX_TABLES, GROUP_SIZE_WEIGHTS, MANAGER_SHARDS, METRICS_HOST, SUPERVISOR_METRICS_PORT, TRACE_FILE
 from customer import customer_process
+from supervisor import CustomerSupervisor, customer_context
+from metrics import MetricsRegistry, start_metrics_server
+from utils import write_stats_log, seed_random
+from clock import get_clock
+from runtrace import TraceWriter
+from profiling import profiled, profile_mode, clear_profiles
+import log
 import time
 import traceback
 import random
 import os
+import queue as queue_module
 from setproctitle import setproctitle
 
 """
 Moduł main:
-- tworzy kolejkę (Queue) dla GUI
-- uruchamia procesy: Manager, Firefighter, GUI
+- tworzy kolejkę (Queue) dla GUI i tablicę stolików w pamięci współdzielonej (TableBoard)
+- uruchamia procesy: Manager (albo MANAGER_SHARDS shardów managera, każdy z własną tablicą), Firefighter, GUI
+- przy kilku shardach zbiera od nich statystyki (stats_queue) i zapisuje jedną sumę do pizzeria_log.txt
 - w pętli tworzy procesy-Klientów (customer_process)
-- nadzoruje liczbę aktywnych klientów (MAX_CONCURRENT_CUSTOMERS)
+  albo, gdy CUSTOMER_POOL_WORKERS > 0, przekazuje grupy do puli procesów roboczych (CustomerPool)
+- nadzoruje liczbę aktywnych klientów (MAX_CONCURRENT_CUSTOMERS) przez CustomerSupervisor: czeka na sentinelach
+  procesów zamiast odpytywać is_alive(), zakończonych klientów zbiera od razu (metryki na SUPERVISOR_METRICS_PORT)
+- klientów uruchamia z forkserwera z zaimportowanym tylko tym, czego potrzebuje customer_process (CUSTOMER_START_METHOD)
 - obsługuje sygnały SHUTDOWN_SIGNAL i FIRE_SIGNAL
+- odstępy między klientami liczy w czasie modelu (clock.py, PIZZERIA_TIME_SCALE przyspiesza całą symulację)
+- zapisuje przyjścia klientów do śladu przebiegu (TRACE_FILE, runtrace.py); przy RANDOM_SEED losuje powtarzalnie
+- przy PIZZERIA_PROFILE czyści PROFILE_DIR; każdy proces (także main) zapisuje tam swój profil (profiling.py)
+
+Moduły pozostałych procesów (manager, gui, firefighter, pula, board) importujemy dopiero w main():
+proces z forkserwera przed customer_process wykonuje ponownie górę modułu głównego (tak działa
+multiprocessing dla __main__), więc tutaj zostaje tylko to, co klient i tak ma zaimportowane.
 """
 
+@profiled
 def main():
+    from manager import manager_process
+    from firefighter import firefighter_process
+    from gui import gui_process
+    from customer_pool import CustomerPool
+    from board import TableBoard, ShardedBoard
+
     setproctitle("MainProcess")
+    logger = log.get_logger("Main")
 
-    fire_event = Event()
-    close_event = Event()
+    # klienci startują z forkserwera (CUSTOMER_START_METHOD), więc eventy, które dostają, muszą być z tego kontekstu;
+    # pula (CUSTOMER_POOL_WORKERS > 0) ma własne procesy robocze forkowane z main
+    customer_ctx = customer_context() if CUSTOMER_POOL_WORKERS == 0 else get_context("fork")
+    fire_event = customer_ctx.Event()
+    close_event = customer_ctx.Event()
 
     is_running = Value('b', True) # do sprawdzania czy symulacja wciąż żyje
 
         # obsługa sygnału CTRL + C lub FIRE
     def handle_signal(signum, frame):
         if signum == SHUTDOWN_SIGNAL:
-            print(f"[Main] Otrzymałem sygnał zakończenia symulacji. Zakańczanie symulacji.")
+            logger.info("Otrzymałem sygnał zakończenia symulacji. Zakańczanie symulacji.")
             is_running.value = False
         if signum == FIRE_SIGNAL:
-            print(f"[Main] Otrzymałem sygnał pożaru.")
+            logger.info("Otrzymałem sygnał pożaru.")
 
     signal.signal(SHUTDOWN_SIGNAL, handle_signal)
     signal.signal(FIRE_SIGNAL, handle_signal)
@@ -44,22 +71,45 @@ def main():
         os.makedirs("fifo")
 
     gui_queue = Queue()
-    
+
+    # stan stolików dla GUI w pamięci współdzielonej zamiast komunikatów w gui_queue (osobna tablica na shard)
+    boards = []
+    if USE_SHARED_BOARD:
+        boards = [TableBoard.create(max(BOARD_MAX_TABLES, sum(TABLE_COUNTS.values()))) for _ in range(MANAGER_SHARDS)]
+    board = None
+    if len(boards) == 1:
+        board = boards[0]
+    elif boards:
+        board = ShardedBoard(boards)
+
     start_time = time.time()
+    clock = get_clock()
+    seed_random("Main")
+    # nowy ślad przebiegu; Firefighter i klienci dopisują do niego swoje rekordy
+    trace = TraceWriter(TRACE_FILE, truncate=True)
+    trace.header(start_time)
+    if profile_mode():
+        # profile poprzedniego przebiegu; każdy proces tego przebiegu zapisze własny przy wyjściu (profiling.py)
+        clear_profiles()
+
+    # Manager - start (przy MANAGER_SHARDS > 1 statystyki shardów wracają przez stats_queue)
+    stats_queue = Queue() if MANAGER_SHARDS > 1 else None
+    manager_procs = []
+    for shard in range(MANAGER_SHARDS):
+        manager_proc = Process(
+            target=manager_process,
+            args=(gui_queue, fire_event, close_event, start_time, boards[shard] if boards else None,
+                  shard, MANAGER_SHARDS, stats_queue),
+            name="ManagerProcess" if MANAGER_SHARDS == 1 else f"ManagerProcess-{shard}"
+        )
+        manager_proc.start()
+        manager_procs.append(manager_proc)
+    manager_pids = [p.pid for p in manager_procs] # będą potrzebne by Firefighter mógł przesłać sygnał do Managerów
 
-    # Manager - start
-    manager_proc = Process(
-        target=manager_process,
-        args=(gui_queue, fire_event, close_event, start_time),
-        name="ManagerProcess"
-    )
-    manager_proc.start()
-    manager_pid = manager_proc.pid # będzie potrzebny by Firefighter mógł przesłać sygnał do Manager
-    
     # Strażak - start
     firefighter_proc = Process(
         target=firefighter_process,
-        args=(manager_pid, fire_event, close_event),
+        args=(manager_pids, fire_event, close_event),
         name="FirefighterProcess"
     )
     firefighter_proc.start()
@@ -67,83 +117,145 @@ def main():
     # GUI - start
     gui_proc = Process(
         target=gui_process,
-        args=(gui_queue, close_event),
+        args=(gui_queue, close_event, board),
         name="GUIProcess"
     )
     gui_proc.start()
 
     # Klienci - start
-    customer_procs = []
+    supervisor_metrics = MetricsRegistry()
+    supervisor = CustomerSupervisor(MAX_CONCURRENT_CUSTOMERS, supervisor_metrics, context=customer_ctx)
+    supervisor_metrics_server = None
+    if SUPERVISOR_METRICS_PORT and CUSTOMER_POOL_WORKERS == 0:
+        try:
+            supervisor_metrics_server = start_metrics_server(supervisor_metrics, METRICS_HOST, SUPERVISOR_METRICS_PORT)
+        except OSError as e:
+            logger.warning("Nie można uruchomić serwera metryk klientów: %s", e)
+
+    def should_stop():
+        return close_event.is_set() or not is_running.value
+
     customer_id_counter = 0
+    group_sizes = list(GROUP_SIZE_WEIGHTS.keys())
+    group_weights = list(GROUP_SIZE_WEIGHTS.values())
+    customer_pool = None
+    if CUSTOMER_POOL_WORKERS > 0:
+        customer_pool = CustomerPool(CUSTOMER_POOL_WORKERS, fire_event, close_event)
 
     # Rozpoczynamy symulacje
     try:
         while is_running.value:
-            # Wyczyść tych klientów którzy skończyli, by sprawdzać tylko ile jest aktywnych
-            alive = []
-            for cp in customer_procs:
-                if cp.is_alive():
-                    alive.append(cp)
-                else:
-                    cp.join()
-            customer_procs = alive
-
-            # limity
-            if len(customer_procs) >= MAX_CONCURRENT_CUSTOMERS:
-                while len(customer_procs) >= MAX_CONCURRENT_CUSTOMERS and not close_event.is_set():
-                    new_list = []
-                    # tak długo jak ilosc klientów jest za duża próbkujemy ich stan i czekamy, aż ilość będzie ok
-                    for cp in customer_procs:
-                        if cp.is_alive():
-                            new_list.append(cp)
-                        else:
-                            cp.join()
-                    customer_procs = new_list
-
-            print(f"[Main] Obecnie CustomerProcs={len(customer_procs)} aktywnych.", flush=True) # do testów
-
-            group_size = random.choices([1, 2, 3], weights=[0.4, 0.4, 0.2])[0] # by częściej się pojawiały mniejsze grupy
+            if customer_pool is not None:
+                # tryb puli - limit dotyczy grup, a nie procesów; pracownicy budzą nas, gdy grupy wychodzą
+                if not customer_pool.wait_for_slot(CUSTOMER_POOL_MAX_GROUPS, should_stop):
+                    break
+
+                logger.info("Obecnie grup w puli=%s aktywnych.", customer_pool.active())
+
+                group_size = random.choices(group_sizes, weights=group_weights)[0]
+                trace.arrival(customer_id_counter, group_size)
+                customer_pool.submit(group_size, customer_id_counter)
+                customer_id_counter += 1
+
+                clock.sleep(random.uniform(*CUSTOMER_ARRIVAL_INTERVAL))
+                continue
+
+            # limity - czekamy na sentinelach procesów klientów, zakończonych zbieramy od razu
+            if not supervisor.wait_for_slot(should_stop):
+                break
+
+            logger.info("Obecnie CustomerProcs=%s aktywnych.", len(supervisor)) # do testów (poziom INFO)
+
+            group_size = random.choices(group_sizes, weights=group_weights)[0] # by częściej się pojawiały mniejsze grupy
 
             # generowanie klientów
-            p = Process(
-                target=customer_process,
-                args=(fire_event, close_event, group_size, customer_id_counter),
-                name=f"Customer-{customer_id_counter}"
+            trace.arrival(customer_id_counter, group_size)
+            supervisor.spawn(
+                customer_process,
+                (fire_event, close_event, group_size, customer_id_counter),
+                f"Customer-{customer_id_counter}",
+                customer_id_counter
             )
-            p.start()
-            customer_procs.append(p)
             customer_id_counter += 1
 
-
-            # Nowy klient co 0.5..1 sekundy
-            time.sleep(random.uniform(0.5, 1))
+            # Nowy klient co 0.5..1 sekundy czasu modelu (w tym czasie zbieramy kończących się klientów)
+            if not supervisor.sleep(clock.real(random.uniform(*CUSTOMER_ARRIVAL_INTERVAL)), should_stop):
+                break
 
         # SHUTDOWN_SIGNAL zamyka pętle w MAIN
         # po wyjsciu z ustawiana jest flaga close_event dla pozostałych procesów
         close_event.set()
         
     except Exception as e:
-        print("[Main] ERROR:", e)
+        logger.error("ERROR: %s", e)
         traceback.print_exc()
         close_event.set()
     finally:
         # Czekamy aż wszystkie procesy się zakończą
-        print("[Main] Czekam na zakończenie wszystkich procesów...")
-        for cp in customer_procs:
-            cp.join()
-        print("[Main] Wszyscy klienci wykończeni...")
+        logger.info("Czekam na zakończenie wszystkich procesów...")
+        supervisor.join_all()
+        if supervisor.spawned_total.value:
+            logger.info("Klienci: start -> prośba o stolik p50=%.1f ms p99=%.1f ms, zebranie po wyjściu p50=%.1f ms p99=%.1f ms",
+                        supervisor.spawn_ready.percentile(0.5) * 1000, supervisor.spawn_ready.percentile(0.99) * 1000,
+                        supervisor.reap_lag.percentile(0.5) * 1000, supervisor.reap_lag.percentile(0.99) * 1000)
+        supervisor.close()
+        if supervisor_metrics_server is not None:
+            supervisor_metrics_server.shutdown()
+            supervisor_metrics_server.server_close()
+        if customer_pool is not None:
+            customer_pool.join()
+        logger.info("Wszyscy klienci wykończeni...")
 
         if firefighter_proc.is_alive():
             firefighter_proc.join()
-        print("[Main] Firefighter wykończony...")
+        logger.info("Firefighter wykończony...")
 
         while not gui_queue.empty(): gui_queue.get()
-        if manager_proc.is_alive():
-            manager_proc.join()
-        print("[Main] Manager wykończony...")
+        if stats_queue is not None:
+            write_shard_stats(stats_queue, manager_procs, start_time, logger)
+        for manager_proc in manager_procs:
+            if manager_proc.is_alive():
+                manager_proc.join()
+        logger.info("Manager wykończony...")
         
         gui_proc.join()
-        print("[Main] Symulacja zakończona pomyślnie.")
+        trace.close()
+
+        for shard_board in boards:
+            shard_board.close()
+            shard_board.unlink()
+        logger.info("Symulacja zakończona pomyślnie.")
+        log.flush()
+
+def write_shard_stats(stats_queue: Queue, manager_procs: list, start_time: float, logger):
+    """Suma statystyk wszystkich shardów managera do pizzeria_log.txt (jeden wpis jak przy jednym managerze)."""
+    total_profit = 0
+    group_accepted = {size: 0 for size in GROUP_SIZE_WEIGHTS}
+    group_rejected = {size: 0 for size in GROUP_SIZE_WEIGHTS}
+    table_usage = {size: 0 for size in TABLE_COUNTS}
+    received = 0
+    while received < len(manager_procs):
+        try:
+            _, profit, accepted, rejected, usage = stats_queue.get(timeout=1)
+        except queue_module.Empty:
+            if not any(p.is_alive() for p in manager_procs):
+                break # shard, który padł, nie odeśle statystyk
+            continue
+        received += 1
+        total_profit += profit
+        for size, count in accepted.items():
+            group_accepted[size] = group_accepted.get(size, 0) + count
+        for size, count in rejected.items():
+            group_rejected[size] = group_rejected.get(size, 0) + count
+        for size, count in usage.items():
+            table_usage[size] = table_usage.get(size, 0) + count
+
+    logger.info("Całkowity profit (%s z %s shardów) = %s", received, len(manager_procs), total_profit)
+    try:
+        write_stats_log("pizzeria_log.txt", start_time, time.time(), total_profit, group_accepted, group_rejected, table_usage)
+    except Exception as file_err:
+        logger.error("Błąd zapisu do pizzeria_log.txt: %s", file_err)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
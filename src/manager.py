@@ -1,5 +1,20 @@
-from config import TABLE_COUNTS, CLOSURE_DURATION_AFTER_FIRE, SERVER_FIFO
+from config import TABLE_COUNTS, CLOSURE_DURATION_AFTER_FIRE, FIRE_SIGNAL, MANAGER_POLL_TIMEOUT, FIFO_READ_CHUNK, OUTBOX_RETRY_INTERVAL, GROUP_SIZE_WEIGHTS, PROFIT_PER_PERSON, METRICS_HOST, METRICS_PORT, TIMELINE_FILE, TIMELINE_INTERVAL, WAITLIST_ENABLED, SEATING_POLICY, EVACUATION_SLO_SECONDS, WAITLIST_MAX_WAIT
+from utils import read_available, flush_requests, raise_fd_limit, write_stats_log, shard_path, seed_random
+from outbox import ReplyOutbox
+from board import TableBoard, TABLE_ABSENT, TABLE_CLOSED
+from protocol import REQUEST_SEAT, CUSTOMER_DONE, SEATED, REJECTED, LEAVE, encode_request, encode_reply, decode_requests, customer_fifo_path, server_fifo_path, control_fifo_path, describe
+from tables import TableStore
+from metrics import MetricsRegistry, start_metrics_server
+from profiling import profiled
+import log
+from timeline import TimelineWriter, TimelineRecorder
+from waitlist import Waitlist
+from evacuation import Evacuation
+from clock import get_clock
+from control import decode_commands
 import time
+import selectors
+import signal
 import traceback
 from multiprocessing import Queue, Event
 import random
@@ -13,288 +28,572 @@ Moduł manager: główny proces zarządzający pizzerią.
 Odpowiedzialności:
 1. Obsługa żądań o stolik ("REQUEST_SEAT") od klientów (customer_process)
 2. Ustalanie, czy pizzeria jest otwarta (pizzeria_open) lub zamknięta (podczas pożaru)
-3. Selekcja i przydzielanie miejsc przy stolikach (seat_customer_group)
+3. Selekcja i przydzielanie miejsc przy stolikach (seat_customer_group, strategia SEATING_POLICY z policies.py);
+   przy WAITLIST_ENABLED grupa bez miejsca czeka na liście oczekujących (waitlist.py) zamiast od razu dostać REJECTED
 4. Reagowanie na zakończenie jedzenia klientów ("CUSTOMER_DONE") – zwalnianie miejsc
-5. Ewentualna ewakuacja przy pożarze (fire_event) na określony czas (CLOSURE_DURATION_AFTER_FIRE)
-6. Aktualizacja informacji w GUI (gui_queue) – np. PROFI_UPDATE, TABLE_UPDATE, TABLE_FIRE
-7. Przy zakończeniu (close_event) lub sygnale SHUTDOWN_SIGNAL, loguje statystyki do pliku (pizzeria_log.txt) i kończy działanie
+5. Ewentualna ewakuacja przy pożarze (fire_event) na określony czas (CLOSURE_DURATION_AFTER_FIRE):
+   od razu po sygnale wszystkie czekające w fifo prośby dostają LEAVE jedną paczką (flush_requests),
+   a czas od sygnału do wyjścia ostatniego klienta (evacuation.py) trafia do metryk z progiem EVACUATION_SLO_SECONDS
+6. Aktualizacja informacji w GUI – w tablicy w pamięci współdzielonej (board) albo przez gui_queue (PROFIT_UPDATE, TABLE_UPDATE, FLOOR_FIRE)
+7. Przebieg w czasie (timeline.py): co TIMELINE_INTERVAL sekund rekord do TIMELINE_FILE
+8. Metryki na żywo (metrics.py): histogramy czasu oczekiwania prośby, decyzji o stoliku i zapisu odpowiedzi,
+   liczniki przyjętych / odrzuconych / odesłanych grup, pod http://METRICS_HOST:METRICS_PORT/metrics
+9. Przy zakończeniu (close_event) lub sygnale SHUTDOWN_SIGNAL, loguje statystyki do pliku (pizzeria_log.txt) i kończy działanie
+10. Przy MANAGER_SHARDS > 1 proces jest jednym z shardów: czyta server_fifo_path(shard), ma co shards-ty stolik,
+    grupę, której nie może posadzić, przekazuje do następnego shardu (hops w wiadomości), a dopiero ostatni ją odrzuca;
+    statystyki oddaje do stats_queue (sumuje je main), profit i stoliki pisze do własnej tablicy board,
+    metryki pod METRICS_PORT + shard, przebieg do shard_path(TIMELINE_FILE, shard)
+11. Zmiany sali w trakcie działania (control.py, fifo control_fifo_path(shard)): ADD / REMOVE / CLOSE / OPEN stolika
+    i RESET; tak jak otwarcie po pożarze dotykają tylko zmienionych stolików (indeksy, GUI, przebieg)
 """
 
-# Format: "client_fifo_name:REQUEST_SEAT group_size customer_id"
-#    lub: "client_fifo_name:CUSTOMER_DONE group_size table_id"
+# Format wiadomości: patrz protocol.py (PROTOCOL = "text" albo "binary")
                         
 
-def manager_process(gui_queue: Queue, fire_event: Event, close_event: Event, start_time: float):
-    setproctitle("ManagerProcess")
+@profiled
+def manager_process(gui_queue: Queue, fire_event: Event, close_event: Event, start_time: float, board: TableBoard = None,
+                    shard: int = 0, shards: int = 1, stats_queue: Queue = None):
+    name = "Manager" if shards == 1 else f"Manager-{shard}"
+    setproctitle(f"{name}Process")
+    raise_fd_limit() # trzymamy otwarte fifo wielu klientów naraz
     pizzeria_open = True
     total_profit = 0  # będziemy zliczać pieniążki
 
     # dane do statystyk
-    group_accepted = {1: 0, 2: 0, 3: 0} # liczba przyjętych grup danego rozmiaru
-    group_rejected = {1: 0, 2: 0, 3: 0} # liczba odrzuconych grup (z powodu braku miejsc, nie pożaru)
-    table_usage = {1: 0, 2: 0, 3: 0, 4: 0} # ile razy stolik danej pojemności został wykorzystany
-
-    def initialize_tables():
-        """
-        Tworzy słownik 'tables' na podstawie TABLE_COUNTS.
-        Struktura: tables[size] -> lista obiektów-stolików, np.:
-        { 1: [ {table_id:1, capacity:1, used_seats:0, group_size:None}, {table_id:2,...} ], ... }
-        """
-
-        tables = {}
-        table_id_counter = 1
-        for size, count in TABLE_COUNTS.items():
-            tables[size] = []
-            for _ in range(count):
-                tables[size].append({
-                    'table_id': table_id_counter,
-                    'capacity': size,
-                    'used_seats': 0,
-                    'group_size': None, # jaka grupa używa stołu, by ewentualnie grupa o tej samej ilości osób mogła się dosiąść
-                })
-                table_id_counter += 1
-        return tables
+    group_accepted = {size: 0 for size in GROUP_SIZE_WEIGHTS} # liczba przyjętych grup danego rozmiaru
+    group_rejected = {size: 0 for size in GROUP_SIZE_WEIGHTS} # liczba odrzuconych grup (z powodu braku miejsc, nie pożaru)
+    table_usage = {size: 0 for size in TABLE_COUNTS} # ile razy stolik danej pojemności został wykorzystany
 
-    tables = initialize_tables()
+    # Stoliki trzymamy w indeksowanym magazynie (tables.py), żeby nie skanować wszystkich przy każdym żądaniu
+    tables = TableStore(TABLE_COUNTS, SEATING_POLICY, shard, shards)
 
     # trzeba ustalić gdzie kto będzie siedział
-    def seat_customer_group(group_size):
-        # Szukamy najmniejszego stołu na początek
-        for size in sorted(tables.keys()):
-            if size >= group_size:
-                # Ewentualnie sprawdzamy czy nie ma wolnego miejsca przy stole gdzie ktoś już siedzi
-                for table in tables[size]:
-                    # No i oczywiście czy się zmieści ta grupa
-                    if table['group_size'] in (None, group_size):
-                        free = table['capacity'] - table['used_seats']
-                        if free >= group_size:
-                            # Jeśli wszystko się zgadza to zajmujemy miejsce
-                            old_seats = table['used_seats']
-                            table['used_seats'] += group_size
-                            if table['group_size'] is None:
-                                table['group_size'] = group_size
-                            # Zwraca obiekt 'table' (dict) jeśli się uda, None w przeciwnym wypadku
-                            return table
-        return None
-
-    print("[Manager] Proces rozpoczęty.")
+    def seat_customer_group(group_size, customer_id):
+        # Stolik wybiera strategia SEATING_POLICY (domyślnie najmniejszy pasujący), grupy tej samej wielkości mogą się dosiąść
+        # Zwraca obiekt 'table' (dict) jeśli się uda, None w przeciwnym wypadku; magazyn pamięta, kto przy nim siedzi
+        return tables.seat(group_size, customer_id)
+
+    logger = log.get_logger(name)
+    logger.info("Proces rozpoczęty.")
+    seed_random(name) # profit grup (przy RANDOM_SEED powtarzalny między przebiegami)
 
     # próba stworzenia fifo dla managera
+    server_fifo = server_fifo_path(shard)
     try:
-        if os.path.exists(SERVER_FIFO):
-            os.remove(SERVER_FIFO)
-        os.mkfifo(SERVER_FIFO)
-        print(f"[Manager] FIFO -> {SERVER_FIFO}")
+        if os.path.exists(server_fifo):
+            os.remove(server_fifo)
+        os.mkfifo(server_fifo)
+        logger.info("FIFO -> %s", server_fifo)
     except FileExistsError:
         pass
     
-    print("[Manager] Stoliki:", tables)
+    logger.info("Stoliki: %s", repr(tables.as_dict())) # repr od razu - stoliki zaraz się zmienią
 
     # otwarcie fifo managera
-    mf = os.open(SERVER_FIFO, os.O_RDONLY | os.O_NONBLOCK)
-    mff = os.fdopen(mf, "r")
-    
+    mf = os.open(server_fifo, os.O_RDONLY | os.O_NONBLOCK)
+    # trzymamy własny koniec do zapisu, żeby FIFO nie zwracało EOF gdy nie ma klientów
+    # (inaczej selector budziłby się w kółko i znowu mielibyśmy busy-wait)
+    keepalive_fd = os.open(server_fifo, os.O_WRONLY | os.O_NONBLOCK)
+
+    # pipe do budzenia managera sygnałem (pożar / zamknięcie)
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    fire_signal_at = None # kiedy przyszedł sygnał pożaru - początek pomiaru ewakuacji
+
+    def on_fire_signal(signum, frame):
+        nonlocal fire_signal_at
+        fire_signal_at = time.time()
+
+    signal.signal(FIRE_SIGNAL, on_fire_signal)
     try:
-        while not close_event.is_set():
-            if fire_event.is_set():
-                if pizzeria_open:
-                    # Ewakuacja
-                    print(f"[Manager] Pizzeria zamknięta na {CLOSURE_DURATION_AFTER_FIRE} sekund (pożar).")
-
-                    # Powiadamiamy GUI, że stoliki mają być 'czarne' (TABLE_FIRE)
-                    for size_list in tables.values():
-                        for t in size_list:
-                            gui_queue.put(("TABLE_FIRE", t['table_id']))
+        signal.set_wakeup_fd(wakeup_w)
+    except ValueError:
+        pass
 
-                pizzeria_open = False
+    selector = selectors.DefaultSelector()
+    selector.register(mf, selectors.EVENT_READ, "fifo")
+    selector.register(wakeup_r, selectors.EVENT_READ, "wakeup")
+
+    # fifo poleceń (control.py) - jak fifo managera, z własnym końcem do zapisu
+    control_fifo = control_fifo_path(shard)
+    if os.path.exists(control_fifo):
+        os.remove(control_fifo)
+    os.mkfifo(control_fifo)
+    cf = os.open(control_fifo, os.O_RDONLY | os.O_NONBLOCK)
+    control_keepalive_fd = os.open(control_fifo, os.O_WRONLY | os.O_NONBLOCK)
+    selector.register(cf, selectors.EVENT_READ, "control")
+    control_buffer = b""
+
+    # Aktualizacje dla GUI: zapis w miejscu do board, a bez board (USE_SHARED_BOARD = False) przez gui_queue
+    def publish_table(t):
+        closed = t['table_id'] in tables.closed
+        if board is not None:
+            with board.write():
+                if closed:
+                    board.set_table(t['table_id'], t['used_seats'], t['capacity'], t['group_size'], TABLE_CLOSED)
+                else:
+                    board.set_table(t['table_id'], t['used_seats'], t['capacity'], t['group_size'])
+        else:
+            gui_queue.put(("TABLE_CLOSED" if closed else "TABLE_UPDATE", (t['table_id'], t['used_seats'], t['capacity'])))
+            if not pizzeria_open:
+                # zmiana w trakcie pożaru (np. ADD) - GUI zapamięta stan do FLOOR_OPEN, a rysuje czarny
+                gui_queue.put(("TABLE_FIRE", t['table_id']))
+
+    def publish_removed(table_id):
+        if board is not None:
+            with board.write():
+                board.set_table(table_id, 0, 0, 0, TABLE_ABSENT)
+        else:
+            gui_queue.put(("TABLE_REMOVE", table_id))
+
+    def publish_profit():
+        if board is not None:
+            with board.write():
+                board.set_profit(total_profit)
+        else:
+            # przy kilku shardach GUI sumuje profity wszystkich
+            gui_queue.put(("PROFIT_UPDATE", total_profit if shards == 1 else (shard, total_profit)))
+
+    def publish_fire():
+        if board is not None:
+            # sama flaga - odczyt tablicy pokazuje wtedy wszystkie stoliki jako TABLE_FIRE
+            with board.write():
+                board.set_fire(True)
+        else:
+            # jeden komunikat na całą salę (przy kilku shardach - stoliki tego shardu)
+            gui_queue.put(("FLOOR_FIRE", tuple(t['table_id'] for t in tables)))
+
+    def publish_all_tables():
+        if board is not None:
+            with board.write():
+                board.set_fire(False)
+                for t in tables:
+                    board.set_table(t['table_id'], t['used_seats'], t['capacity'], t['group_size'])
+        else:
+            for t in tables:
+                publish_table(t)
+
+    def publish_reopen(changed):
+        # koniec pożaru: GUI wraca do stanu sprzed pożaru, osobno tylko stoliki opróżnione przez clear_seats
+        if board is not None:
+            with board.write():
+                board.set_fire(False)
+        else:
+            gui_queue.put(("FLOOR_OPEN", tuple(t['table_id'] for t in tables)))
+        publish_changed(changed)
+
+    def publish_changed(changed):
+        for t in changed:
+            if t['table_id'] in tables:
+                publish_table(t)
+            else:
+                # usuwany stolik zniknął razem z ostatnimi gośćmi
+                timeline.remove_table(t['table_id'], time.time())
+                publish_removed(t['table_id'])
+
+    if board is not None:
+        publish_all_tables()
+
+    # odpowiedzi do klientów idą przez skrzynkę nadawczą, więc wolny klient nie blokuje pętli
+    outbox = ReplyOutbox(selector)
+
+    # metryki: zapis tutaj, odczyt przez /metrics w wątku serwera
+    metrics = MetricsRegistry()
+    wait_time = metrics.histogram("pizzeria_request_wait_seconds", "Od wysłania prośby przez klienta do odebrania jej przez managera.")
+    decision_time = metrics.histogram("pizzeria_seating_decision_seconds", "Czas wyboru stolika (seat_customer_group).")
+    reply_time = metrics.histogram("pizzeria_reply_write_seconds", "Czas przekazania odpowiedzi do skrzynki nadawczej (z próbą zapisu).")
+    accepted_total = metrics.counter("pizzeria_groups_accepted_total", "Grupy posadzone przy stoliku.")
+    rejected_total = metrics.counter("pizzeria_groups_rejected_total", "Grupy odrzucone z braku miejsc.")
+    evacuated_total = metrics.counter("pizzeria_groups_evacuated_total", "Grupy odesłane (LEAVE), bo pizzeria była zamknięta po pożarze.")
+    released_total = metrics.counter("pizzeria_groups_released_total", "Grupy, które zjadły i zwolniły miejsca (CUSTOMER_DONE).")
+    queue_depth = metrics.gauge("pizzeria_request_queue_depth", "Wiadomości odczytane z SERVER_FIFO w ostatnim wybudzeniu managera.")
+    outbox_pending = metrics.gauge("pizzeria_outbox_pending", "Klienci z niewysłaną jeszcze odpowiedzią.")
+    waitlisted_total = metrics.counter("pizzeria_groups_waitlisted_total", "Grupy dopisane do listy oczekujących.")
+    waitlist_seated_total = metrics.counter("pizzeria_waitlist_seated_total", "Grupy posadzone z listy oczekujących.")
+    waitlist_wait = metrics.histogram("pizzeria_waitlist_wait_seconds", "Czas na liście oczekujących do posadzenia.")
+    waitlist_length = metrics.gauge("pizzeria_waitlist_length", "Grupy czekające teraz na liście oczekujących.")
+    handoff_total = metrics.counter("pizzeria_groups_handed_off_total", "Grupy przekazane do następnego shardu managera.")
+    handoff_failed_total = metrics.counter("pizzeria_handoff_failed_total", "Nieudane przekazania (shard nie czyta albo pełne fifo).")
+    evacuation_time = metrics.histogram("pizzeria_evacuation_seconds", "Od sygnału pożaru do wyjścia ostatniego klienta.")
+    evacuation_breaches_total = metrics.counter("pizzeria_evacuation_slo_breaches_total",
+                                                f"Ewakuacje dłuższe niż EVACUATION_SLO_SECONDS={EVACUATION_SLO_SECONDS} s albo niepełne.")
+
+    metrics_server = None
+    if METRICS_PORT:
+        metrics_port = METRICS_PORT + shard
+        try:
+            metrics_server = start_metrics_server(metrics, METRICS_HOST, metrics_port)
+            logger.info("Metryki -> http://%s:%s/metrics", METRICS_HOST, metrics_port)
+        except OSError as e:
+            logger.warning("Nie można uruchomić serwera metryk: %s", e)
+
+    # przebieg w czasie - rekordy dopisywane w trakcie działania, więc awaria nie zabiera wszystkiego
+    timeline_file = shard_path(TIMELINE_FILE, shard) if TIMELINE_FILE else None
+    timeline = TimelineRecorder(
+        TimelineWriter(timeline_file) if timeline_file else None,
+        tables, GROUP_SIZE_WEIGHTS, TIMELINE_INTERVAL, time.time()
+    )
+
+    # deskryptory do fifo następnego shardu (otwierane przy pierwszym przekazaniu)
+    next_shard = (shard + 1) % shards
+    handoff_fds = {}
+
+    # grupy bez miejsca czekające na CUSTOMER_DONE innych (wpis: (customer_id, client_fifo))
+    waitlist = Waitlist(GROUP_SIZE_WEIGHTS, max_wait=get_clock().real(WAITLIST_MAX_WAIT)) if WAITLIST_ENABLED else None
+
+    evacuation = None # trwająca albo ostatnia ewakuacja (Evacuation)
+
+    def send_reply(client_fifo, data, close_after=False):
+        start = time.perf_counter()
+        outbox.send(client_fifo, data, close_after=close_after)
+        reply_time.record(time.perf_counter() - start)
+
+    def seat_group(tbl, group_size, customer_id, client_fifo, now):
+        nonlocal total_profit
+        table_id = tbl['table_id']
+        # Udało się usiąść => SEATED
+        group_profit = group_size * random.randint(*PROFIT_PER_PERSON)
+        total_profit += group_profit
+
+        # Informacja do GUI o wzroście zysku
+        publish_profit()
+
+        # Statystyki do pliku
+        if group_size in group_accepted:
+            group_accepted[group_size] += 1
+
+        table_usage[tbl['capacity']] = table_usage.get(tbl['capacity'], 0) + 1 # pojemność mogła dojść przez ADD
+        accepted_total.inc()
+        timeline.seated(tbl, group_size, group_profit, now)
+
+        logger.debug(
+            "Klient %s zajął miejsce (ilość osób=%s) przy stoliku %s Profit+=%s, Całkowity profit=%s",
+            customer_id, group_size, table_id, group_profit, total_profit
+        )
+
+        # update GUI o ilości osób przy stoliku
+        publish_table(tbl)
+
+        send_reply(client_fifo, encode_reply(SEATED, group_size, customer_id, table_id))
+
+    def reject_group(group_size, customer_id, client_fifo):
+        logger.debug("Klient %s nie mógł usiąść (ilość osób=%s). Brak miejsca.", customer_id, group_size)
+
+        # Statystyki do pliku
+        if group_size in group_rejected:
+            group_rejected[group_size] += 1
+        rejected_total.inc()
+        timeline.rejected_group(group_size)
+
+        send_reply(client_fifo, encode_reply(REJECTED, group_size, customer_id, 0), close_after=True)
+
+    def hand_off(group_size, customer_id, client_fifo, sent_at, hops):
+        # nie do zapisu blokującego: dwa shardy przekazujące sobie nawzajem przy pełnych fifo by się zakleszczyły
+        message = encode_request(REQUEST_SEAT, group_size, customer_id, 0, client_fifo, sent_at=sent_at, hops=hops + 1)
+        try:
+            if next_shard not in handoff_fds:
+                handoff_fds[next_shard] = os.open(server_fifo_path(next_shard), os.O_WRONLY | os.O_NONBLOCK)
+            os.write(handoff_fds[next_shard], message)
+        except OSError as e:
+            # BlockingIOError - fifo pełne, deskryptor zostaje; inne (shard jeszcze / już nie czyta) - otworzymy od nowa
+            logger.debug("Nie można przekazać klienta %s do shardu %s: %s", customer_id, next_shard, e)
+            handoff_failed_total.inc()
+            if not isinstance(e, BlockingIOError) and next_shard in handoff_fds:
+                os.close(handoff_fds.pop(next_shard))
+            return False
+        handoff_total.inc()
+        return True
+
+    def seat_from_waitlist(table, now):
+        # zwolnione miejsca przy 'table' - sadzamy najdłużej czekających, dopóki ktoś się mieści;
+        # najpierw REJECTED dla tych, którym minął WAITLIST_MAX_WAIT (koniec pętli mógł jeszcze do nich nie dojść)
+        expire_waitlist(now)
+        while True:
+            match = waitlist.pop_for(table, now)
+            if match is None:
+                return
+            group_size, (customer_id, client_fifo), waited = match
+            # stolik 'table' mieści tę grupę, więc seat_customer_group na pewno coś znajdzie
+            tbl = seat_customer_group(group_size, customer_id)
+            waitlist_seated_total.inc()
+            waitlist_wait.record(waited)
+            seat_group(tbl, group_size, customer_id, client_fifo, now)
+
+    def expire_waitlist(now):
+        for group_size, (customer_id, client_fifo) in waitlist.expire(now):
+            reject_group(group_size, customer_id, client_fifo)
+
+    def evacuate_waitlist(now):
+        # pożar - czekający jeszcze nic nie zamówili, po prostu odchodzą
+        expire_waitlist(now)
+        for group_size, (customer_id, client_fifo) in waitlist.drain(now):
+            send_leave(group_size, customer_id, client_fifo)
+
+    def send_leave(group_size, customer_id, client_fifo):
+        evacuated_total.inc()
+        timeline.evacuated_group()
+        if evacuation is not None:
+            evacuation.leave_sent(client_fifo)
+        send_reply(client_fifo, encode_reply(LEAVE, group_size, customer_id, 0), close_after=True)
+
+    def handle_message(msg, received_at):
+        msg_type, group_size, customer_id, table_id, client_fifo, sent_at, hops = msg
+        if logger.enabled(log.DEBUG):
+            logger.debug("Odebrano: %s.", describe(msg))
+        if sent_at:
+            wait_time.record(received_at - sent_at)
+
+        if msg_type == REQUEST_SEAT:
+            if hops == 0:
+                timeline.arrival(group_size) # przekazane grupy przyszły już do poprzedniego shardu
+            tables.observe(group_size)
+            # w protokole binarnym fifo klienta wynika z customer_id
+            if client_fifo is None:
+                client_fifo = customer_fifo_path(customer_id)
+
+            # pożar mógł wybuchnąć w trakcie obsługi paczki wiadomości
+            if not pizzeria_open or fire_event.is_set():
+                logger.debug("Pizzeria zamknięta. Informowanie klienta %s by wyszedł.", customer_id)
+                send_leave(group_size, customer_id, client_fifo)
+                return
+            
+            decision_start = time.perf_counter()
+            tbl = seat_customer_group(group_size, customer_id)
+            decision_time.record(time.perf_counter() - decision_start)
+
+            if tbl:
+                seat_group(tbl, group_size, customer_id, client_fifo, received_at)
+            elif hops + 1 < shards and hand_off(group_size, customer_id, client_fifo, sent_at, hops):
+                # następny shard posadzi grupę albo przekaże dalej; odpowie klientowi bezpośrednio
+                logger.debug("Klient %s przekazany do shardu %s.", customer_id, next_shard)
+            elif waitlist is not None and waitlist.add(group_size, (customer_id, client_fifo), received_at):
+                # bez odpowiedzi - klient czeka, aż ktoś zwolni miejsce albo minie WAITLIST_MAX_WAIT
+                logger.debug("Klient %s czeka na miejsce (ilość osób=%s).", customer_id, group_size)
+                waitlisted_total.inc()
+            else:
+                reject_group(group_size, customer_id, client_fifo)
+
+        elif msg_type == CUSTOMER_DONE:
+            # klient wychodzi, nie będzie już odpowiedzi do niego
+            outbox.close(client_fifo if client_fifo is not None else customer_fifo_path(customer_id))
+
+            if not pizzeria_open:
+                # grupa uciekła przed pożarem; stoliki i tak zostaną wyczyszczone przy otwarciu, a GUI zostaje czarne
+                if evacuation is not None:
+                    evacuation.customer_out(received_at)
+                return
+
+            # grupa opróżniona przez RESET już tu nie siedzi - jej miejsca mogą mieć nowi goście
+            table = tables.release(table_id, group_size, customer_id)
+            if table is None:
+                logger.debug("Klient %s nie siedzi już przy stoliku %s - CUSTOMER_DONE pominięte.", customer_id, table_id)
+            else:
+                released_total.inc()
+                timeline.released_group(table, received_at)
+                logger.debug("Zwolniło się %s miejsca ze stolika %s.", group_size, table_id)
+                # update GUI (usuwany stolik znika razem z ostatnią grupą)
+                publish_changed([table])
+                if waitlist is not None and table_id in tables and table_id not in tables.closed and not fire_event.is_set():
+                    seat_from_waitlist(table, received_at)
+        else:
+            logger.warning("Nieznana wiadomość msg_type: %s", msg_type)
+
+    def handle_control(command, args, now):
+        logger.info("Polecenie: %s %s", command, " ".join(map(str, args)))
+        if command == "ADD":
+            capacity, count = args[0], (args[1] if len(args) > 1 else 1)
+            for _ in range(count):
+                if board is not None and tables.next_table_id > board.max_tables:
+                    logger.warning("Brak wolnych wierszy w tablicy GUI (BOARD_MAX_TABLES=%s) - stolik nie dodany.", board.max_tables)
+                    return
+                table = tables.add_table(capacity)
+                timeline.add_table(table, now)
+                publish_table(table)
+                if waitlist is not None and pizzeria_open:
+                    seat_from_waitlist(table, now)
+        elif command == "REMOVE":
+            removed = tables.remove_table(args[0])
+            if removed:
+                timeline.remove_table(args[0], now)
+                publish_removed(args[0])
+            elif removed is False:
+                logger.info("Stolik %s zajęty - zniknie, gdy wyjdzie ostatnia grupa.", args[0])
+                publish_table(tables.get(args[0]))
+        elif command == "CLOSE":
+            table = tables.close_table(args[0])
+            if table is not None:
+                publish_table(table)
+        elif command == "OPEN":
+            table = tables.open_table(args[0])
+            if table is not None:
+                publish_table(table)
+                if waitlist is not None and pizzeria_open:
+                    seat_from_waitlist(table, now)
+        elif command == "RESET":
+            if not pizzeria_open:
+                logger.info("Pożar - stoliki i tak zostaną opróżnione przy otwarciu.")
+                return
+            # goście przy stolikach nie dostają odpowiedzi; ich późniejsze CUSTOMER_DONE magazyn pominie
+            # (clear_seats zapomina, kto siedział), więc nie zdejmą miejsc grupom posadzonym po RESET
+            changed = tables.clear_seats()
+            timeline.cleared(changed, now)
+            publish_changed(changed)
+        else:
+            logger.warning("Nieprawidłowe polecenie: %s", args[0])
+
+    def start_evacuation():
+        # Ewakuacja: od razu po sygnale, przed obsługą czegokolwiek innego
+        nonlocal pizzeria_open, buffer, evacuation, fire_signal_at
+        now = time.time()
+        logger.info("Pizzeria zamknięta na %s sekund (pożar).", CLOSURE_DURATION_AFTER_FIRE)
+        pizzeria_open = False
+        seated_groups = sum(t['used_seats'] // t['group_size'] for t in tables if t['used_seats'])
+        evacuation = Evacuation(fire_signal_at if fire_signal_at is not None else now, seated_groups)
+        fire_signal_at = None
+
+        # Powiadamiamy GUI, że stoliki mają być 'czarne' (jeden komunikat / jeden zapis do board)
+        publish_fire()
+        timeline.fire(now)
+
+        # wszystko, co już czeka w fifo, obsługujemy teraz: prośby o stolik dostają LEAVE, uciekający się odliczają
+        messages, buffer = flush_requests(mf, buffer, FIFO_READ_CHUNK, decode_requests)
+        for msg in messages:
+            handle_message(msg, now)
+        if waitlist is not None:
+            evacuate_waitlist(now)
+        logger.info("Ewakuacja: %s grup przy stolikach, %s odesłanych od razu.", seated_groups, len(evacuation.leaving))
+
+    def finish_evacuation():
+        evacuation_time.record(evacuation.duration())
+        if evacuation.breached():
+            evacuation_breaches_total.inc()
+        if evacuation.complete:
+            logger.info("Ewakuacja zakończona po %.3f s (SLO %s s).", evacuation.duration(), EVACUATION_SLO_SECONDS)
+        else:
+            logger.warning("Ewakuacja niepełna po %.3f s: %s grup przy stolikach i %s klientów bez LEAVE.",
+                           evacuation.duration(), evacuation.seated, len(evacuation.leaving))
+
+    buffer = b""
+    last_pending_check = 0.0
 
+    try:
+        while not close_event.is_set():
+            if fire_event.is_set() and pizzeria_open:
+                start_evacuation()
 
             # powrót po pozarze
             if not fire_event.is_set() and not pizzeria_open:
                 # Ponowne otwarcie po pożarze
-                print("[Manager] Otwieranie pizzerii po pożarze.", flush=True)
-                tables = initialize_tables()
-                
-                # Wysyłamy do GUI aktualizacje na zielono (0 seats)
-                for size_list in tables.values():
-                    for t in size_list:
-                        gui_queue.put(("TABLE_UPDATE", (t['table_id'], 0, t['capacity'])))
-                
+                if evacuation.done_at is None:
+                    evacuation.abandon(time.time())
+                    finish_evacuation()
+                logger.info("Otwieranie pizzerii po pożarze.")
+                # opróżniamy tylko zajęte stoliki, zamiast budować wszystkie od nowa
+                changed = tables.clear_seats()
+                timeline.cleared(changed, time.time())
+
+                # GUI: koniec pożaru i na zielono (0 seats) tylko stoliki, które się zmieniły
                 pizzeria_open = True
-                print("[Manager] Reinicjalizacja stolików zakończona.")
-
-            # łapiemy fifo jako plik
-            line = None
-            line = mff.readline()
-            
-            if line == None: continue
-            
-            line = line.strip()
+                publish_reopen(changed)
+
+                timeline.reopen(time.time())
+                logger.info("Reinicjalizacja stolików zakończona. Opróżnione stoliki: %s", len(changed))
+
+            # czekamy na wiadomości albo sygnał, bez kręcenia się w pętli
+            timeout = MANAGER_POLL_TIMEOUT
+            if outbox.waiting_for_reader():
+                timeout = OUTBOX_RETRY_INTERVAL
+
+            events = selector.select(timeout=timeout)
+            received_at = time.time()
+            for key, _ in events:
+                if key.data == "wakeup":
+                    read_available(wakeup_r, FIFO_READ_CHUNK)
+                    if fire_event.is_set() and pizzeria_open:
+                        start_evacuation()
+                elif key.data == "fifo":
+                    buffer += read_available(mf, FIFO_READ_CHUNK)
+                elif key.data == "control":
+                    control_buffer += read_available(cf, FIFO_READ_CHUNK)
+                    commands, control_buffer = decode_commands(control_buffer)
+                    for command, args in commands:
+                        handle_control(command, args, received_at)
+                else:
+                    # fifo klienta znów przyjmuje dane
+                    outbox.on_writable(key.data[1])
 
-            if line == "": continue
-            print(f"[Manager] Odebrano: {line}.")
+            # dekodujemy cały bufor z jednego wybudzenia i obsługujemy wszystkie wiadomości
+            messages, buffer = decode_requests(buffer)
+            queue_depth.set(len(messages))
+            for msg in messages:
+                handle_message(msg, received_at)
 
-            try:
-                fifo_part, message_part = line.split(":", 1)
-            except ValueError:
-                print("[Manager] Ignorowanie wiadomości w złym formacie:", line)
-                continue
-
-            msg_tokens = message_part.strip().split()
-            if len(msg_tokens) < 3:
-                print("[Manager] Ignorowanie niepełnej wiadomości:", msg_tokens)
-                continue
-            msg_type = msg_tokens[0]
-
-            client_fifo = fifo_part.strip()
-
-            if msg_type == "REQUEST_SEAT":
-                group_size = int(msg_tokens[1])
-                customer_id = msg_tokens[2]
-
-                if not pizzeria_open:
-
-                    while True:
-                        try:
-                            print(f"[Manager] Pizzeria zamknięta. Informowanie klienta {customer_id} by wyszedł.")
-                            cf = os.open(client_fifo, os.O_WRONLY | os.O_NONBLOCK)
-                            os.write(cf, bytes(f"LEAVE {group_size} {customer_id}\n", "utf-8"))
-                            os.close(cf)
-                            break
-                        except OSError as e:
-                            if close_event.is_set(): break
-                            continue
-                    
-                    continue
-                
-                tbl = seat_customer_group(group_size)
-
-                if tbl:
-                    table_id = tbl['table_id']
-                    # Udało się usiąść => SEATED     
-                    group_profit = group_size * random.randint(10,25)
-                    total_profit += group_profit
-
-                    # Informacja do GUI o wzroście zysku
-                    gui_queue.put(("PROFIT_UPDATE", total_profit))
-
-                    # Statystyki do pliku
-                    if group_size in group_accepted:
-                        group_accepted[group_size] += 1
-
-                    table_usage[tbl['capacity']] += 1
-
-                    print(
-                        f"[Manager] Klient {customer_id} zajął miejsce (ilość osób={group_size}) przy stoliku {table_id} "
-                        f"Profit+={group_profit}, Całkowity profit={total_profit}", flush=True
-                    )
-
-                    # update GUI o ilości osób przy stoliku
-                    gui_queue.put(("TABLE_UPDATE", (table_id, tbl['used_seats'], tbl['capacity'])))
-
-                    # test czy fire
-                    if fire_event.is_set(): break
-
-                    while True:
-                        try:
-                            cf = os.open(client_fifo, os.O_WRONLY | os.O_NONBLOCK)
-                            os.write(cf, bytes(f"SEATED {group_size} {table_id}\n", "utf-8"))
-                            os.close(cf)
-                            break
-                        except OSError as e:
-                            if fire_event.is_set() or close_event.is_set(): break
-                            continue
-                else:
-                    print(
-                        f"[Manager] Klient {customer_id} nie mógł usiąść (ilość osób={group_size}). Brak miejsca.", flush=True
-                    )
-
-                    # Statystyki do pliku
-                    if group_size in group_rejected:
-                        group_rejected[group_size] += 1
-
-                    # test czy fire
-                    if fire_event.is_set(): break
-
-                    while True:
-                        try:
-                            cf = os.open(client_fifo, os.O_WRONLY | os.O_NONBLOCK)
-                            os.write(cf, bytes(f"REJECTED {group_size} {customer_id}\n", "utf-8"))
-                            os.close(cf)
-                            break
-                        except OSError as e:
-                            if fire_event.is_set() or close_event.is_set(): break
-                            continue
-
-            elif msg_type == "CUSTOMER_DONE":
-                group_size = int(msg_tokens[1])
-                table_id = int(msg_tokens[2])
-                for size_arr in tables.values():
-                    for table in size_arr:
-                        if table['table_id'] == table_id:
-                            print(
-                                f"[Manager] Zwolniło się {group_size} miejsca ze stolika {table_id}.", flush=True
-                            )
-                            # Aktualizujemy liczbę zajętych miejsc
-                            table['used_seats'] -= group_size
-                            if table['used_seats'] < 0:
-                                table['used_seats'] = 0
-                            # Jeśli stolik jest całkowicie pusty, resetujemy group_size
-                            if table['used_seats'] == 0:
-                                table['group_size'] = None
-                            
-                            # update GUI
-                            gui_queue.put(("TABLE_UPDATE", (table['table_id'], table['used_seats'], table['capacity'])))
-                            
-                            break
-            else:
-                print("[Manager] Nieznana wiadomość msg_type:", msg_type)
+            outbox.maintain()
+            if evacuation is not None and evacuation.update(outbox, time.time()):
+                finish_evacuation()
+            # pending_count() przegląda wszystkie kanały, więc liczymy go najwyżej raz na MANAGER_POLL_TIMEOUT
+            if received_at - last_pending_check >= MANAGER_POLL_TIMEOUT:
+                last_pending_check = received_at
+                outbox_pending.set(outbox.pending_count())
 
-        # usuwamy fifo managera
-        try:
-            mff.close()
-            os.close(mf)
-        except:
-            pass
+            if waitlist is not None:
+                expire_waitlist(received_at)
+                waitlist_length.set(len(waitlist))
 
-        print(f"[Manager] Pizzeria zamknięta. Całkowity profit = {total_profit}")
+            timeline.maybe_write(received_at)
 
+        # usuwamy fifo managera
         try:
-            os.remove(SERVER_FIFO)
-        except:
+            signal.set_wakeup_fd(-1)
+        except ValueError:
             pass
+        outbox.close_all()
+        selector.close()
+        for fd in (mf, keepalive_fd, cf, control_keepalive_fd, wakeup_r, wakeup_w, *handoff_fds.values()):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+        logger.info("Pizzeria zamknięta. Całkowity profit = %s", total_profit)
+        if waitlist is not None:
+            logger.info("Lista oczekujących: %s", waitlist.stats())
+        logger.info(
+            "Czas oczekiwania prośby: p50=%.3f ms, p99=%.3f ms, maks.=%.3f ms",
+            wait_time.percentile(0.5) * 1000, wait_time.percentile(0.99) * 1000, wait_time.max * 1000
+        )
+
+        for fifo in (server_fifo, control_fifo):
+            try:
+                os.remove(fifo)
+            except:
+                pass
 
-        print("[Manager] Manager - zakańczanie.")
+        logger.info("Manager - zakańczanie.")
 
     except Exception as e:
-        print("[Manager] ERROR:", e)
+        logger.error("ERROR: %s", e)
         traceback.print_exc()
     finally:
-        # Na końcu zapisujemy statystyki do pliku
-        try:
-            with open("pizzeria_log.txt", "a", encoding="utf-8") as f:
-                end_time = time.time()
-                simu_sec_count = end_time - start_time
-
-                f.write(f"\n=== Symulacja rozpoczęta o: {time.ctime(start_time)} ===\n")
-                f.write(f"=== Pizzeria zamknięta o {time.ctime(end_time)} ===\n")
-                f.write(f"=== Symulacja trwała: {simu_sec_count:.2f} sekund ===\n")
-
-                f.write("Całkowity profit: {}\n".format(total_profit))
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
 
-                f.write("\n--- Statystyki grup klientów ---\n")
-                for gsize in sorted(group_accepted.keys()):
-                    acc = group_accepted[gsize]
-                    rej = group_rejected[gsize]
-                    f.write(f"  Grupa rozmiaru {gsize}: przyjęta={acc}, odrzucona={rej}\n")
-
-                f.write("\n--- Statystyki stolików ---\n")
-                for tsize in sorted(table_usage.keys()):
-                    usage_count = table_usage[tsize]
-                    f.write(f"  Stolik rozmiaru {tsize}: {usage_count} razy zajęty\n")
-
-                f.write("=======================================\n\n")
-        except Exception as file_err:
-            print("[Manager] Błąd zapisu do pizzeria_log.txt:", file_err)
+        # ostatni (niepełny) odcinek przebiegu
+        try:
+            timeline.close(time.time())
+        except Exception as timeline_err:
+            logger.error("Błąd zapisu do %s: %s", TIMELINE_FILE, timeline_err)
+
+        # Na końcu zapisujemy statystyki do pliku (przy kilku shardach robi to main z sumy wszystkich)
+        if stats_queue is not None:
+            stats_queue.put((shard, total_profit, group_accepted, group_rejected, table_usage))
+        else:
+            try:
+                write_stats_log("pizzeria_log.txt", start_time, time.time(), total_profit, group_accepted, group_rejected, table_usage)
+            except Exception as file_err:
+                logger.error("Błąd zapisu do pizzeria_log.txt: %s", file_err)
 
-        print("[Manager] Manager - proces się zakończył.")
\ No newline at end of file
+        logger.info("Manager - proces się zakończył.")
+        log.flush()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+"""
+Moduł metrics – pomiary managera na żywo:
+- Histogram: histogram w stylu HDR (kubełki logarytmiczno-liniowe, stały błąd względny ~1.6%,
+  stały koszt zapisu niezależnie od zakresu wartości), percentyle bez przechowywania próbek
+- Counter, Gauge: zwykłe liczniki i wartości chwilowe
+- MetricsRegistry.render() – wszystko w formacie tekstowym Prometheusa
+- start_metrics_server() – lokalny endpoint HTTP /metrics w wątku w tle (proces managera)
+
+Uruchamianie (podgląd w czasie symulacji): curl http://127.0.0.1:9464/metrics
+"""
+
+SUB_BUCKET_BITS = 7 # 128 kubełków na potęgę dwójki -> błąd względny najwyżej 1/64
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Histogram:
+    """
+    Wartości (w sekundach) zapisywane jako liczby całkowite jednostek 'unit' (domyślnie mikrosekundy).
+    Do SUB_BUCKETS jednostek kubełki mają szerokość 1, dalej dla każdej potęgi dwójki
+    jest HALF_SUB_BUCKETS równych kubełków.
+    """
+
+    def __init__(self, name: str, help_text: str, unit: float = 1e-6):
+        self.name = name
+        self.help_text = help_text
+        self.unit = unit
+        self.counts = {} # indeks kubełka -> liczba próbek
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        if seconds < 0:
+            seconds = 0.0 # zegary różnych procesów mogą się minimalnie rozjechać
+        index = bucket_index(int(seconds / self.unit))
+        with self.lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = fraction * self.count
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= rank:
+                    return min(bucket_middle(index) * self.unit, self.max)
+            return self.max
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} summary"]
+        for q in QUANTILES:
+            lines.append(f'{self.name}{{quantile="{q}"}} {self.percentile(q):.9f}')
+        with self.lock:
+            lines.append(f"{self.name}_sum {self.sum:.9f}")
+            lines.append(f"{self.name}_count {self.count}")
+            lines.append(f"# HELP {self.name}_max Największa zanotowana wartość.")
+            lines.append(f"# TYPE {self.name}_max gauge")
+            lines.append(f"{self.name}_max {self.max:.9f}")
+        return lines
+
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+
+def bucket_middle(index: int) -> float:
+    # środek przedziału wartości kubełka (w jednostkach)
+    if index < SUB_BUCKETS:
+        return float(index)
+    shift = (index - SUB_BUCKETS) // HALF_SUB_BUCKETS + 1
+    sub = (index - SUB_BUCKETS) % HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+    return ((sub << shift) + (1 << shift) / 2)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name: str, help_text: str) -> Histogram:
+        return self._add(Histogram(name, help_text))
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._add(Gauge(name, help_text))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+
+def start_metrics_server(registry: MetricsRegistry, host: str, port: int) -> HTTPServer:
+    """Serwer HTTP z /metrics w wątku w tle. Zamykanie: server.shutdown(); server.server_close()."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # bez logu każdego zapytania na stdout
+
+    server = HTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,164 @@
+import os
+import time
+import selectors
+from collections import OrderedDict
+from config import OUTBOX_PENDING_TIMEOUT, OUTBOX_IDLE_TIMEOUT, OUTBOX_MAX_CHANNELS, OUTBOX_EXPIRY_SCAN_INTERVAL
+
+"""
+Moduł outbox – odpowiedzi managera do klientów bez blokowania pętli managera:
+- ReplyOutbox trzyma otwarte deskryptory do fifo klientów (cache, LRU)
+- odpowiedź trafia do skrzynki nadawczej klienta i jest wysyłana od razu, a jeśli się nie da
+  (klient nie otworzył jeszcze fifo albo fifo jest pełne) – czeka, a fifo jest rejestrowane
+  w selectorze managera na EVENT_WRITE
+- klienci, którzy zniknęli (brak fifo, EPIPE) albo za długo nie odbierają, są usuwani
+"""
+
+
+class ReplyOutbox:
+    def __init__(self, selector: selectors.BaseSelector,
+                 pending_timeout: float = OUTBOX_PENDING_TIMEOUT,
+                 idle_timeout: float = OUTBOX_IDLE_TIMEOUT,
+                 max_channels: int = OUTBOX_MAX_CHANNELS):
+        self.selector = selector
+        self.pending_timeout = pending_timeout
+        self.idle_timeout = idle_timeout
+        self.max_channels = max_channels
+        self.channels = OrderedDict() # client_fifo -> kanał, od najdawniej używanego
+        self.unopened = set()  # fifo klientów, którzy jeszcze nie otworzyli swojego końca
+        self.evicted = 0 # ilu klientów usunęliśmy jako martwych
+        self.last_expiry_scan = time.monotonic()
+
+    def send(self, client_fifo: str, data: bytes, close_after: bool = False):
+        """Kolejkuje odpowiedź i od razu próbuje ją wysłać. close_after – zamknij kanał po wysłaniu."""
+        now = time.monotonic()
+        channel = self.channels.get(client_fifo)
+        if channel is None:
+            channel = {
+                'fd': None,
+                'pending': bytearray(),
+                'pending_since': None,
+                'last_used': now,
+                'registered': False,
+                'close_after': False,
+            }
+            self.channels[client_fifo] = channel
+            self._trim()
+        else:
+            self.channels.move_to_end(client_fifo)
+
+        if not channel['pending']:
+            channel['pending_since'] = now
+        channel['pending'] += data
+        channel['last_used'] = now
+        channel['close_after'] = channel['close_after'] or close_after
+        self._flush(client_fifo, channel)
+
+    def on_writable(self, client_fifo: str):
+        channel = self.channels.get(client_fifo)
+        if channel is not None:
+            self._flush(client_fifo, channel)
+
+    def waiting_for_reader(self) -> bool:
+        # manager skraca wtedy timeout selectora, żeby szybko ponowić otwarcie
+        return bool(self.unopened)
+
+    def maintain(self):
+        """Ponawia otwarcie fifo klientów i usuwa martwe / bezczynne kanały."""
+        now = time.monotonic()
+        for client_fifo in list(self.unopened):
+            channel = self.channels.get(client_fifo)
+            if channel is not None:
+                self._flush(client_fifo, channel)
+
+        # pełne przejrzenie kanałów robimy rzadziej, nie w każdym obrocie pętli managera
+        if now - self.last_expiry_scan < OUTBOX_EXPIRY_SCAN_INTERVAL:
+            return
+        self.last_expiry_scan = now
+        for client_fifo, channel in list(self.channels.items()):
+            if channel['pending'] and now - channel['pending_since'] > self.pending_timeout:
+                self.evict(client_fifo, dead=True)
+            elif not channel['pending'] and now - channel['last_used'] > self.idle_timeout:
+                self.evict(client_fifo)
+
+    def pending(self, client_fifo: str) -> bool:
+        """Czy do tego klienta czeka jeszcze niewysłana odpowiedź."""
+        channel = self.channels.get(client_fifo)
+        return channel is not None and bool(channel['pending'])
+
+    def pending_count(self) -> int:
+        return sum(1 for channel in self.channels.values() if channel['pending'])
+
+    def close(self, client_fifo: str):
+        """Zamyka kanał, jeśli nie ma w nim nic do wysłania (w przeciwnym razie zamknie się po wysłaniu)."""
+        channel = self.channels.get(client_fifo)
+        if channel is None:
+            return
+        if channel['pending']:
+            channel['close_after'] = True
+            return
+        self.evict(client_fifo)
+
+    def evict(self, client_fifo: str, dead: bool = False):
+        channel = self.channels.pop(client_fifo, None)
+        self.unopened.discard(client_fifo)
+        if channel is None:
+            return
+        if channel['registered']:
+            self.selector.unregister(channel['fd'])
+        if channel['fd'] is not None:
+            try:
+                os.close(channel['fd'])
+            except OSError:
+                pass
+        if dead:
+            self.evicted += 1
+
+    def close_all(self):
+        for client_fifo in list(self.channels):
+            self.evict(client_fifo)
+
+    def _trim(self):
+        # za dużo otwartych deskryptorów - zamykamy najdawniej używane kanały bez oczekujących odpowiedzi
+        if len(self.channels) <= self.max_channels:
+            return
+        for client_fifo, channel in list(self.channels.items()):
+            if len(self.channels) <= self.max_channels:
+                break
+            if not channel['pending']:
+                self.evict(client_fifo)
+
+    def _flush(self, client_fifo: str, channel: dict):
+        if channel['fd'] is None:
+            try:
+                channel['fd'] = os.open(client_fifo, os.O_WRONLY | os.O_NONBLOCK)
+            except FileNotFoundError:
+                # klient już wyszedł i usunął fifo
+                self.evict(client_fifo, dead=True)
+                return
+            except OSError:
+                # ENXIO - klient nie otworzył jeszcze swojego końca, spróbujemy w maintain()
+                self.unopened.add(client_fifo)
+                return
+            self.unopened.discard(client_fifo)
+
+        try:
+            written = os.write(channel['fd'], channel['pending'])
+        except BlockingIOError:
+            written = 0
+        except OSError:
+            # EPIPE - klient zamknął fifo
+            self.evict(client_fifo, dead=True)
+            return
+        del channel['pending'][:written]
+
+        if channel['pending']:
+            if not channel['registered']:
+                self.selector.register(channel['fd'], selectors.EVENT_WRITE, ("outbox", client_fifo))
+                channel['registered'] = True
+            return
+
+        if channel['registered']:
+            self.selector.unregister(channel['fd'])
+            channel['registered'] = False
+        if channel['close_after']:
+            self.evict(client_fifo)
@@ -0,0 +1,193 @@
+import argparse
+from config import (
+    TABLE_COUNTS, GROUP_SIZE_WEIGHTS, MAX_EAT_TIME, CUSTOMER_ARRIVAL_INTERVAL,
+    FIRE_INTERVAL, CLOSURE_DURATION_AFTER_FIRE, PROFIT_PER_PERSON,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""
+Moduł planner – planowanie pojemności sali metodą Monte Carlo (wymaga numpy):
+- tysiące niezależnych powtórzeń modelu liczone naraz jako tablice NumPy (jedno przyjście grupy = jeden krok dla wszystkich powtórzeń)
+- model jak w simulation.py: zasady seat_customer_group (najmniejszy stolik, grupy równej wielkości mogą się dosiąść),
+  GROUP_SIZE_WEIGHTS, odstępy przyjścia, MAX_EAT_TIME, pożary co FIRE_INTERVAL i zamknięcie po pożarze
+- przegląd wielu układów stolików i częstości przyjść, dla każdego: odsetek odrzuceń, wykorzystanie miejsc
+  i profit na godzinę z przedziałami ufności 95%
+
+Uruchamianie: python planner.py --mix 1:2,2:2,3:2,4:2 --mix 2:4,4:4 --rate 1 --rate 4 --replications 2000
+"""
+
+Z_95 = 1.96
+
+
+def parse_mix(text: str) -> dict:
+    # "1:2,2:2,3:2,4:2" -> {1: 2, 2: 2, 3: 2, 4: 2} (pojemność: liczba stolików)
+    mix = {}
+    for part in text.split(","):
+        size, count = part.split(":")
+        mix[int(size)] = int(count)
+    return mix
+
+
+def simulate_layout(table_counts: dict, replications: int, arrivals: int, rate: float = 1.0, seed=None,
+                    group_size_weights: dict = GROUP_SIZE_WEIGHTS, arrival_interval=CUSTOMER_ARRIVAL_INTERVAL,
+                    eat_time: float = MAX_EAT_TIME, fire_interval=FIRE_INTERVAL,
+                    closure_duration: float = CLOSURE_DURATION_AFTER_FIRE, fires: bool = True) -> dict:
+    """
+    Uruchamia 'replications' niezależnych powtórzeń po 'arrivals' przyjść grup.
+    rate mnoży częstość przyjść (odstępy arrival_interval dzielone przez rate).
+    Zwraca tablice wyników per powtórzenie.
+    """
+    if np is None:
+        raise RuntimeError("planner wymaga numpy (pip install numpy)")
+
+    rng = np.random.default_rng(seed)
+    R = replications
+
+    # stoliki w kolejności sadzania: pojemność rosnąco, potem table_id - jak w TableStore
+    capacity = np.array([size for size in sorted(table_counts) for _ in range(table_counts[size])], dtype=np.int64)
+    T = len(capacity)
+    S = int(capacity.max()) if T else 1 # najwięcej grup przy jednym stoliku
+    total_seats = int(capacity.sum())
+
+    sizes = np.array(list(group_size_weights.keys()), dtype=np.int64)
+    weights = np.array(list(group_size_weights.values()), dtype=float)
+    weights /= weights.sum()
+
+    group = np.zeros((R, T), dtype=np.int64) # rozmiar grup przy stoliku, 0 = pusty
+    departures = np.full((R, T, S), np.inf) # kiedy wychodzi każda z grup przy stoliku
+    rows = np.arange(R)
+
+    now = np.zeros(R)
+    next_fire = rng.integers(fire_interval[0], fire_interval[1] + 1, R).astype(float) if fires else np.full(R, np.inf)
+    reopen_at = np.full(R, np.inf)
+    is_open = np.ones(R, dtype=bool)
+
+    accepted = np.zeros(R, dtype=np.int64)
+    rejected = np.zeros(R, dtype=np.int64)
+    evacuated = np.zeros(R, dtype=np.int64)
+    profit = np.zeros(R, dtype=np.int64)
+    seat_seconds = np.zeros(R)
+
+    low, high = arrival_interval[0] / rate, arrival_interval[1] / rate
+
+    for _ in range(arrivals):
+        now += rng.uniform(low, high, R)
+
+        # pożary i ponowne otwarcia, które wypadły przed tym przyjściem
+        while True:
+            fire = next_fire <= now
+            reopen = ~fire & (reopen_at <= now)
+            if not fire.any() and not reopen.any():
+                break
+            if fire.any():
+                # grupy przy stolikach uciekają - niedokończona część posiłku się nie liczy
+                fire_time = next_fire[fire][:, None, None]
+                dep = departures[fire]
+                left = np.where(np.isfinite(dep) & (dep > fire_time), dep - fire_time, 0.0).sum(axis=2)
+                seat_seconds[fire] -= (left * group[fire]).sum(axis=1)
+                departures[fire] = np.inf
+                group[fire] = 0
+                is_open[fire] = False
+                reopen_at[fire] = next_fire[fire] + closure_duration
+                next_fire[fire] = np.inf
+            if reopen.any():
+                is_open[reopen] = True
+                next_fire[reopen] = reopen_at[reopen] + rng.integers(fire_interval[0], fire_interval[1] + 1, int(reopen.sum())) if fires else np.inf
+                reopen_at[reopen] = np.inf
+
+        # grupy, które skończyły jeść, zwalniają miejsca
+        departures[departures <= now[:, None, None]] = np.inf
+        seated_groups = np.isfinite(departures).sum(axis=2)
+        group[seated_groups == 0] = 0
+        used = seated_groups * group
+
+        group_size = rng.choice(sizes, size=R, p=weights)
+        evacuated += ~is_open
+
+        gs = group_size[:, None]
+        feasible = (capacity >= gs) & ((seated_groups == 0) | ((group == gs) & (capacity - used >= gs)))
+        feasible &= is_open[:, None]
+        seated = feasible.any(axis=1)
+        table = feasible.argmax(axis=1)
+
+        rejected += is_open & ~seated
+        r = rows[seated]
+        t = table[seated]
+        g = group_size[seated]
+        slot = np.isinf(departures[r, t]).argmax(axis=1)
+        departures[r, t, slot] = now[seated] + eat_time
+        group[r, t] = g
+        accepted += seated
+        profit[seated] += g * rng.integers(PROFIT_PER_PERSON[0], PROFIT_PER_PERSON[1] + 1, len(r))
+        seat_seconds[seated] += g * eat_time
+
+    # posiłki, które jeszcze trwają na końcu, liczymy tylko do chwili 'now'
+    left = np.where(np.isfinite(departures), np.maximum(departures - now[:, None, None], 0.0), 0.0).sum(axis=2)
+    seat_seconds -= (left * group).sum(axis=1)
+
+    served = accepted + rejected
+    return {
+        'rejection_rate': np.divide(rejected, served, out=np.zeros(R), where=served > 0),
+        'seat_utilisation': seat_seconds / (total_seats * now) if total_seats else np.zeros(R),
+        'profit_per_hour': profit / now * 3600,
+        'accepted': accepted,
+        'rejected': rejected,
+        'evacuated': evacuated,
+    }
+
+
+def confidence_interval(values) -> tuple:
+    # średnia i połowa szerokości przedziału ufności 95% (przybliżenie normalne)
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, float(Z_95 * values.std(ddof=1) / np.sqrt(len(values)))
+
+
+def plan(mixes, rates, replications: int = 1000, arrivals: int = 2000, seed=None, fires: bool = True):
+    """Przegląd wszystkich par (układ stolików, częstość przyjść). Zwraca listę wierszy z wynikami."""
+    results = []
+    for mix in mixes:
+        for rate in rates:
+            raw = simulate_layout(mix, replications, arrivals, rate=rate, seed=seed, fires=fires)
+            row = {'mix': mix, 'rate': rate}
+            for metric in ('rejection_rate', 'seat_utilisation', 'profit_per_hour'):
+                row[metric] = confidence_interval(raw[metric])
+            results.append(row)
+    return results
+
+
+def format_mix(mix: dict) -> str:
+    return ",".join(f"{size}:{count}" for size, count in sorted(mix.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planowanie układu stolików (Monte Carlo, NumPy)")
+    parser.add_argument("--mix", action="append", type=parse_mix,
+                        help="układ stolików pojemność:liczba, np. 1:2,2:2,3:2,4:2 (można podać wiele razy)")
+    parser.add_argument("--rate", action="append", type=float,
+                        help="mnożnik częstości przyjść względem CUSTOMER_ARRIVAL_INTERVAL (można podać wiele razy)")
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--arrivals", type=int, default=2000, help="przyjść grup na powtórzenie")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-fire", action="store_true")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("planner wymaga numpy (pip install numpy)")
+
+    mixes = args.mix or [TABLE_COUNTS]
+    rates = args.rate or [1.0]
+
+    print(f"{'układ':>20} {'częstość':>8} {'odrzucenia %':>18} {'wykorzystanie %':>18} {'profit / h':>22}")
+    for row in plan(mixes, rates, args.replications, args.arrivals, args.seed, fires=not args.no_fire):
+        rej, rej_ci = row['rejection_rate']
+        util, util_ci = row['seat_utilisation']
+        prof, prof_ci = row['profit_per_hour']
+        print(f"{format_mix(row['mix']):>20} {row['rate']:>8.2f} "
+              f"{rej * 100:>10.2f} ± {rej_ci * 100:<5.2f} {util * 100:>10.2f} ± {util_ci * 100:<5.2f} "
+              f"{prof:>12.0f} ± {prof_ci:<7.0f}")
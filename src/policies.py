@@ -0,0 +1,113 @@
+from config import GROUP_SIZE_WEIGHTS
+
+"""
+Moduł policies – strategie wyboru stolika dla TableStore (SEATING_POLICY w config.py):
+- first_fit: najmniejsza pojemność, która pomieści grupę, w niej najmniejsze table_id (dotychczasowe zachowanie)
+- best_fit: stolik, przy którym po posadzeniu zostanie najmniej wolnych miejsc; grupa jednoosobowa dosiądzie się
+  do częściowo zajętego stolika, zamiast zaczynać pusty 4-osobowy
+- lookahead: jak best_fit, ale najpierw ocenia, ile przyszłych przyjść straci miejsce, jeśli zajmiemy dany stolik,
+  według zaobserwowanego rozkładu wielkości grup (observe) i tego, ile jeszcze stolików może obsłużyć każdą wielkość
+
+Strategia dostaje kandydatów od TableStore.candidates() (w każdym kubełku stolik o najmniejszym table_id)
+i zwraca jednego z nich albo None - ten sam słownik stolika, którego manager używa dalej.
+
+Porównanie strategii na tym samym strumieniu przyjść: python simulation.py --compare-policies --rate 4
+"""
+
+
+class SeatingPolicy:
+    name = None
+
+    def choose(self, store, group_size: int):
+        raise NotImplementedError
+
+    def observe(self, group_size: int):
+        """Przyszła grupa tej wielkości (niezależnie od tego, czy usiądzie)."""
+
+
+class FirstFit(SeatingPolicy):
+    name = "first_fit"
+
+    def choose(self, store, group_size: int):
+        for size in store.capacities:
+            if size >= group_size:
+                candidates = store.candidates_at(size, group_size)
+                if candidates:
+                    return min(candidates, key=lambda table: table['table_id'])
+        return None
+
+
+def best_fit_key(table: dict, group_size: int) -> tuple:
+    # najpierw najmniej wolnych miejsc po posadzeniu, potem dosiadanie się przed zajęciem pustego stolika
+    free_after = table['capacity'] - table['used_seats'] - group_size
+    return free_after, table['used_seats'] == 0, table['capacity'], table['table_id']
+
+
+class BestFit(SeatingPolicy):
+    name = "best_fit"
+
+    def choose(self, store, group_size: int):
+        return min(store.candidates(group_size), key=lambda table: best_fit_key(table, group_size), default=None)
+
+
+class Lookahead(SeatingPolicy):
+    """
+    Koszt zajęcia stolika: suma po wielkościach grup s oczekiwanej liczby osób (udział s w przyjściach razy s)
+    razy 1 / (liczba stolików, które mogą teraz przyjąć s), o ile ten stolik przestanie przyjmować s.
+    Zabranie jedynego miejsca dla częstej lub dużej grupy kosztuje najwięcej.
+    Remisy (np. dosiadanie się, które nic nie zabiera) rozstrzyga best_fit.
+    Zanim coś zaobserwujemy, rozkład to group_size_weights (jak prior_weight przyjść).
+    """
+
+    name = "lookahead"
+
+    def __init__(self, group_size_weights: dict = GROUP_SIZE_WEIGHTS, prior_weight: float = 10.0):
+        total = sum(group_size_weights.values())
+        self.counts = {size: prior_weight * weight / total for size, weight in group_size_weights.items()}
+        self.total = sum(self.counts.values())
+
+    def observe(self, group_size: int):
+        self.counts[group_size] = self.counts.get(group_size, 0.0) + 1
+        self.total += 1
+
+    def choose(self, store, group_size: int):
+        candidates = store.candidates(group_size)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        options = {size: store.options(size) for size in self.counts}
+        best, best_key = None, None
+        for table in candidates:
+            cost = 0.0
+            for size, count in self.counts.items():
+                if accepts(table, size) and not accepts_after(table, group_size, size):
+                    cost += count / self.total * size / options[size]
+            key = (cost,) + best_fit_key(table, group_size)
+            if best_key is None or key < best_key:
+                best, best_key = table, key
+        return best
+
+
+def accepts(table: dict, group_size: int) -> bool:
+    # czy stolik w obecnym stanie przyjmie grupę tej wielkości (zasady jak w TableStore)
+    if table['used_seats'] == 0:
+        return table['capacity'] >= group_size
+    return table['group_size'] == group_size and table['capacity'] - table['used_seats'] >= group_size
+
+
+def accepts_after(table: dict, seated_size: int, group_size: int) -> bool:
+    # czy po posadzeniu grupy seated_size stolik nadal przyjmie grupę group_size
+    return seated_size == group_size and table['capacity'] - table['used_seats'] - seated_size >= group_size
+
+
+POLICIES = {policy.name: policy for policy in (FirstFit, BestFit, Lookahead)}
+
+
+def make_policy(policy) -> SeatingPolicy:
+    """Nazwa z POLICIES albo gotowy obiekt strategii."""
+    if isinstance(policy, SeatingPolicy):
+        return policy
+    try:
+        return POLICIES[policy]()
+    except KeyError:
+        raise ValueError(f"Nieznana strategia sadzania: {policy!r} (dostępne: {', '.join(POLICIES)})") from None
@@ -0,0 +1,270 @@
+import os
+import re
+import sys
+import time
+import glob
+import argparse
+import functools
+import threading
+from setproctitle import getproctitle
+from config import PROFILE_MODE, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+import log
+
+"""
+Moduł profiling – opcjonalne profilowanie każdego procesu symulacji:
+- @profiled na funkcji procesu (main, manager, klient, pracownik puli, strażak, GUI); bez profilowania
+  dekorator tylko wywołuje funkcję
+- tryb z PIZZERIA_PROFILE (dziedziczą go wszystkie procesy, także z forkserwera) albo PROFILE_MODE z config.py:
+    "cprofile" - deterministyczny cProfile (wątek procesu, czas procesora), plik PROFILE_DIR/<tytuł procesu>.prof
+    "sample"   - wątek próbkujący co PROFILE_SAMPLE_INTERVAL s stosy wszystkich wątków i przypisujący im czas
+                 procesora zużyty przez wątek od poprzedniej próbki (śpiący w select nic nie dostaje, kręcący się
+                 w pętli - wszystko); plik PROFILE_DIR/<tytuł procesu>.folded (format flamegraph.pl, mikrosekundy)
+- nazwa pliku to tytuł z setproctitle w chwili końca procesu (np. ManagerProcess, CustomerProcess-7-pid(123))
+- report scala profile wszystkich procesów: czas procesora według rodzaju procesu (tytuł bez numerów),
+  funkcje z największym czasem własnym i najgorętsze linie (tam widać pętle aktywnego czekania)
+
+Uruchamianie: PIZZERIA_PROFILE=sample python main.py
+              python profiling.py report [--dir profiles] [--top 20] [--folded wszystko.folded]
+"""
+
+PROFILE_ENV = "PIZZERIA_PROFILE"
+PROFILE_MODES = ("cprofile", "sample")
+EXTENSIONS = {"cprofile": ".prof", "sample": ".folded"}
+
+
+def profile_mode():
+    mode = os.environ.get(PROFILE_ENV, PROFILE_MODE) or None
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Nieznany tryb profilowania: {mode!r} (dostępne: {', '.join(PROFILE_MODES)})")
+    return mode
+
+
+def profile_path(title: str, mode: str, directory: str = PROFILE_DIR) -> str:
+    return os.path.join(directory, re.sub(r"[^\w().-]", "_", title) + EXTENSIONS[mode])
+
+
+def clear_profiles(directory: str = PROFILE_DIR):
+    """Usuwa profile poprzedniego przebiegu (main przed startem procesów)."""
+    for mode in PROFILE_MODES:
+        for path in glob.glob(os.path.join(directory, "*" + EXTENSIONS[mode])):
+            os.remove(path)
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class StackSampler:
+    """
+    Próbkowanie stosów wszystkich wątków procesu z osobnego wątku.
+    Waga próbki to czas procesora wątku od poprzedniej próbki (time.pthread_getcpuclockid),
+    a gdzie tego nie ma - sam odstęp między próbkami.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = {} # "wątek;ramka;...;ramka" -> sekundy
+        self.cpu_seen = {} # ident wątku -> jego czas procesora przy poprzedniej próbce
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ProfileSampler", daemon=True)
+
+    def start(self):
+        for ident in sys._current_frames():
+            self.cpu_seen[ident] = self._thread_cpu(ident)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    @staticmethod
+    def _thread_cpu(ident: int):
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return None # brak zegara wątków (np. macOS) albo wątek właśnie się skończył
+
+    def sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.thread.ident:
+                continue
+            cpu = self._thread_cpu(ident)
+            if cpu is None:
+                weight = self.interval
+            else:
+                weight = cpu - (self.cpu_seen.get(ident) or 0.0)
+                self.cpu_seen[ident] = cpu
+            if weight <= 0:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame_label(frame))
+                frame = frame.f_back
+            stack = ";".join([names.get(ident, "thread"), *reversed(frames)])
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + weight
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, seconds in self.stacks.items():
+                f.write(f"{stack} {round(seconds * 1e6)}\n")
+
+
+def profiled(func):
+    """Dekorator funkcji procesu: przy włączonym profilowaniu zapisuje profil po jej zakończeniu."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = profile_mode()
+        if mode is None:
+            return func(*args, **kwargs)
+        if mode == "cprofile":
+            import cProfile # dopiero gdy potrzebny - klienci z forkserwera go nie ładują
+            profiler = cProfile.Profile(time.process_time)
+            profiler.enable()
+        else:
+            profiler = StackSampler()
+            profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = profile_path(getproctitle(), mode)
+                if mode == "cprofile":
+                    profiler.dump_stats(path)
+                else:
+                    profiler.write(path)
+            except OSError as e:
+                log.get_logger("Profiling").error("Nie można zapisać profilu: %s", e)
+                log.flush() # funkcja procesu opróżniła już bufor logów przed powrotem
+    return wrapper
+
+
+# --- scalanie profili ---
+
+def process_role(title: str) -> str:
+    """Rodzaj procesu: tytuł bez numerów klienta, shardu i pid (CustomerProcess-7-pid(123) -> CustomerProcess)."""
+    return re.sub(r"-pid\(\d+\)|-\d+", "", title)
+
+
+def function_of(label: str) -> str:
+    return label.rsplit(":", 1)[0] # bez numeru linii
+
+
+def load_profile(path: str) -> dict:
+    """
+    Profil jednego procesu w postaci wspólnej dla obu trybów: total (s procesora), own / inclusive (funkcja -> s),
+    lines (linia, w której wątek był w chwili próbki -> s; tylko "sample") i stacks (stos -> s; tylko "sample").
+    """
+    title, ext = os.path.splitext(os.path.basename(path))
+    profile = {'title': title, 'role': process_role(title), 'total': 0.0, 'own': {}, 'inclusive': {}, 'lines': {}, 'stacks': {}}
+    if ext == EXTENSIONS["cprofile"]:
+        import pstats
+        for (filename, _, name), (_, _, own, inclusive, _) in pstats.Stats(path).stats.items():
+            function = f"{os.path.basename(filename)}:{name}"
+            profile['own'][function] = profile['own'].get(function, 0.0) + own
+            profile['inclusive'][function] = max(profile['inclusive'].get(function, 0.0), inclusive)
+            profile['total'] += own
+        return profile
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, micros = line.rstrip("\n").rpartition(" ")
+            seconds = int(micros) / 1e6
+            frames = stack.split(";")[1:] # pierwszy element to nazwa wątku
+            profile['stacks'][stack] = profile['stacks'].get(stack, 0.0) + seconds
+            profile['total'] += seconds
+            if not frames:
+                continue
+            leaf = frames[-1]
+            profile['lines'][leaf] = profile['lines'].get(leaf, 0.0) + seconds
+            function = function_of(leaf)
+            profile['own'][function] = profile['own'].get(function, 0.0) + seconds
+            for function in {function_of(frame) for frame in frames}: # rekurencja liczona raz
+                profile['inclusive'][function] = profile['inclusive'].get(function, 0.0) + seconds
+    return profile
+
+
+def load_profiles(directory: str = PROFILE_DIR) -> list:
+    paths = sorted(path for mode in PROFILE_MODES for path in glob.glob(os.path.join(directory, "*" + EXTENSIONS[mode])))
+    return [load_profile(path) for path in paths]
+
+
+def merge_profiles(profiles: list) -> dict:
+    """Suma po wszystkich procesach; przy funkcjach i liniach zapamiętujemy też, ile wnosi każdy rodzaj procesu."""
+    merged = {'total': 0.0, 'roles': {}, 'own': {}, 'inclusive': {}, 'lines': {}, 'stacks': {}}
+    for profile in profiles:
+        role = profile['role']
+        merged['total'] += profile['total']
+        processes, seconds = merged['roles'].get(role, (0, 0.0))
+        merged['roles'][role] = (processes + 1, seconds + profile['total'])
+        for key in ('own', 'inclusive', 'lines'):
+            for name, value in profile[key].items():
+                by_role = merged[key].setdefault(name, {})
+                by_role[role] = by_role.get(role, 0.0) + value
+        for stack, value in profile['stacks'].items():
+            stack = f"{role};{stack}"
+            merged['stacks'][stack] = merged['stacks'].get(stack, 0.0) + value
+    return merged
+
+
+def top(table: dict, limit: int) -> list:
+    """[(nazwa, suma, {rodzaj: sekundy})] malejąco według sumy."""
+    rows = [(name, sum(by_role.values()), by_role) for name, by_role in table.items()]
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+
+def print_report(merged: dict, limit: int = 20):
+    total = merged['total'] or 1.0
+    print(f"Czas procesora wszystkich procesów: {merged['total']:.3f} s")
+    print(f"\n{'Rodzaj procesu':<28}{'procesy':>8}{'CPU [s]':>10}{'udział':>9}")
+    for role, (processes, seconds) in sorted(merged['roles'].items(), key=lambda item: item[1][1], reverse=True):
+        print(f"{role:<28}{processes:>8}{seconds:>10.3f}{seconds / total:>9.1%}")
+
+    def print_rows(title, rows, with_inclusive=False):
+        print(f"\n{title}")
+        for name, seconds, by_role in rows:
+            roles = ", ".join(f"{role} {value / seconds:.0%}" for role, value in sorted(by_role.items(), key=lambda item: -item[1]))
+            inclusive = f"{sum(merged['inclusive'].get(name, {}).values()):>10.3f}" if with_inclusive else ""
+            print(f"{seconds:>10.3f}{seconds / total:>8.1%}{inclusive}  {name}  [{roles}]")
+
+    print_rows(f"Funkcje - czas własny [s], udział, łącznie z wywołanymi [s] (top {limit}):",
+               top(merged['own'], limit), with_inclusive=True)
+    if merged['lines']:
+        print_rows(f"Najgorętsze linie - czas własny [s], udział (top {limit}, tylko tryb sample):", top(merged['lines'], limit))
+
+
+def write_folded(merged: dict, path: str):
+    """Scalone stosy (rodzaj procesu jako korzeń) do flamegraph.pl."""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, seconds in merged['stacks'].items():
+            f.write(f"{stack} {round(seconds * 1e6)}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scalanie profili procesów pizzerii")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_parser = sub.add_parser("report", help="gdzie idzie czas procesora w całej symulacji")
+    report_parser.add_argument("--dir", default=PROFILE_DIR)
+    report_parser.add_argument("--top", type=int, default=20)
+    report_parser.add_argument("--folded", default=None, help="zapisz scalone stosy (tryb sample) do pliku")
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.dir)
+    if not profiles:
+        print(f"[Profiling] Brak profili w {args.dir} (uruchom z {PROFILE_ENV}=cprofile albo sample).")
+        sys.exit(1)
+    merged = merge_profiles(profiles)
+    print_report(merged, args.top)
+    if args.folded:
+        write_folded(merged, args.folded)
+        print(f"\nScalone stosy -> {args.folded}")
@@ -0,0 +1,168 @@
+import time
+import struct
+import select
+from config import PROTOCOL, CUSTOMER_FIFO_DIR, SERVER_FIFO, CONTROL_FIFO, MANAGER_SHARDS
+from utils import split_lines, shard_path
+import log
+
+"""
+Moduł protocol – format wiadomości między klientami a managerem.
+
+PROTOCOL = "text" (do debugowania, czytelny w strace / cat):
+    prośby:      "client_fifo_name:REQUEST_SEAT group_size customer_id [sent_at [hops]]"
+                 "client_fifo_name:CUSTOMER_DONE group_size table_id [sent_at]"
+    odpowiedzi:  "SEATED group_size table_id", "REJECTED group_size customer_id", "LEAVE group_size customer_id"
+
+PROTOCOL = "binary":
+    każda wiadomość to rekord stałej długości RECORD (typ, group_size, hops, customer_id, table_id, sent_at),
+    fifo klienta wynika z customer_id (customer_fifo_path), więc nie jest przesyłane
+
+sent_at to chwila wysłania (time.time() nadawcy) – manager liczy z niej czas oczekiwania prośby (metrics.py).
+W tekście jest opcjonalna.
+hops to liczba shardów managera, które już próbowały posadzić grupę (MANAGER_SHARDS > 1), dla klienta zawsze 0.
+
+Shardy: prośba o stolik idzie do request_shard(customer_id), CUSTOMER_DONE do shardu, który ma stolik
+(table_shard(table_id)); fifo shardu to server_fifo_path(shard).
+
+Po zdekodowaniu obie wersje dają te same krotki:
+    prośba:     (msg_type, group_size, customer_id, table_id, client_fifo albo None, sent_at, hops)
+    odpowiedź:  (msg_type, group_size, customer_id, table_id)
+Pola, których tekstowa wiadomość nie zawiera, mają wartość 0.
+"""
+
+REQUEST_SEAT = 1
+CUSTOMER_DONE = 2
+SEATED = 3
+REJECTED = 4
+LEAVE = 5
+
+MSG_NAMES = {
+    REQUEST_SEAT: "REQUEST_SEAT",
+    CUSTOMER_DONE: "CUSTOMER_DONE",
+    SEATED: "SEATED",
+    REJECTED: "REJECTED",
+    LEAVE: "LEAVE",
+}
+MSG_CODES = {name: code for code, name in MSG_NAMES.items()}
+
+RECORD = struct.Struct("<BBHIId")
+
+logger = log.get_logger("Protocol")
+
+# zapisy do fifo do PIPE_BUF bajtów są atomowe, więc rekordy różnych klientów się nie przeplatają
+assert RECORD.size <= select.PIPE_BUF
+
+
+def customer_fifo_path(customer_id: int) -> str:
+    return CUSTOMER_FIFO_DIR + f"Customer_fifo_{customer_id}"
+
+
+def server_fifo_path(shard: int = 0) -> str:
+    return shard_path(SERVER_FIFO, shard)
+
+
+def control_fifo_path(shard: int = 0) -> str:
+    # polecenia dla shardu managera (control.py), osobno od próśb klientów
+    return shard_path(CONTROL_FIFO, shard)
+
+
+def request_shard(customer_id: int, shards: int = MANAGER_SHARDS) -> int:
+    # klienci rozkładają się po shardach równo, bez osobnego procesu pośredniczącego
+    return customer_id % shards
+
+
+def table_shard(table_id: int, shards: int = MANAGER_SHARDS) -> int:
+    # stoliki są rozdzielone po kolei według table_id (TableStore z shard / shards)
+    return (table_id - 1) % shards
+
+
+def encode_request(msg_type: int, group_size: int, customer_id: int, table_id: int, client_fifo: str,
+                   protocol: str = PROTOCOL, sent_at: float = None, hops: int = 0) -> bytes:
+    if sent_at is None:
+        sent_at = time.time()
+    if protocol == "binary":
+        return RECORD.pack(msg_type, group_size, hops, customer_id, table_id, sent_at)
+    # w tekście REQUEST_SEAT niesie customer_id, a CUSTOMER_DONE table_id
+    last = customer_id if msg_type == REQUEST_SEAT else table_id
+    tail = f" {hops}" if hops else ""
+    return bytes(f"{client_fifo}:{MSG_NAMES[msg_type]} {group_size} {last} {sent_at:.6f}{tail}\n", "utf-8")
+
+
+def encode_reply(msg_type: int, group_size: int, customer_id: int, table_id: int, protocol: str = PROTOCOL) -> bytes:
+    if protocol == "binary":
+        return RECORD.pack(msg_type, group_size, 0, customer_id, table_id, time.time())
+    # w tekście SEATED niesie table_id, a REJECTED / LEAVE customer_id
+    last = table_id if msg_type == SEATED else customer_id
+    return bytes(f"{MSG_NAMES[msg_type]} {group_size} {last}\n", "utf-8")
+
+
+def decode_binary(buffer: bytes):
+    # jeden przebieg po całym buforze, niepełny rekord zostaje na następny odczyt
+    usable = len(buffer) - len(buffer) % RECORD.size
+    records = RECORD.iter_unpack(memoryview(buffer)[:usable])
+    return records, buffer[usable:]
+
+
+def decode_requests(buffer: bytes, protocol: str = PROTOCOL):
+    """Zwraca (lista próśb, niezdekodowana reszta bufora)."""
+    if protocol == "binary":
+        records, rest = decode_binary(buffer)
+        return [(t, g, c, tb, None, sent_at, hops) for t, g, hops, c, tb, sent_at in records], rest
+
+    lines, rest = split_lines(buffer)
+    messages = []
+    for raw_line in lines:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if line == "":
+            continue
+        try:
+            fifo_part, message_part = line.split(":", 1)
+        except ValueError:
+            logger.warning("Ignorowanie wiadomości w złym formacie: %s", line)
+            continue
+
+        msg_tokens = message_part.strip().split()
+        if len(msg_tokens) < 3 or msg_tokens[0] not in MSG_CODES:
+            logger.warning("Ignorowanie niepełnej wiadomości: %s", msg_tokens)
+            continue
+
+        msg_type = MSG_CODES[msg_tokens[0]]
+        try:
+            group_size = int(msg_tokens[1])
+            customer_id, table_id = 0, 0
+            if msg_type == REQUEST_SEAT:
+                customer_id = int(msg_tokens[2])
+            else:
+                table_id = int(msg_tokens[2])
+            sent_at = float(msg_tokens[3]) if len(msg_tokens) > 3 else 0.0
+            hops = int(msg_tokens[4]) if len(msg_tokens) > 4 else 0
+        except ValueError:
+            logger.warning("Ignorowanie wiadomości w złym formacie: %s", line)
+            continue
+        messages.append((msg_type, group_size, customer_id, table_id, fifo_part.strip(), sent_at, hops))
+    return messages, rest
+
+
+def decode_replies(buffer: bytes, protocol: str = PROTOCOL):
+    """Zwraca (lista odpowiedzi, niezdekodowana reszta bufora)."""
+    if protocol == "binary":
+        records, rest = decode_binary(buffer)
+        return [(t, g, c, tb) for t, g, _, c, tb, _ in records], rest
+
+    lines, rest = split_lines(buffer)
+    messages = []
+    for raw_line in lines:
+        tokens = raw_line.decode("utf-8", errors="replace").split()
+        if len(tokens) < 3 or tokens[0] not in MSG_CODES:
+            continue
+        msg_type = MSG_CODES[tokens[0]]
+        if msg_type == SEATED:
+            messages.append((msg_type, int(tokens[1]), 0, int(tokens[2])))
+        else:
+            messages.append((msg_type, int(tokens[1]), int(tokens[2]), 0))
+    return messages, rest
+
+
+def describe(msg) -> str:
+    # czytelna postać wiadomości do logów
+    return f"{MSG_NAMES.get(msg[0], msg[0])} group_size={msg[1]} customer_id={msg[2]} table_id={msg[3]}"
@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import selectors
+from multiprocessing import Event
+from config import TRACE_FILE, MAX_EAT_TIME, FIFO_READ_CHUNK, FIRE_SIGNAL, MANAGER_SHARDS
+from protocol import (
+    REQUEST_SEAT, CUSTOMER_DONE, SEATED, REJECTED, LEAVE, MSG_NAMES, encode_request, decode_replies,
+    customer_fifo_path, request_shard, table_shard,
+)
+from timers import TimerHeap
+from utils import read_available
+
+"""
+Moduł runtrace – ślad przebiegu symulacji i jego odtwarzanie:
+- TraceWriter: rekordy stałej długości (TRACE_RECORD, 20 B) dopisywane przez O_APPEND do TRACE_FILE;
+  każdy zapis to jeden os.write mniejszy niż PIPE_BUF, więc main (przyjścia), Firefighter (pożary) i klienci
+  (odpowiedzi managera z czasem oczekiwania) piszą do jednego pliku bez blokad
+- load_run(): ślad jako słownik - przyjścia, pożary, wynik każdego klienta
+- replay(): to samo obciążenie (te same customer_id, rozmiary grup, chwile przyjść i pożarów) dla prawdziwego
+  manager_process, w tempie 1x albo N razy szybciej (jedzenie trwa MAX_EAT_TIME / N); klientów udaje
+  jeden proces, więc kolejność próśb jest powtarzalna, a przy RANDOM_SEED manager losuje ten sam profit
+- diff_runs(): porównanie wyników i czasów oczekiwania dwóch śladów (np. nagranego i odtworzonego po zmianie)
+
+Uruchamianie: python runtrace.py summary [pizzeria_trace.bin]
+              python runtrace.py replay [pizzeria_trace.bin] --speed 4 --out pizzeria_replay.bin
+              python runtrace.py diff pizzeria_trace.bin pizzeria_replay.bin [--json]
+"""
+
+# rodzaj, wartość (wersja / rozmiar grupy / typ odpowiedzi), table_id, customer_id, time.time(),
+# czas oczekiwania na odpowiedź (w nagłówku: tempo odtwarzania)
+TRACE_RECORD = struct.Struct("<BBHIdf")
+TRACE_VERSION = 1
+
+HEADER = 0
+ARRIVAL = 1
+FIRE = 2
+FIRE_END = 3
+OUTCOME = 4
+
+
+class TraceWriter:
+    """path = None - zapis wyłączony (wszystkie metody nic nie robią)."""
+
+    def __init__(self, path: str = TRACE_FILE, truncate: bool = False):
+        self.fd = None
+        if path:
+            flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (os.O_TRUNC if truncate else 0)
+            self.fd = os.open(path, flags, 0o644)
+
+    def header(self, t: float, speed: float = 1.0):
+        self._write(HEADER, TRACE_VERSION, 0, 0, t, speed)
+
+    def arrival(self, customer_id: int, group_size: int, t: float = None):
+        self._write(ARRIVAL, group_size, 0, customer_id, t, 0.0)
+
+    def fire(self, t: float = None):
+        self._write(FIRE, 0, 0, 0, t, 0.0)
+
+    def fire_end(self, t: float = None):
+        self._write(FIRE_END, 0, 0, 0, t, 0.0)
+
+    def outcome(self, customer_id: int, reply_type: int, table_id: int, latency: float, t: float = None):
+        self._write(OUTCOME, reply_type, table_id, customer_id, t, latency)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _write(self, kind, value, table_id, customer_id, t, extra):
+        if self.fd is None:
+            return
+        try:
+            os.write(self.fd, TRACE_RECORD.pack(kind, value, table_id, customer_id, time.time() if t is None else t, extra))
+        except OSError:
+            pass # ślad jest pomocniczy, symulacja działa dalej
+
+
+def read_trace(path: str):
+    """Generator rekordów (rodzaj, wartość, table_id, customer_id, t, extra); urwany ostatni rekord jest pomijany."""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(TRACE_RECORD.size * 4096)
+            if not data:
+                return
+            usable = len(data) - len(data) % TRACE_RECORD.size
+            yield from TRACE_RECORD.iter_unpack(data[:usable])
+
+
+def load_run(path: str) -> dict:
+    """
+    Ślad jako słownik (czasy względem startu z nagłówka):
+    arrivals [(t, customer_id, group_size)], fires [(początek, koniec albo None)],
+    outcomes {customer_id: (typ odpowiedzi, table_id, czas oczekiwania, t)}
+    """
+    run = {'start': None, 'speed': 1.0, 'arrivals': [], 'fires': [], 'outcomes': {}}
+    records = list(read_trace(path))
+    for kind, value, table_id, customer_id, t, extra in records:
+        if kind == HEADER:
+            run['start'], run['speed'] = t, extra
+    if run['start'] is None:
+        run['start'] = min((record[4] for record in records), default=0.0)
+
+    for kind, value, table_id, customer_id, t, extra in sorted(records, key=lambda record: record[4]):
+        t -= run['start']
+        if kind == ARRIVAL:
+            run['arrivals'].append((t, customer_id, value))
+        elif kind == FIRE:
+            run['fires'].append((t, None))
+        elif kind == FIRE_END and run['fires'] and run['fires'][-1][1] is None:
+            run['fires'][-1] = (run['fires'][-1][0], t)
+        elif kind == OUTCOME:
+            run['outcomes'].setdefault(customer_id, (value, table_id, extra, t))
+    return run
+
+
+def replay(run: dict, speed: float = 1.0, out_path: str = None, shards: int = MANAGER_SHARDS, timeout: float = 10.0) -> dict:
+    """
+    Odtwarza obciążenie ze śladu na prawdziwym managerze (harness.running_manager, katalog tymczasowy).
+    Klient udawany jak customer_process: prośba o stolik, po SEATED jedzenie, CUSTOMER_DONE, przy pożarze
+    od razu CUSTOMER_DONE (ucieczka). Zwraca ślad odtworzenia w formacie load_run (i zapisuje go do out_path).
+    """
+    # dopiero tutaj: runtrace ładują też klienci (CUSTOMER_PRELOAD), a harness ciągnie za sobą managera
+    from harness import running_manager
+
+    if out_path:
+        out_path = os.path.abspath(out_path)
+    writer = TraceWriter(out_path, truncate=True)
+    result = {'start': None, 'speed': speed, 'arrivals': [], 'fires': [], 'outcomes': {}}
+
+    events = TimerHeap() # ("arrival" / "done" / "fire" / "fire_end", dane) w czasie od startu odtwarzania
+    for t, customer_id, group_size in run['arrivals']:
+        events.push(t / speed, ("arrival", (customer_id, group_size)))
+    for start, end in run['fires']:
+        events.push(start / speed, ("fire", None))
+        if end is not None:
+            events.push(end / speed, ("fire_end", None))
+
+    fire_event = Event()
+    manager_pids = []
+    selector = selectors.DefaultSelector()
+    waiting = {} # fd fifo klienta -> klient czekający na odpowiedź
+    eating = {} # customer_id -> (wpis w events, group_size, table_id)
+
+    def arrive(customer_id, group_size, server_fds):
+        fifo = customer_fifo_path(customer_id)
+        if os.path.exists(fifo):
+            os.remove(fifo)
+        os.mkfifo(fifo)
+        fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+        keepalive = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+        sent_at = time.time()
+        customer = {'customer_id': customer_id, 'group_size': group_size, 'fifo': fifo, 'fds': (fd, keepalive),
+                    'sent_at': sent_at, 'buffer': b""}
+        waiting[fd] = customer
+        selector.register(fd, selectors.EVENT_READ)
+        writer.arrival(customer_id, group_size, sent_at)
+        result['arrivals'].append((sent_at, customer_id, group_size))
+        os.write(server_fds[request_shard(customer_id, shards)],
+                 encode_request(REQUEST_SEAT, group_size, customer_id, 0, fifo, sent_at=sent_at))
+
+    def leave_table(customer_id, server_fds):
+        _, group_size, table_id = eating.pop(customer_id)
+        os.write(server_fds[table_shard(table_id, shards)],
+                 encode_request(CUSTOMER_DONE, group_size, customer_id, table_id, customer_fifo_path(customer_id)))
+
+    def handle_reply(fd, now, replay_start):
+        customer = waiting[fd]
+        customer['buffer'] += read_available(fd, FIFO_READ_CHUNK)
+        replies, customer['buffer'] = decode_replies(customer['buffer'])
+        if not replies:
+            return
+        reply_type, _, _, table_id = replies[0]
+        received_at = time.time()
+        latency = received_at - customer['sent_at']
+        customer_id = customer['customer_id']
+        writer.outcome(customer_id, reply_type, table_id, latency, received_at)
+        result['outcomes'][customer_id] = (reply_type, table_id, latency, received_at)
+
+        selector.unregister(fd)
+        del waiting[fd]
+        for customer_fd in customer['fds']:
+            os.close(customer_fd)
+        os.remove(customer['fifo'])
+        if reply_type == SEATED:
+            entry = events.push(now - replay_start + MAX_EAT_TIME / speed, ("done", customer_id))
+            eating[customer_id] = (entry, customer['group_size'], table_id)
+
+    with running_manager(shards, fire_event=fire_event, manager_pids=manager_pids) as server_fds:
+        replay_start = time.monotonic()
+        result['start'] = time.time()
+        writer.header(result['start'], speed)
+        deadline = None
+        try:
+            while True:
+                now = time.monotonic()
+                for kind, data in events.pop_expired(now - replay_start):
+                    if kind == "arrival":
+                        arrive(*data, server_fds)
+                    elif kind == "done" and data in eating: # mógł już uciec przed pożarem z tej samej partii
+                        leave_table(data, server_fds)
+                    elif kind == "fire":
+                        writer.fire()
+                        result['fires'].append((time.time(), None))
+                        fire_event.set()
+                        for manager_pid in manager_pids:
+                            os.kill(manager_pid, FIRE_SIGNAL)
+                        # jedzący uciekają od razu, jak customer_process
+                        for customer_id in list(eating):
+                            events.cancel(eating[customer_id][0])
+                            leave_table(customer_id, server_fds)
+                    elif kind == "fire_end":
+                        writer.fire_end()
+                        result['fires'][-1] = (result['fires'][-1][0], time.time())
+                        fire_event.clear()
+
+                if not events and not waiting:
+                    break
+                if not events:
+                    # zostali tylko klienci bez odpowiedzi - czekamy na nich najwyżej timeout
+                    deadline = deadline or now + timeout
+                    if now > deadline:
+                        break
+
+                next_deadline = events.next_deadline()
+                select_timeout = 0.05 if next_deadline is None else max(0.0, min(0.05, replay_start + next_deadline - now))
+                for key, _ in selector.select(timeout=select_timeout):
+                    handle_reply(key.fd, time.monotonic(), replay_start)
+        finally:
+            for customer in waiting.values():
+                for customer_fd in customer['fds']:
+                    os.close(customer_fd)
+            selector.close()
+            writer.close()
+
+    # czasy względem startu, jak w load_run
+    start = result['start']
+    result['arrivals'] = [(t - start, customer_id, group_size) for t, customer_id, group_size in result['arrivals']]
+    result['fires'] = [(begin - start, end - start if end is not None else None) for begin, end in result['fires']]
+    result['outcomes'] = {customer_id: (reply_type, table_id, latency, t - start)
+                          for customer_id, (reply_type, table_id, latency, t) in result['outcomes'].items()}
+    return result
+
+
+def latency_summary(run: dict) -> dict:
+    latencies = sorted(latency for _, _, latency, _ in run['outcomes'].values())
+    summary = {}
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        summary[f"{name}_ms"] = latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else 0.0
+    summary['max_ms'] = latencies[-1] * 1000 if latencies else 0.0
+    return summary
+
+
+def outcome_counts(run: dict) -> dict:
+    counts = {MSG_NAMES[reply_type]: 0 for reply_type in (SEATED, REJECTED, LEAVE)}
+    for reply_type, _, _, _ in run['outcomes'].values():
+        counts[MSG_NAMES.get(reply_type, str(reply_type))] = counts.get(MSG_NAMES.get(reply_type, str(reply_type)), 0) + 1
+    counts['none'] = sum(1 for _, customer_id, _ in run['arrivals'] if customer_id not in run['outcomes'])
+    return counts
+
+
+def diff_runs(base: dict, other: dict, max_changes: int = 20) -> dict:
+    """Porównanie dwóch śladów tego samego obciążenia: wyniki klient po kliencie i czasy oczekiwania."""
+    common = sorted(set(base['outcomes']) & set(other['outcomes']))
+    changed = [(customer_id, MSG_NAMES.get(base['outcomes'][customer_id][0]), MSG_NAMES.get(other['outcomes'][customer_id][0]))
+               for customer_id in common if base['outcomes'][customer_id][0] != other['outcomes'][customer_id][0]]
+    moved = sum(1 for customer_id in common
+                if base['outcomes'][customer_id][0] == other['outcomes'][customer_id][0] == SEATED
+                and base['outcomes'][customer_id][1] != other['outcomes'][customer_id][1])
+    base_arrivals = [(customer_id, group_size) for _, customer_id, group_size in base['arrivals']]
+    other_arrivals = [(customer_id, group_size) for _, customer_id, group_size in other['arrivals']]
+    return {
+        'same_workload': base_arrivals == other_arrivals and len(base['fires']) == len(other['fires']),
+        'compared': len(common),
+        'same_outcome': len(common) - len(changed),
+        'changed_outcome': len(changed),
+        'changed': changed[:max_changes],
+        'other_table': moved, # ten sam wynik SEATED, inny stolik
+        'counts': {'base': outcome_counts(base), 'other': outcome_counts(other)},
+        'latency': {'base': latency_summary(base), 'other': latency_summary(other)},
+    }
+
+
+def print_summary(run: dict):
+    duration = max((t for t, _, _ in run['arrivals']), default=0.0)
+    print(f"[Trace] Przyjść: {len(run['arrivals'])} w {duration:.1f} s, pożarów: {len(run['fires'])}, tempo: {run['speed']:g}x")
+    print(f"[Trace] Wyniki: {outcome_counts(run)}")
+    latency = latency_summary(run)
+    print(f"[Trace] Czas oczekiwania na odpowiedź: p50={latency['p50_ms']:.2f} ms p90={latency['p90_ms']:.2f} ms "
+          f"p99={latency['p99_ms']:.2f} ms maks.={latency['max_ms']:.2f} ms")
+
+
+def print_diff(diff: dict):
+    print(f"[Trace] To samo obciążenie: {'tak' if diff['same_workload'] else 'NIE'}")
+    print(f"[Trace] Porównanych klientów: {diff['compared']}, ten sam wynik: {diff['same_outcome']}, "
+          f"inny: {diff['changed_outcome']} (posadzeni przy innym stoliku: {diff['other_table']})")
+    for customer_id, old, new in diff['changed']:
+        print(f"  Klient {customer_id}: {old} -> {new}")
+    for name in ("base", "other"):
+        latency = diff['latency'][name]
+        print(f"  {name:>5}: {diff['counts'][name]}  p50={latency['p50_ms']:.2f} ms p99={latency['p99_ms']:.2f} ms "
+              f"maks.={latency['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ślad przebiegu pizzerii: podsumowanie, odtwarzanie, porównanie")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary_parser = commands.add_parser("summary", help="podsumowanie śladu")
+    summary_parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    replay_parser = commands.add_parser("replay", help="odtworzenie obciążenia na prawdziwym managerze")
+    replay_parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="ile razy szybciej niż nagranie")
+    replay_parser.add_argument("--out", default="pizzeria_replay.bin", help="ślad odtworzenia")
+    diff_parser = commands.add_parser("diff", help="porównanie dwóch śladów")
+    diff_parser.add_argument("base")
+    diff_parser.add_argument("other")
+    for command_parser in (replay_parser, diff_parser):
+        command_parser.add_argument("--json", action="store_true", help="porównanie jako JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(getattr(args, "path", None) or args.base):
+        print(f"[Trace] Brak pliku {getattr(args, 'path', None) or args.base}")
+        sys.exit(1)
+
+    if args.command == "summary":
+        print_summary(load_run(args.path))
+        sys.exit(0)
+
+    if args.command == "replay":
+        base = load_run(args.path)
+        other = replay(base, args.speed, args.out)
+        print(f"[Trace] Odtworzono {len(other['arrivals'])} przyjść w tempie {args.speed:g}x -> {args.out}")
+    else:
+        base, other = load_run(args.base), load_run(args.other)
+
+    diff = diff_runs(base, other)
+    if args.json:
+        print(json.dumps(diff, indent=2))
+    else:
+        print_diff(diff)
@@ -0,0 +1,325 @@
+import time
+import json
+import heapq
+import random
+import bisect
+import argparse
+import itertools
+from config import (
+    TABLE_COUNTS, GROUP_SIZE_WEIGHTS, MAX_EAT_TIME, CUSTOMER_ARRIVAL_INTERVAL,
+    FIRE_INTERVAL, CLOSURE_DURATION_AFTER_FIRE, PROFIT_PER_PERSON, WAITLIST_MAX_PER_SIZE, WAITLIST_MAX_WAIT,
+    SEATING_POLICY,
+)
+from tables import TableStore
+from policies import POLICIES
+from timeline import TimelineBuffer, TimelineRecorder
+from waitlist import Waitlist
+from utils import write_stats_log
+
+"""
+Moduł simulation – symulacja zdarzeń dyskretnych pizzerii w jednym procesie, w czasie wirtualnym:
+- ten sam model co procesy: TableStore (zasady seat_customer_group), TABLE_COUNTS, GROUP_SIZE_WEIGHTS,
+  odstępy przyjścia CUSTOMER_ARRIVAL_INTERVAL, MAX_EAT_TIME, pożary co FIRE_INTERVAL
+  i zamknięcie na CLOSURE_DURATION_AFTER_FIRE
+- bez forkowania i bez czekania, więc nadaje się do pytań o pojemność sali
+- wynik to te same statystyki, które manager zapisuje do pizzeria_log.txt
+- opcjonalnie lista oczekujących (waitlist.py) jak w managerze przy WAITLIST_ENABLED;
+  --compare-waitlist liczy ten sam strumień przyjść z listą i bez niej i pokazuje zysk
+- strategia wyboru stolika z policies.py (--policy); --compare-policies przepuszcza ten sam strumień przyjść
+  przez każdą strategię i pokazuje odsetek przyjętych oraz zajęte miejsca w czasie (z TimelineRecorder)
+
+Uruchamianie: python simulation.py --groups 1000000 --seed 1 [--waitlist | --compare-waitlist | --compare-policies]
+"""
+
+
+class PizzeriaSimulation:
+    def __init__(self, table_counts: dict = TABLE_COUNTS, seed=None,
+                 group_size_weights: dict = GROUP_SIZE_WEIGHTS,
+                 arrival_interval=CUSTOMER_ARRIVAL_INTERVAL,
+                 eat_time: float = MAX_EAT_TIME,
+                 fire_interval=FIRE_INTERVAL,
+                 closure_duration: float = CLOSURE_DURATION_AFTER_FIRE,
+                 fires: bool = True,
+                 waitlist: bool = False,
+                 waitlist_max_per_size: int = WAITLIST_MAX_PER_SIZE,
+                 waitlist_max_wait: float = WAITLIST_MAX_WAIT,
+                 policy=SEATING_POLICY):
+        self.table_counts = dict(table_counts)
+        self.rng = random.Random(seed)
+        # profit losujemy osobno, żeby przyjścia i pożary nie zależały od tego, kto usiadł (porównania z listą oczekujących)
+        self.profit_rng = random.Random(None if seed is None else f"{seed}-profit")
+        self.group_sizes = list(group_size_weights.keys())
+        self.cum_weights = list(itertools.accumulate(group_size_weights.values()))
+        self.arrival_interval = arrival_interval
+        self.eat_time = eat_time
+        self.fire_interval = fire_interval
+        self.closure_duration = closure_duration
+        self.fires = fires
+
+        self.tables = TableStore(self.table_counts, policy)
+        self.waitlist = Waitlist(self.group_sizes, waitlist_max_per_size, waitlist_max_wait) if waitlist else None
+
+    def seat_customer_group(self, group_size: int):
+        return self.tables.seat(group_size)
+
+    def run(self, groups: int, timeline: TimelineRecorder = None) -> dict:
+        """
+        Przepuszcza 'groups' przyjść grup przez model i zwraca statystyki.
+        timeline - opcjonalny TimelineRecorder (zdarzenia w czasie wirtualnym, zamykany na końcu).
+        """
+        rng = self.rng
+        random_ = rng.random
+        uniform = rng.uniform
+        randint = rng.randint
+        group_sizes = self.group_sizes
+        cum_weights = self.cum_weights
+        total_weight = cum_weights[-1]
+        last_size = len(group_sizes) - 1
+        arrival_low, arrival_high = self.arrival_interval
+        eat_time = self.eat_time
+        seat = self.seat_customer_group
+        release = self.tables.release
+        observe = self.tables.observe
+        waitlist = self.waitlist
+
+        group_accepted = {size: 0 for size in group_sizes}
+        group_rejected = {size: 0 for size in group_sizes}
+        table_usage = {size: 0 for size in self.table_counts}
+        total_profit = 0
+        evacuated = 0 # grupy odesłane (LEAVE) w czasie zamknięcia po pożarze
+        fled = 0 # grupy, które uciekły od stolika przy pożarze
+        fires = 0
+        seat_seconds = 0.0 # suma (osoby * czas przy stoliku), do wykorzystania miejsc
+
+        departures = [] # kopiec (czas wyjścia, table_id, group_size)
+
+        profit_randint = self.profit_rng.randint
+
+        def seat_group(tbl, group_size, t):
+            nonlocal total_profit
+            profit = group_size * profit_randint(*PROFIT_PER_PERSON)
+            total_profit += profit
+            group_accepted[group_size] += 1
+            table_usage[tbl['capacity']] += 1
+            heapq.heappush(departures, (t + eat_time, tbl['table_id'], group_size))
+            if timeline is not None:
+                timeline.seated(tbl, group_size, profit, t)
+
+        def reject_group(group_size):
+            group_rejected[group_size] += 1
+            if timeline is not None:
+                timeline.rejected_group(group_size)
+
+        def expire_waiting(t):
+            for group_size, _ in waitlist.expire(t):
+                reject_group(group_size)
+        inf = float("inf")
+        now = 0.0
+        next_fire = randint(*self.fire_interval) if self.fires else inf
+        reopen_at = inf
+        pizzeria_open = True
+
+        for _ in range(groups):
+            now += uniform(arrival_low, arrival_high)
+
+            # zdarzenia do chwili przyjścia tej grupy: wyjścia od stolików, pożar, ponowne otwarcie
+            while True:
+                next_departure = departures[0][0] if departures else inf
+                if next_departure <= now and next_departure <= next_fire:
+                    _, table_id, group_size = heapq.heappop(departures)
+                    table = release(table_id, group_size)
+                    seat_seconds += group_size * eat_time
+                    if timeline is not None:
+                        timeline.released_group(table, next_departure)
+                    if waitlist is not None and waitlist.size:
+                        # zwolnione miejsca od razu dostają najdłużej czekający, którzy się zmieszczą
+                        expire_waiting(next_departure)
+                        while True:
+                            match = waitlist.pop_for(table, next_departure)
+                            if match is None:
+                                break
+                            waiting_size = match[0]
+                            seat_group(seat(waiting_size), waiting_size, next_departure)
+                elif next_fire <= now:
+                    # pożar: wszyscy przy stolikach uciekają, pizzeria zamknięta
+                    fires += 1
+                    for departure_time, _, group_size in departures:
+                        seat_seconds += group_size * (eat_time - (departure_time - next_fire))
+                    fled += len(departures)
+                    departures.clear()
+                    if timeline is not None:
+                        timeline.fire(next_fire)
+                    if waitlist is not None:
+                        expire_waiting(next_fire) # termin minął przed pożarem - te grupy już odrzucono
+                        for _ in waitlist.drain(next_fire):
+                            evacuated += 1
+                            if timeline is not None:
+                                timeline.evacuated_group()
+                    pizzeria_open = False
+                    reopen_at = next_fire + self.closure_duration
+                    next_fire = inf
+                elif reopen_at <= now:
+                    self.tables.reset()
+                    if timeline is not None:
+                        timeline.reopen(reopen_at)
+                    pizzeria_open = True
+                    next_fire = reopen_at + randint(*self.fire_interval) if self.fires else inf
+                    reopen_at = inf
+                else:
+                    break
+
+            i = bisect.bisect(cum_weights, random_() * total_weight)
+            group_size = group_sizes[i if i <= last_size else last_size]
+            observe(group_size)
+            if timeline is not None:
+                timeline.maybe_write(now)
+                timeline.arrival(group_size)
+
+            if not pizzeria_open:
+                evacuated += 1
+                if timeline is not None:
+                    timeline.evacuated_group()
+                continue
+
+            if waitlist is not None and waitlist.size:
+                expire_waiting(now)
+
+            tbl = seat(group_size)
+            if tbl:
+                seat_group(tbl, group_size, now)
+            elif waitlist is None or not waitlist.add(group_size, None, now):
+                reject_group(group_size)
+
+        total_seats = sum(size * count for size, count in self.table_counts.items())
+        for departure_time, _, group_size in departures:
+            seat_seconds += group_size * (eat_time - max(0.0, departure_time - now))
+        if timeline is not None:
+            timeline.close(now)
+
+        return {
+            'groups': groups,
+            'virtual_seconds': now,
+            'total_profit': total_profit,
+            'group_accepted': group_accepted,
+            'group_rejected': group_rejected,
+            'table_usage': table_usage,
+            'evacuated': evacuated,
+            'fled': fled,
+            'fires': fires,
+            'seat_utilisation': seat_seconds / (total_seats * now) if now and total_seats else 0.0,
+            'waiting': len(waitlist) if waitlist is not None else 0, # wciąż czekający na końcu
+            'waitlist': waitlist.stats() if waitlist is not None else None,
+        }
+
+
+def print_stats(stats: dict, wall_seconds: float):
+    accepted = sum(stats['group_accepted'].values())
+    rejected = sum(stats['group_rejected'].values())
+    print(f"[Simulation] Grup: {stats['groups']} w {stats['virtual_seconds']:.0f} s wirtualnych "
+          f"({wall_seconds:.2f} s rzeczywistych, {stats['groups'] / wall_seconds:,.0f} grup/s)")
+    print(f"[Simulation] Całkowity profit: {stats['total_profit']}")
+    print(f"[Simulation] Przyjęte={accepted}, odrzucone={rejected}, odesłane przy pożarze={stats['evacuated']}, "
+          f"uciekły od stolika={stats['fled']}, pożarów={stats['fires']}")
+    print(f"[Simulation] Wykorzystanie miejsc: {stats['seat_utilisation'] * 100:.1f}%")
+    for gsize in sorted(stats['group_accepted']):
+        print(f"  Grupa rozmiaru {gsize}: przyjęta={stats['group_accepted'][gsize]}, odrzucona={stats['group_rejected'][gsize]}")
+    for tsize in sorted(stats['table_usage']):
+        print(f"  Stolik rozmiaru {tsize}: {stats['table_usage'][tsize]} razy zajęty")
+    if stats['waitlist'] is not None:
+        w = stats['waitlist']
+        print(f"[Simulation] Lista oczekujących: dopisane={w['added']}, posadzone={w['matched']}, "
+              f"po czasie={w['expired']}, pełna kolejka={w['full']}, odesłane przy pożarze={w['evacuated']}, "
+              f"średnio czekały {w['wait_avg']:.2f} s (maks. {w['wait_max']:.2f} s)")
+
+
+def acceptance_rate(stats: dict) -> float:
+    accepted = sum(stats['group_accepted'].values())
+    rejected = sum(stats['group_rejected'].values())
+    return accepted / (accepted + rejected) if accepted + rejected else 0.0
+
+
+def compare_policies(policies, groups: int, seed=None, interval: float = 60.0, **kwargs) -> dict:
+    """
+    Ten sam strumień przyjść (ten sam seed) przez każdą strategię sadzania.
+    Zwraca {nazwa: {'stats': ..., 'seats_occupied': [(początek, długość, średnio zajętych miejsc) dla odcinków
+    po ~'interval' s]}}.
+    """
+    results = {}
+    for policy in policies:
+        sim = PizzeriaSimulation(seed=seed, policy=policy, **kwargs)
+        buffer = TimelineBuffer()
+        stats = sim.run(groups, timeline=TimelineRecorder(buffer, sim.tables, sim.group_sizes, interval, 0.0))
+        results[policy] = {
+            'stats': stats,
+            'seats_occupied': [(record['t'], record['duration'], sum(t['occupancy'] for t in record['tables'].values()))
+                               for record in buffer.records],
+        }
+    return results
+
+
+def print_policy_comparison(results: dict):
+    print(f"{'strategia':>10} {'przyjęte %':>10} {'wykorzystanie %':>15} {'zajęte miejsca p10 / p50 / p90':>32} {'profit':>10}")
+    for policy, result in results.items():
+        stats = result['stats']
+        occupied = sorted(seats for _, _, seats in result['seats_occupied'])
+        p10, p50, p90 = (occupied[int(q * (len(occupied) - 1))] if occupied else 0.0 for q in (0.1, 0.5, 0.9))
+        print(f"{policy:>10} {acceptance_rate(stats) * 100:>10.2f} {stats['seat_utilisation'] * 100:>15.2f} "
+              f"{p10:>12.2f} / {p50:>6.2f} / {p90:>6.2f} {stats['total_profit']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Symulacja pizzerii w czasie wirtualnym")
+    parser.add_argument("--groups", type=int, default=1_000_000, help="ile grup przychodzi")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-fire", action="store_true", help="bez pożarów")
+    parser.add_argument("--log", action="store_true", help="dopisz statystyki do pizzeria_log.txt")
+    parser.add_argument("--rate", type=float, default=1.0, help="mnożnik częstości przyjść względem CUSTOMER_ARRIVAL_INTERVAL")
+    parser.add_argument("--waitlist", action="store_true", help="z listą oczekujących")
+    parser.add_argument("--compare-waitlist", action="store_true", help="ten sam strumień przyjść bez listy i z listą")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default=SEATING_POLICY, help="strategia wyboru stolika")
+    parser.add_argument("--compare-policies", action="store_true", help="ten sam strumień przyjść przez każdą strategię")
+    parser.add_argument("--interval", type=float, default=60.0,
+                        help="długość odcinka czasu wirtualnego dla zajętych miejsc w --compare-policies")
+    parser.add_argument("--json", action="store_true", help="wynik --compare-policies jako JSON (z przebiegiem w czasie)")
+    args = parser.parse_args()
+    arrival_interval = (CUSTOMER_ARRIVAL_INTERVAL[0] / args.rate, CUSTOMER_ARRIVAL_INTERVAL[1] / args.rate)
+
+    if args.compare_waitlist:
+        # ten sam seed = ten sam strumień przyjść, różni się tylko obsługa grup bez miejsca
+        without = PizzeriaSimulation(seed=args.seed, arrival_interval=arrival_interval, fires=not args.no_fire).run(args.groups)
+        with_list = PizzeriaSimulation(seed=args.seed, arrival_interval=arrival_interval, fires=not args.no_fire,
+                                       waitlist=True).run(args.groups)
+        for label, stats in (("bez listy", without), ("z listą", with_list)):
+            print(f"[Simulation] {label:>9}: przyjęte {acceptance_rate(stats) * 100:.2f}%, "
+                  f"wykorzystanie miejsc {stats['seat_utilisation'] * 100:.2f}%, profit {stats['total_profit']}")
+        print(f"[Simulation] Zysk z listy: przyjęte "
+              f"{(acceptance_rate(with_list) - acceptance_rate(without)) * 100:+.2f} pkt proc., wykorzystanie "
+              f"{(with_list['seat_utilisation'] - without['seat_utilisation']) * 100:+.2f} pkt proc., profit "
+              f"{with_list['total_profit'] - without['total_profit']:+d}")
+        raise SystemExit(0)
+
+    if args.compare_policies:
+        results = compare_policies(POLICIES, args.groups, seed=args.seed, interval=args.interval,
+                                   arrival_interval=arrival_interval, fires=not args.no_fire, waitlist=args.waitlist)
+        if args.json:
+            print(json.dumps({policy: {
+                'acceptance_rate': acceptance_rate(result['stats']),
+                'seat_utilisation': result['stats']['seat_utilisation'],
+                'total_profit': result['stats']['total_profit'],
+                'interval': args.interval,
+                'seats_occupied': result['seats_occupied'],
+            } for policy, result in results.items()}, indent=2))
+        else:
+            print_policy_comparison(results)
+        raise SystemExit(0)
+
+    sim = PizzeriaSimulation(seed=args.seed, arrival_interval=arrival_interval, fires=not args.no_fire,
+                             waitlist=args.waitlist, policy=args.policy)
+    wall_start = time.time()
+    stats = sim.run(args.groups)
+    wall_seconds = time.time() - wall_start
+    print_stats(stats, wall_seconds)
+
+    if args.log:
+        write_stats_log("pizzeria_log.txt", wall_start, wall_start + stats['virtual_seconds'], stats['total_profit'],
+                        stats['group_accepted'], stats['group_rejected'], stats['table_usage'])
@@ -0,0 +1,146 @@
+import time
+import struct
+import multiprocessing
+import multiprocessing.forkserver
+from multiprocessing import Pipe
+from multiprocessing.connection import wait
+from config import CUSTOMER_REAP_POLL, CUSTOMER_START_METHOD
+from metrics import MetricsRegistry
+
+"""
+Moduł supervisor – procesy klientów w main() bez odpytywania is_alive() w pętli:
+- CustomerSupervisor czeka w multiprocessing.connection.wait() na sentinele procesów klientów
+  (gotowe do odczytu, gdy proces się kończy), więc zakończonego klienta zbiera od razu, a w czasie
+  czekania na wolne miejsce (MAX_CONCURRENT_CUSTOMERS) proces main śpi, zamiast zajmować rdzeń
+- klienci zgłaszają przez jeden wspólny potok (notify) chwilę gotowości (prośba o stolik wysłana)
+  i chwilę wyjścia z customer_process; z tego metryki:
+    czas start() -> gotowy (spawn_ready) i opóźnienie zebrania zakończonego procesu (reap_lag)
+- CUSTOMER_REAP_POLL ogranicza czekanie, żeby zauważyć zamknięcie symulacji (is_running / close_event)
+- customer_context(): przy CUSTOMER_START_METHOD = "forkserver" klienci nie są forkowani z main (z tkinter,
+  managerem, kolejkami i wątkami w pamięci), tylko z małego procesu-serwera, który zaimportował CUSTOMER_PRELOAD
+"""
+
+NOTIFY_RECORD = struct.Struct("<BId") # rodzaj, customer_id, time.time() klienta
+READY = 1
+EXITING = 2
+
+# to, co customer_process importuje; serwer ładuje to raz, a każdy klient dostaje gotowe przez fork
+CUSTOMER_PRELOAD = ["customer", "runtrace", "multiprocessing.synchronize"] # synchronize - Eventy w argumentach klienta
+
+
+def notify(conn, kind: int, customer_id: int):
+    """Wywoływane w procesie klienta; conn = None - klient uruchomiony bez nadzorcy."""
+    if conn is None:
+        return
+    try:
+        # jeden krótki zapis (< PIPE_BUF), więc zgłoszenia wielu klientów się nie przeplatają
+        conn.send_bytes(NOTIFY_RECORD.pack(kind, customer_id, time.time()))
+    except OSError:
+        pass # main już nie słucha
+
+
+def customer_context(start_method: str = CUSTOMER_START_METHOD):
+    """
+    Kontekst multiprocessing dla procesów klientów. Eventy przekazywane klientom trzeba tworzyć z tego kontekstu
+    (context.Event()) - semafor utworzony w kontekście fork nie przejdzie do procesu z forkserwera.
+    """
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        context.set_forkserver_preload(CUSTOMER_PRELOAD)
+        multiprocessing.forkserver.ensure_running() # serwer startuje teraz, a nie przy pierwszym kliencie
+    return context
+
+
+class CustomerSupervisor:
+    def __init__(self, max_customers: int, metrics: MetricsRegistry = None, poll: float = CUSTOMER_REAP_POLL, context=None):
+        self.max_customers = max_customers
+        self.poll = poll
+        self.context = context or multiprocessing.get_context()
+        self.procs = {} # sentinel -> (proces, customer_id)
+        self.spawned_at = {} # customer_id -> time.time() przed start()
+        self.exited_at = {} # customer_id -> zgłoszony koniec customer_process
+        self.notify_recv, self.notify_send = Pipe(duplex=False)
+
+        metrics = metrics or MetricsRegistry()
+        self.spawn_ready = metrics.histogram("pizzeria_customer_spawn_ready_seconds",
+                                             "Od Process.start() w main do wysłania prośby o stolik przez klienta.")
+        self.reap_lag = metrics.histogram("pizzeria_customer_reap_lag_seconds",
+                                          "Od końca customer_process do zebrania procesu (join) przez main.")
+        self.spawned_total = metrics.counter("pizzeria_customers_spawned_total", "Uruchomione procesy klientów.")
+        self.reaped_total = metrics.counter("pizzeria_customers_reaped_total", "Zebrane zakończone procesy klientów.")
+        self.active = metrics.gauge("pizzeria_customers_active", "Procesy klientów, które jeszcze się nie zakończyły.")
+
+    def __len__(self):
+        return len(self.procs)
+
+    def spawn(self, target, args: tuple, name: str, customer_id: int):
+        """Uruchamia target(*args, notify_conn) jako nowy proces (w kontekście self.context)."""
+        process = self.context.Process(target=target, args=args + (self.notify_send,), name=name)
+        self.spawned_at[customer_id] = time.time()
+        process.start()
+        self.procs[process.sentinel] = (process, customer_id)
+        self.spawned_total.inc()
+        self.active.set(len(self.procs))
+        return process
+
+    def wait(self, timeout: float) -> int:
+        """Czeka najwyżej timeout na zakończenie któregoś klienta albo zgłoszenie; zwraca liczbę zebranych procesów."""
+        ready = wait(list(self.procs) + [self.notify_recv], timeout)
+        if self.notify_recv in ready:
+            self._read_notifications()
+        reaped = 0
+        for sentinel in ready:
+            if sentinel in self.procs:
+                self._reap(sentinel)
+                reaped += 1
+        return reaped
+
+    def wait_for_slot(self, should_stop) -> bool:
+        """Blokuje, aż aktywnych klientów będzie mniej niż max_customers. False - should_stop() w trakcie."""
+        while len(self.procs) >= self.max_customers:
+            if should_stop():
+                return False
+            self.wait(self.poll)
+        return True
+
+    def sleep(self, seconds: float, should_stop) -> bool:
+        """Odstęp między klientami, w trakcie którego zbieramy kończących się. False - should_stop() w trakcie."""
+        deadline = time.monotonic() + seconds
+        while True:
+            if should_stop():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.wait(min(remaining, self.poll))
+
+    def join_all(self):
+        while self.procs:
+            self.wait(self.poll)
+
+    def close(self):
+        self.notify_recv.close()
+        self.notify_send.close()
+
+    def _read_notifications(self):
+        while self.notify_recv.poll():
+            kind, customer_id, at = NOTIFY_RECORD.unpack(self.notify_recv.recv_bytes())
+            if kind == READY and customer_id in self.spawned_at:
+                self.spawn_ready.record(at - self.spawned_at[customer_id])
+            elif kind == EXITING:
+                self.exited_at[customer_id] = at
+
+    def _reap(self, sentinel):
+        process, customer_id = self.procs.pop(sentinel)
+        process.join()
+        reaped_at = time.time()
+        # zgłoszenie wyjścia mogło przyjść w tym samym wybudzeniu co sentinel, ale jeszcze nieodczytane
+        if customer_id not in self.exited_at and self.notify_recv.poll():
+            self._read_notifications()
+        exited_at = self.exited_at.pop(customer_id, None)
+        if exited_at is not None:
+            self.reap_lag.record(reaped_at - exited_at)
+        self.spawned_at.pop(customer_id, None)
+        process.close() # zwalnia deskryptor sentinela od razu, a nie dopiero przy sprzątaniu obiektu
+        self.reaped_total.inc()
+        self.active.set(len(self.procs))
@@ -0,0 +1,281 @@
+import heapq
+import bisect
+from policies import make_policy
+
+"""
+Moduł tables:
+- TableStore – indeksowany magazyn stolików używany przez managera
+- trzyma kubełki wolnych miejsc po kluczu (pojemność, rozmiar siedzącej grupy)
+  oraz bezpośredni indeks table_id -> stolik, więc sadzanie i zwalnianie nie skanuje wszystkich stolików
+- który z pasujących stolików dostaje grupa, decyduje strategia z policies.py (domyślnie first_fit)
+- przy kilku shardach managera magazyn trzyma tylko swoje stoliki (co shards-ty według table_id)
+- zmiany w trakcie działania bez przebudowy: add_table / remove_table / close_table / open_table
+  i clear_seats() (opróżnienie sali w miejscu - dotyka tylko zajętych stolików i zwraca je jako zmienione)
+- przy seat / release z customer_id pamięta, kto siedzi przy stoliku: zwolnienie od grupy, której tam już nie ma
+  (bo stolik opróżnił clear_seats), jest ignorowane i nie zdejmuje miejsc nowym gościom
+"""
+
+
+class TableStore:
+    """
+    Grupa może usiąść przy stoliku, który jest pusty i dość duży albo siedzi przy nim grupa
+    tej samej wielkości i jest dość miejsca. Przy strategii first_fit zasady są takie same jak wcześniej
+    w seat_customer_group: najmniejszy pasujący stolik, w obrębie pojemności najmniejsze table_id.
+
+    Kubełek (capacity, None, 0) to puste stoliki, kubełek (capacity, g, used_seats) to stoliki zajęte przez
+    grupy wielkości g, przy których zmieści się jeszcze jedna taka grupa.
+    Kubełki to kopce table_id z leniwym usuwaniem (nieaktualne wpisy odrzucamy przy odczycie).
+    """
+
+    def __init__(self, table_counts: dict, policy="first_fit", shard: int = 0, shards: int = 1):
+        self.table_counts = dict(table_counts)
+        # przy kilku managerach (MANAGER_SHARDS) każdy ma co shards-ty stolik, table_id zostają globalne
+        self.shard = shard
+        self.shards = shards
+        self.capacities = sorted(self.table_counts.keys())
+        self.policy = make_policy(policy)
+        self.tables = {}  # table_id -> stolik (dict jak wcześniej w managerze)
+        self.by_size = {}  # capacity -> {table_id: stolik} w kolejności table_id (usuwanie stolika w O(1))
+        self.buckets = {}  # (capacity, group_size, used_seats) -> kopiec table_id
+        self.bucket_of = {}  # table_id -> klucz kubełka w którym stolik aktualnie jest (albo None)
+        self.bucket_count = {}  # klucz kubełka -> ile stolików jest w nim naprawdę
+        self.occupied = set()  # table_id stolików z used_seats > 0
+        self.closed = set()  # table_id stolików zamkniętych - nie przyjmują nowych grup
+        self.removing = set()  # zamknięte stoliki do usunięcia, gdy wyjdzie ostatnia grupa
+        self.occupants = {}  # table_id -> {customer_id: group_size} grup posadzonych z customer_id
+        self.reset()
+
+    def reset(self):
+        """Tworzy wszystkie stoliki od nowa na podstawie table_counts (wszystkie wolne)."""
+        self.tables.clear()
+        self.by_size.clear()
+        self.buckets.clear()
+        self.bucket_of.clear()
+        self.bucket_count.clear()
+        self.occupied.clear()
+        self.closed.clear()
+        self.removing.clear()
+        self.occupants.clear()
+
+        table_id_counter = 1
+        for size, count in self.table_counts.items():
+            self.by_size[size] = {}
+            for _ in range(count):
+                if (table_id_counter - 1) % self.shards != self.shard:
+                    table_id_counter += 1
+                    continue
+                table = {
+                    'table_id': table_id_counter,
+                    'capacity': size,
+                    'used_seats': 0,
+                    'group_size': None, # jaka grupa używa stołu, by ewentualnie grupa o tej samej ilości osób mogła się dosiąść
+                }
+                self.tables[table_id_counter] = table
+                self.by_size[size][table_id_counter] = table
+                self._reindex(table)
+                table_id_counter += 1
+        # nowe stoliki dostają kolejne wolne table_id tego shardu (table_id są globalne)
+        self.next_table_id = table_id_counter + (self.shard - (table_id_counter - 1)) % self.shards
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    def get(self, table_id: int):
+        return self.tables.get(table_id)
+
+    def as_dict(self):
+        """Widok w starym formacie: { capacity: [stolik, ...] }."""
+        return {size: list(tables.values()) for size, tables in self.by_size.items()}
+
+    def __contains__(self, table_id: int):
+        return table_id in self.tables
+
+    def add_table(self, capacity: int) -> dict:
+        """Nowy, wolny stolik (także o pojemności, której dotąd nie było)."""
+        if capacity not in self.by_size:
+            self.by_size[capacity] = {}
+            bisect.insort(self.capacities, capacity)
+        table = {'table_id': self.next_table_id, 'capacity': capacity, 'used_seats': 0, 'group_size': None}
+        self.next_table_id += self.shards
+        self.tables[table['table_id']] = table
+        self.by_size[capacity][table['table_id']] = table
+        self.table_counts[capacity] = self.table_counts.get(capacity, 0) + 1
+        self._reindex(table)
+        return table
+
+    def remove_table(self, table_id: int):
+        """
+        Usuwa stolik. Zajęty jest tylko zamykany i znika, gdy wyjdzie ostatnia grupa (release / clear_seats).
+        Zwraca True - usunięty, False - czeka na wyjście gości, None - nie ma takiego stolika.
+        """
+        table = self.tables.get(table_id)
+        if table is None:
+            return None
+        if table['used_seats']:
+            self.removing.add(table_id)
+            self.close_table(table_id)
+            return False
+        self._drop(table)
+        return True
+
+    def close_table(self, table_id: int):
+        """Stolik nie przyjmuje nowych grup; siedzący jedzą dalej. Zwraca stolik albo None."""
+        table = self.tables.get(table_id)
+        if table is not None:
+            self.closed.add(table_id)
+            self._reindex(table)
+        return table
+
+    def open_table(self, table_id: int):
+        table = self.tables.get(table_id)
+        if table is not None and table_id not in self.removing:
+            self.closed.discard(table_id)
+            self._reindex(table)
+            return table
+        return None
+
+    def clear_seats(self) -> list:
+        """
+        Wszystkie stoliki wolne (np. otwarcie po pożarze) bez przebudowy indeksów: zmieniamy tylko zajęte stoliki.
+        Zwraca listę stolików, które się zmieniły (usunięte po opróżnieniu też - już ich nie ma w magazynie).
+        """
+        changed = []
+        for table_id in list(self.occupied):
+            table = self.tables[table_id]
+            table['used_seats'] = 0
+            table['group_size'] = None
+            self.occupants.pop(table_id, None) # ich późniejsze release() zostaną zignorowane
+            self._reindex(table)
+            changed.append(table)
+        return changed
+
+    def _drop(self, table):
+        table_id = table['table_id']
+        key = self.bucket_of.pop(table_id, None)
+        if key is not None:
+            self.bucket_count[key] -= 1 # wpis w kopcu zostaje i odpadnie przy odczycie
+        del self.tables[table_id]
+        del self.by_size[table['capacity']][table_id]
+        self.table_counts[table['capacity']] -= 1
+        self.occupied.discard(table_id)
+        self.closed.discard(table_id)
+        self.removing.discard(table_id)
+        self.occupants.pop(table_id, None)
+
+    def _reindex(self, table):
+        # do jakiego kubełka stolik teraz należy
+        if table['used_seats']:
+            self.occupied.add(table['table_id'])
+        else:
+            self.occupied.discard(table['table_id'])
+        if table['table_id'] in self.removing and not table['used_seats']:
+            self._drop(table) # ostatnia grupa wyszła z usuwanego stolika
+            return
+        if table['table_id'] in self.closed:
+            key = None
+        elif table['used_seats'] == 0:
+            key = (table['capacity'], None, 0)
+        elif table['capacity'] - table['used_seats'] >= table['group_size']:
+            key = (table['capacity'], table['group_size'], table['used_seats'])
+        else:
+            key = None  # pełny, nie przyjmie już nikogo
+
+        old_key = self.bucket_of.get(table['table_id'])
+        if old_key == key:
+            return
+        self.bucket_of[table['table_id']] = key
+        if old_key is not None:
+            self.bucket_count[old_key] -= 1
+        if key is not None:
+            self.bucket_count[key] = self.bucket_count.get(key, 0) + 1
+            heap = self.buckets.setdefault(key, [])
+            heapq.heappush(heap, table['table_id'])
+            # stolik może wielokrotnie wracać do kubełka, więc co jakiś czas wyrzucamy duplikaty i stare wpisy
+            if len(heap) > 2 * len(self.by_size[table['capacity']]) + 8:
+                valid = {table_id for table_id in heap if self.bucket_of.get(table_id) == key}
+                heap[:] = sorted(valid)
+
+    def _peek(self, key):
+        heap = self.buckets.get(key)
+        while heap:
+            table_id = heap[0]
+            if self.bucket_of.get(table_id) == key:
+                return table_id
+            heapq.heappop(heap) # nieaktualny wpis
+        return None
+
+    def candidates(self, group_size: int) -> list:
+        """
+        Stoliki, które mogą teraz przyjąć grupę: z każdego pasującego kubełka ten o najmniejszym table_id.
+        Kolejność: pojemność rosnąco, w niej stoliki zajęte (od najmniej zajętych), na końcu pusty.
+        """
+        candidates = []
+        for size in self.capacities:
+            if size >= group_size:
+                candidates += self.candidates_at(size, group_size)
+        return candidates
+
+    def candidates_at(self, capacity: int, group_size: int) -> list:
+        """Jak candidates(), tylko dla stolików jednej pojemności."""
+        candidates = []
+        for used in range(group_size, capacity - group_size + 1, group_size):
+            table_id = self._peek((capacity, group_size, used))
+            if table_id is not None:
+                candidates.append(self.tables[table_id])
+        table_id = self._peek((capacity, None, 0))
+        if table_id is not None:
+            candidates.append(self.tables[table_id])
+        return candidates
+
+    def options(self, group_size: int) -> int:
+        """Ile stolików może teraz przyjąć grupę tej wielkości."""
+        count = 0
+        for (size, seated_size, _), tables in self.bucket_count.items():
+            if seated_size == group_size or (seated_size is None and size >= group_size):
+                count += tables
+        return count
+
+    def observe(self, group_size: int):
+        """Przyszła grupa tej wielkości - dla strategii, które uczą się rozkładu przyjść."""
+        self.policy.observe(group_size)
+
+    def seat(self, group_size: int, customer_id: int = None):
+        """Zwraca obiekt 'table' (dict) jeśli się uda, None w przeciwnym wypadku."""
+        table = self.policy.choose(self, group_size)
+        if table is None:
+            return None
+        table['used_seats'] += group_size
+        if table['group_size'] is None:
+            table['group_size'] = group_size
+        if customer_id is not None:
+            self.occupants.setdefault(table['table_id'], {})[customer_id] = group_size
+        self._reindex(table)
+        return table
+
+    def release(self, table_id: int, group_size: int, customer_id: int = None):
+        """
+        Zwalnia miejsca grupy przy stoliku. Zwraca stolik albo None jeśli nie ma takiego table_id
+        albo grupa customer_id już przy nim nie siedzi (grupę posadzoną z customer_id zwalniamy też z nim).
+        """
+        table = self.tables.get(table_id)
+        if table is None:
+            return None
+        if customer_id is not None:
+            seated = self.occupants.get(table_id)
+            if not seated or customer_id not in seated:
+                return None
+            group_size = seated.pop(customer_id)
+            if not seated:
+                del self.occupants[table_id]
+        # Aktualizujemy liczbę zajętych miejsc
+        table['used_seats'] -= group_size
+        if table['used_seats'] < 0:
+            table['used_seats'] = 0
+        # Jeśli stolik jest całkowicie pusty, resetujemy group_size
+        if table['used_seats'] == 0:
+            table['group_size'] = None
+        self._reindex(table)
+        return table
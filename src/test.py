@@ -3,6 +3,66 @@ import subprocess
 import sys
 import time
 import os
+import random
+from tables import TableStore
+from timers import TimerHeap, TimerScheduler
+import protocol
+import selectors
+import tempfile
+from outbox import ReplyOutbox
+from board import TableBoard, TABLE_OPEN, TABLE_FIRE
+from simulation import PizzeriaSimulation, compare_policies
+from policies import make_policy
+import planner
+import benchmark
+import harness
+from metrics import MetricsRegistry, start_metrics_server
+import urllib.request
+import timeline
+from waitlist import Waitlist
+from evacuation import Evacuation
+from utils import flush_requests
+from gui import FrameCoalescer, GuiFrameStats, drain_queue, draw_changes, next_poll_interval
+import gui
+import queue
+import threading
+import supervisor
+from customer import customer_process
+import runtrace
+import clock
+import loadgen
+import control
+import profiling
+import log
+from unittest import mock
+import signal
+import shutil
+from customer_pool import CustomerPool
+from multiprocessing import Event
+
+
+MAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+def start_main(test, env=None, **popen_kwargs):
+    """
+    main.py w katalogu tymczasowym (z własnym fifo/), sprzątanym po teście - pizzeria_log.txt,
+    przebieg (TIMELINE_FILE) i ślad (TRACE_FILE) nie trafiają do katalogu z kodem
+    """
+    workdir = tempfile.mkdtemp(prefix="pizzeria_main_")
+    os.makedirs(os.path.join(workdir, "fifo"))
+    test.addCleanup(shutil.rmtree, workdir, True)
+    # własna grupa procesów: terminate() zabija tylko main, a manager, strażak i klienci zostaliby sierotami
+    proc = subprocess.Popen([sys.executable, MAIN_PY], cwd=workdir, env=dict(os.environ, **(env or {})),
+                            text=True, start_new_session=True, **popen_kwargs)
+    test.addCleanup(stop_main, proc)
+    return proc
+
+def stop_main(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass # cała grupa już się zakończyła
+    proc.wait()
 
 
 class TestPizzeriaIntegration(unittest.TestCase):
@@ -19,12 +79,7 @@ class TestPizzeriaIntegration(unittest.TestCase):
         - Tutaj czytamy stdout i sprawdzamy, czy liczba aktywnych klientów kiedykolwiek > MAX_CONCURRENT_CUSTOMERS
         """
 
-        proc = subprocess.Popen(
-            [sys.executable, "main.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        proc = start_main(self, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         start_time = time.time()
         limit_exceeded = False
@@ -73,20 +128,16 @@ class TestPizzeriaIntegration(unittest.TestCase):
         Założenie:
           - Uruchamiamy main.py, czekamy, aż Firefighter ustawi event pożaru
           - Obserwujemy czy Manager otwiera ponownie pizzerię (log "[Manager] Otwieranie pizzerii po pożarze.")
-          - Jeśli w 80s nie zobaczymy tego loga => prawdopodobnie mamy blokadę
+          - Jeśli w TIME_LIMIT nie zobaczymy tego loga => prawdopodobnie mamy blokadę
+          - Czas modelu przyspieszony PIZZERIA_TIME_SCALE (clock.py), więc nie czekamy 30..45 s na pożar
         """
 
-        proc = subprocess.Popen(
-            [sys.executable, "main.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        proc = start_main(self, env={"PIZZERIA_TIME_SCALE": "50"}, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         start_time = time.time()
         manager_reopened = False
-        # Firefighter generuje pożar w 30..45 sekund, plus 10 sekund Manager odczekuje zanim otworzy ponownie pizzerie
-        TIME_LIMIT = 80 
+        # Firefighter generuje pożar w 30..45 sekund, plus 5 sekund zamknięcia - przy 50x to ok. 1 s (reszta to start procesów)
+        TIME_LIMIT = 20
 
         while True:
             line = proc.stdout.readline()
@@ -110,6 +161,1020 @@ class TestPizzeriaIntegration(unittest.TestCase):
 
         self.assertTrue(manager_reopened, f"Nie znaleziono w logach '[Manager] Reinicjalizacja stolików zakończona.' w {TIME_LIMIT}s => możliwe zakleszczenie!")
 
+class TestTableStore(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestTableStore
+    """
+
+    @staticmethod
+    def linear_seat(tables, group_size):
+        # stara wersja seat_customer_group (skanowanie wszystkich stolików)
+        for size in sorted(tables.keys()):
+            if size >= group_size:
+                for table in tables[size]:
+                    if table['group_size'] in (None, group_size):
+                        free = table['capacity'] - table['used_seats']
+                        if free >= group_size:
+                            table['used_seats'] += group_size
+                            if table['group_size'] is None:
+                                table['group_size'] = group_size
+                            return table
+        return None
+
+    def test_same_choices_as_linear_scan(self):
+        """
+        Test: TableStore sadza grupy dokładnie tak jak stary seat_customer_group
+        """
+        rng = random.Random(1)
+        counts = {1: 3, 2: 5, 3: 4, 4: 6}
+        store = TableStore(counts)
+        reference = TableStore(counts).as_dict()
+        seated = []
+
+        for _ in range(5000):
+            if seated and rng.random() < 0.45:
+                table_id, group_size = seated.pop(rng.randrange(len(seated)))
+                store.release(table_id, group_size)
+                for table in (t for size_list in reference.values() for t in size_list):
+                    if table['table_id'] == table_id:
+                        table['used_seats'] -= group_size
+                        if table['used_seats'] == 0:
+                            table['group_size'] = None
+                continue
+
+            group_size = rng.choice((1, 2, 3))
+            got = store.seat(group_size)
+            expected = self.linear_seat(reference, group_size)
+            self.assertEqual(got and got['table_id'], expected and expected['table_id'])
+            if got:
+                seated.append((got['table_id'], group_size))
+
+    def test_release_unknown_table(self):
+        store = TableStore({1: 1})
+        self.assertIsNone(store.release(99, 1))
+
+class TestTimers(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestTimers
+    """
+
+    def test_heap_cancel_and_order(self):
+        timers = TimerHeap()
+        timers.push(3.0, "c")
+        b = timers.push(2.0, "b")
+        timers.push(1.0, "a")
+        timers.cancel(b)
+        self.assertEqual(len(timers), 2)
+        self.assertEqual(timers.pop_expired(2.5), ["a"])
+        self.assertEqual(timers.next_deadline(), 3.0)
+
+    def test_sleep_expires_and_is_interrupted(self):
+        """
+        Test: sleep() kończy się po czasie albo od razu po ustawieniu eventu (np. pożaru)
+        """
+        scheduler = TimerScheduler(event_poll=0.005)
+        self.assertTrue(scheduler.sleep(0.05))
+
+        fire = threading.Event()
+        threading.Timer(0.05, fire.set).start()
+        start = time.time()
+        self.assertFalse(scheduler.sleep(10, (fire,)))
+        self.assertLess(time.time() - start, 1)
+
+class TestProtocol(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestProtocol
+    """
+
+    def test_roundtrip_both_protocols(self):
+        """
+        Test: text i binary dają po zdekodowaniu te same wiadomości, także gdy bufor urywa się w połowie
+        """
+        for proto in ("text", "binary"):
+            fifo = protocol.customer_fifo_path(7)
+            stream = (
+                protocol.encode_request(protocol.REQUEST_SEAT, 2, 7, 0, fifo, protocol=proto)
+                + protocol.encode_request(protocol.CUSTOMER_DONE, 2, 0, 5, fifo, protocol=proto)
+            )
+            first, rest = protocol.decode_requests(stream[:-3], protocol=proto)
+            second, rest = protocol.decode_requests(rest + stream[-3:], protocol=proto)
+            self.assertEqual(rest, b"")
+            messages = [m[:4] for m in first + second]
+            self.assertEqual(messages, [(protocol.REQUEST_SEAT, 2, 7, 0), (protocol.CUSTOMER_DONE, 2, 0, 5)])
+
+            reply = protocol.encode_reply(protocol.SEATED, 2, 0, 5, protocol=proto)
+            self.assertEqual(protocol.decode_replies(reply, protocol=proto), ([(protocol.SEATED, 2, 0, 5)], b""))
+
+    def test_record_fits_pipe_buf(self):
+        import select
+        self.assertLessEqual(protocol.RECORD.size, select.PIPE_BUF)
+
+class TestReplyOutbox(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestReplyOutbox
+    """
+
+    def test_reply_waits_for_slow_client(self):
+        """
+        Test: odpowiedź do klienta, który jeszcze nie otworzył fifo, czeka w skrzynce i dochodzi później
+        """
+        client_fifo = os.path.join(tempfile.mkdtemp(), "Customer_fifo_1")
+        os.mkfifo(client_fifo)
+        selector = selectors.DefaultSelector()
+        outbox = ReplyOutbox(selector)
+
+        outbox.send(client_fifo, b"SEATED 1 1\n")
+        self.assertTrue(outbox.waiting_for_reader())
+
+        fd = os.open(client_fifo, os.O_RDONLY | os.O_NONBLOCK)
+        outbox.maintain()
+        self.assertFalse(outbox.waiting_for_reader())
+        self.assertEqual(os.read(fd, 100), b"SEATED 1 1\n")
+
+        # klient zniknął - kanał jest usuwany zamiast blokować managera
+        os.close(fd)
+        outbox.send(client_fifo, b"LEAVE 1 1\n")
+        self.assertEqual(outbox.evicted, 1)
+        self.assertEqual(len(outbox.channels), 0)
+        outbox.close_all()
+        selector.close()
+
+class TestTableBoard(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestTableBoard
+    """
+
+    def test_snapshot_sees_whole_write(self):
+        board = TableBoard.create(4)
+        try:
+            with board.write():
+                board.set_table(1, 2, 4, 2)
+                board.set_table(2, 0, 1, None)
+                board.set_profit(42)
+            snap = board.snapshot()
+            self.assertEqual(snap['generation'] % 2, 0)
+            self.assertEqual(snap['profit'], 42)
+            self.assertEqual(snap['tables'], {1: (2, 4, 2, TABLE_OPEN), 2: (0, 1, 0, TABLE_OPEN)})
+
+            with board.write():
+                board.set_fire(True)
+                board.set_table(1, 2, 4, 2, TABLE_FIRE)
+            snap = board.snapshot()
+            self.assertTrue(snap['fire'])
+            self.assertEqual(snap['tables'][1][3], TABLE_FIRE)
+        finally:
+            board.close()
+            board.unlink()
+
+class TestGui(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestGui
+    """
+
+    def test_coalescer_keeps_newest_state(self):
+        """
+        Test: kilka TABLE_UPDATE jednego stolika daje jedną zmianę z najnowszym stanem, a z profitów zostaje ostatni
+        """
+        coalescer = FrameCoalescer()
+        for used_seats in (1, 2, 3):
+            coalescer.apply("TABLE_UPDATE", (4, used_seats, 4))
+        coalescer.apply("TABLE_UPDATE", (5, 1, 2))
+        for profit in (10, 20, 30):
+            coalescer.apply("PROFIT_UPDATE", profit)
+        changes, profit = coalescer.take_changes()
+        self.assertEqual(sorted(changes), [(4, ("TABLE_UPDATE", 3, 4)), (5, ("TABLE_UPDATE", 1, 2))])
+        self.assertEqual(profit, 30)
+
+        # to samo, co już narysowane, nie jest zmianą
+        coalescer.apply("TABLE_UPDATE", (4, 3, 4))
+        coalescer.apply("PROFIT_UPDATE", 30)
+        self.assertEqual(coalescer.take_changes(), ([], None))
+
+        # profity kilku shardów się sumują
+        coalescer.apply("PROFIT_UPDATE", (0, 30))
+        coalescer.apply("PROFIT_UPDATE", (1, 12))
+        self.assertEqual(coalescer.take_changes()[1], 42)
+
+    def test_postpone_does_not_overwrite_newer_state(self):
+        """
+        Test: nienarysowane zmiany wracają do następnej klatki, ale nie nadpisują stanu, który przyszedł w międzyczasie
+        """
+        coalescer = FrameCoalescer()
+        coalescer.apply("TABLE_UPDATE", (1, 1, 2))
+        coalescer.apply("TABLE_UPDATE", (2, 1, 2))
+        changes, _ = coalescer.take_changes()
+        coalescer.apply("TABLE_UPDATE", (2, 2, 2)) # nowszy stan stolika 2 przed kolejną klatką
+        coalescer.postpone(changes)
+        changes, _ = coalescer.take_changes()
+        self.assertEqual(sorted(changes), [(1, ("TABLE_UPDATE", 1, 2)), (2, ("TABLE_UPDATE", 2, 2))])
+
+    def test_frame_budget(self):
+        """
+        Test: zbieranie i rysowanie kończą się po przekroczeniu terminu, a reszta zostaje na następną klatkę
+        """
+        coalescer = FrameCoalescer()
+        gui_queue = queue.Queue()
+        for table_id in range(1, 201):
+            gui_queue.put(("TABLE_UPDATE", (table_id, 1, 2)))
+
+        # zegar sprawdzany co 64 komunikaty: 0 (przed terminem), 64 (przed), 128 (po terminie)
+        ticks = iter([0.0, 0.5, 2.0])
+        drained, backlog = drain_queue(gui_queue, coalescer, 1.0, clock=lambda: next(ticks))
+        self.assertEqual((drained, backlog, gui_queue.qsize()), (128, True, 72))
+        drained, backlog = drain_queue(gui_queue, coalescer, 1.0, clock=lambda: 0.0)
+        self.assertEqual((drained, backlog), (72, False))
+
+        changes, _ = coalescer.take_changes()
+        drawn = []
+        ticks = iter([0.0] * 50 + [2.0])
+        self.assertTrue(draw_changes(coalescer, changes, lambda *change: drawn.append(change), 1.0, clock=lambda: next(ticks)))
+        self.assertEqual(drawn, changes[:50])
+        rest, _ = coalescer.take_changes()
+        self.assertEqual(sorted(rest), sorted(changes[50:]))
+        self.assertFalse(draw_changes(coalescer, rest, lambda *change: drawn.append(change), 1.0, clock=lambda: 0.0))
+        self.assertEqual(len(drawn), 200)
+
+    def test_poll_interval_adapts(self):
+        """
+        Test: przy ciszy odstęp rośnie do GUI_POLL_MAX_MS, przy zmianach maleje, a przy zaległościach od razu GUI_POLL_MIN_MS
+        """
+        interval = gui.GUI_POLL_MIN_MS
+        for _ in range(20):
+            interval = next_poll_interval(interval, 0, False, False)
+        self.assertEqual(interval, gui.GUI_POLL_MAX_MS)
+
+        halved = next_poll_interval(interval, 3, False, False)
+        self.assertEqual(halved, max(gui.GUI_POLL_MIN_MS, gui.GUI_POLL_MAX_MS // 2))
+        self.assertEqual(next_poll_interval(interval, 0, True, False), halved)
+        for _ in range(20):
+            interval = next_poll_interval(interval, 1, True, False)
+        self.assertEqual(interval, gui.GUI_POLL_MIN_MS)
+        self.assertEqual(next_poll_interval(gui.GUI_POLL_MAX_MS, 0, False, True), gui.GUI_POLL_MIN_MS)
+
+    def test_queue_lag(self):
+        """
+        Test: opóźnienie kolejki rośnie, dopóki klatki kończą się z zaległościami, i zeruje się po opróżnieniu kolejki
+        """
+        stats = GuiFrameStats()
+        stats.last_drained -= 1.0 # ostatnio opróżniona sekundę temu
+        stats.record(0.01, 100, backlog=True)
+        self.assertGreaterEqual(stats.queue_lag(), 1.0)
+        stats.record(0.02, 5, backlog=False)
+        self.assertLess(stats.queue_lag(), 0.5)
+        self.assertGreaterEqual(stats.max_queue_lag, 1.0)
+        self.assertEqual((stats.frames, stats.messages, stats.max_frame_time), (2, 105, 0.02))
+
+
+class TestSimulation(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestSimulation
+    """
+
+    def test_every_group_is_counted_once(self):
+        """
+        Test: każda grupa jest przyjęta, odrzucona albo odesłana przy pożarze, a wynik zależy tylko od seed
+        """
+        # przyjścia gęstsze niż jedzenie, żeby były też odrzucenia
+        stats = PizzeriaSimulation(seed=3, arrival_interval=(0.01, 0.05), fire_interval=(5, 10), closure_duration=1).run(20000)
+        accepted = sum(stats['group_accepted'].values())
+        rejected = sum(stats['group_rejected'].values())
+        self.assertEqual(accepted + rejected + stats['evacuated'], 20000)
+        self.assertGreater(rejected, 0)
+        self.assertGreater(stats['fires'], 0)
+        self.assertEqual(sum(stats['table_usage'].values()), accepted)
+
+        again = PizzeriaSimulation(seed=3, arrival_interval=(0.01, 0.05), fire_interval=(5, 10), closure_duration=1).run(20000)
+        self.assertEqual(stats, again)
+
+
+@unittest.skipIf(planner.np is None, "planner wymaga numpy")
+class TestPlanner(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestPlanner
+    """
+
+    def test_matches_simulation(self):
+        """
+        Test: średnie z powtórzeń NumPy zgadzają się z długim przebiegiem symulacji zdarzeń dyskretnych
+        """
+        interval = (0.0625, 0.125) # obciążenie, przy którym część grup jest odrzucana
+        raw = planner.simulate_layout({1: 2, 2: 2, 3: 2, 4: 2}, 400, 1000, arrival_interval=interval, seed=5)
+        stats = PizzeriaSimulation(seed=5, arrival_interval=interval).run(200000)
+        accepted = sum(stats['group_accepted'].values())
+        rejected = sum(stats['group_rejected'].values())
+
+        self.assertTrue(((raw['accepted'] + raw['rejected'] + raw['evacuated']) == 1000).all())
+        self.assertAlmostEqual(raw['rejection_rate'].mean(), rejected / (accepted + rejected), delta=0.02)
+        self.assertAlmostEqual(raw['seat_utilisation'].mean(), stats['seat_utilisation'], delta=0.02)
+
+class TestBenchmarkCompare(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestBenchmarkCompare
+    """
+
+    def test_regressions_follow_metric_direction(self):
+        """
+        Test: spadek przepustowości i wzrost opóźnienia ponad tolerancję to regresje, poprawa i metryki informacyjne nie
+        """
+        baseline = {
+            'seating': [{'tables': 8, 'ns_per_op': 1000.0}],
+            'manager_throughput': {'messages': 100, 'msgs_per_sec': 1000.0},
+            'seat_latency': {'p50_ms': 1.0, 'p99_ms': 2.0},
+        }
+        current = {
+            'seating': [{'tables': 8, 'ns_per_op': 500.0}],
+            'manager_throughput': {'messages': 500, 'msgs_per_sec': 700.0},
+            'seat_latency': {'p50_ms': 1.1, 'p99_ms': 3.0},
+        }
+        rows = {metric: regression for metric, _, _, _, regression in benchmark.compare_results(current, baseline, 0.2)}
+        self.assertEqual(rows, {
+            'seating[tables=8].ns_per_op': False,
+            'manager_throughput.msgs_per_sec': True,
+            'seat_latency.p50_ms': False,
+            'seat_latency.p99_ms': True,
+        })
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestMetrics
+    """
+
+    def test_histogram_percentiles_and_endpoint(self):
+        """
+        Test: percentyle histogramu mieszczą się w błędzie względnym kubełków, a /metrics oddaje format Prometheusa
+        """
+        registry = MetricsRegistry()
+        hist = registry.histogram("test_wait_seconds", "czas")
+        counter = registry.counter("test_total", "licznik")
+        values = [i * 1e-6 for i in range(1, 100001)] # 1 us .. 100 ms
+        random.Random(1).shuffle(values)
+        for v in values:
+            hist.record(v)
+        counter.inc(3)
+
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(hist.percentile(q), q * 0.1, delta=q * 0.1 * 0.02)
+        self.assertEqual(hist.count, len(values))
+
+        server = start_metrics_server(registry, "127.0.0.1", 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn("# TYPE test_wait_seconds summary", body)
+        self.assertIn('test_wait_seconds{quantile="0.99"}', body)
+        self.assertIn("test_wait_seconds_count 100000", body)
+        self.assertIn("test_total 3", body)
+
+
+class TestLog(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestLog
+    """
+
+    def test_levels_and_lazy_formatting(self):
+        """
+        Test: wpis poniżej progu nie jest formatowany, a wpisy z procesu i jego dziecka trafiają na stdout całymi liniami
+        """
+        script = (
+            "import log, os\n"
+            "from multiprocessing import Process\n"
+            "class Loud:\n"
+            "    def __str__(self):\n"
+            "        raise AssertionError('sformatowano wpis DEBUG')\n"
+            "log.set_level('INFO')\n"
+            "logger = log.get_logger('Test')\n"
+            "logger.debug('nie powinno %s', Loud())\n"
+            "logger.info('rodzic %s', 1)\n"
+            "def child():\n"
+            "    log.get_logger('Dziecko').info('linia %s', 2)\n"
+            "p = Process(target=child); p.start(); p.join()\n"
+        )
+        out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=30)
+        self.assertEqual(out.stderr, "")
+        self.assertEqual(sorted(out.stdout.splitlines()), ["[Dziecko] linia 2", "[Test] rodzic 1"])
+
+    def test_full_pipe_waits_without_spinning(self):
+        """
+        Test: przy pełnym nieblokującym potoku zapis czeka w select najwyżej LOG_WRITE_TIMEOUT, a nie kręci się w pętli
+        """
+        r, w = os.pipe()
+        self.addCleanup(os.close, r)
+        self.addCleanup(os.close, w)
+        os.set_blocking(w, False)
+        try:
+            while True:
+                os.write(w, b"x" * 65536)
+        except BlockingIOError:
+            pass
+
+        with mock.patch.object(log, "_out_fd", w), mock.patch.object(log, "LOG_WRITE_TIMEOUT", 0.3):
+            started, cpu_started = time.monotonic(), time.process_time()
+            log._write_all(b"[Test] linia\n")
+            elapsed, cpu = time.monotonic() - started, time.process_time() - cpu_started
+        self.assertGreaterEqual(elapsed, 0.25)
+        self.assertLess(elapsed, 2.0)
+        self.assertLess(cpu, 0.1)
+
+
+class TestTimeline(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestTimeline
+    """
+
+    def test_intervals_survive_rotation_and_aggregate(self):
+        """
+        Test: rekordy z rotowanych plików sumują się do tych samych liczb co zdarzenia, zajętość jest ważona czasem
+        """
+        store = TableStore({2: 1, 4: 1})
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "timeline.jsonl")
+            writer = timeline.TimelineWriter(path, max_bytes=1500, backups=50)
+            recorder = timeline.TimelineRecorder(writer, store, (1, 2), interval=1.0, now=0.0)
+            now = 0.0
+            for _ in range(40):
+                recorder.arrival(2)
+                tbl = store.seat(2)
+                recorder.seated(tbl, 2, 20, now)
+                now += 0.5
+                recorder.released_group(store.release(tbl['table_id'], 2), now)
+                recorder.arrival(1)
+                recorder.rejected_group(1) # tylko na liczniki
+                now += 0.5
+                recorder.maybe_write(now)
+            recorder.fire(now)
+            recorder.evacuated_group()
+            recorder.reopen(now + 2.0)
+            recorder.close(now + 2.0)
+
+            self.assertGreater(len(timeline.timeline_files(path)), 1)
+            summary = timeline.aggregate(timeline.read_timeline(path))
+
+        self.assertEqual(summary['arrivals'], {'1': 40, '2': 40})
+        self.assertEqual(summary['accepted']['2'], 40)
+        self.assertEqual(summary['rejected']['1'], 40)
+        self.assertEqual(summary['profit'], 800)
+        self.assertEqual(summary['fires'], 1)
+        self.assertEqual(summary['evacuated'], 1)
+        self.assertAlmostEqual(summary['duration'], 42.0)
+        self.assertAlmostEqual(summary['closed_seconds'], 2.0)
+        # stolik 2-osobowy zajęty w połowie czasu przez 40 s z 42 s
+        self.assertAlmostEqual(summary['tables']['1']['occupancy'], 2 * 20.0 / 42.0)
+        self.assertAlmostEqual(summary['tables']['1']['dwell_avg'], 0.5)
+        self.assertAlmostEqual(summary['utilisation'], 40.0 / (6 * 42.0))
+
+
+class TestWaitlist(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestWaitlist
+    """
+
+    def test_match_expire_and_bound(self):
+        """
+        Test: zwolniony stolik dostaje najdłużej czekającą pasującą grupę, kolejka ma limit, a po max_wait grupy wypadają
+        """
+        waitlist = Waitlist((1, 2, 3), max_per_size=2, max_wait=1.0)
+        self.assertTrue(waitlist.add(3, "a", 0.0))
+        self.assertTrue(waitlist.add(2, "b", 0.1))
+        self.assertTrue(waitlist.add(2, "c", 0.2))
+        self.assertFalse(waitlist.add(2, "d", 0.3)) # limit na rozmiar
+
+        # stolik 2-osobowy z grupą 1-osobową - nikt nie pasuje
+        self.assertIsNone(waitlist.pop_for({'capacity': 2, 'used_seats': 1, 'group_size': 1}, 0.4))
+        # pusty 2-osobowy - grupa 3 się nie zmieści, bierzemy najstarszą 2
+        self.assertEqual(waitlist.pop_for({'capacity': 2, 'used_seats': 0, 'group_size': None}, 0.5)[:2], (2, "b"))
+        # pusty 4-osobowy - najstarsza ze wszystkich
+        self.assertEqual(waitlist.pop_for({'capacity': 4, 'used_seats': 0, 'group_size': None}, 0.6)[:2], (3, "a"))
+
+        self.assertEqual(waitlist.expire(1.3), [(2, "c")])
+        self.assertEqual(len(waitlist), 0)
+        self.assertEqual(waitlist.stats()['matched'], 2)
+
+    def test_simulation_counts_every_group(self):
+        """
+        Test: z listą oczekujących każda grupa jest przyjęta, odrzucona, odesłana albo wciąż czeka, i przyjętych jest więcej
+        """
+        kwargs = dict(seed=4, arrival_interval=(0.01, 0.1), fire_interval=(20, 30), closure_duration=1)
+        without = PizzeriaSimulation(**kwargs).run(20000)
+        stats = PizzeriaSimulation(waitlist=True, **kwargs).run(20000)
+        accepted = sum(stats['group_accepted'].values())
+        rejected = sum(stats['group_rejected'].values())
+        self.assertEqual(accepted + rejected + stats['evacuated'] + stats['waiting'], 20000)
+        self.assertGreater(stats['waitlist']['matched'], 0)
+        self.assertGreater(accepted, sum(without['group_accepted'].values()))
+        self.assertLessEqual(stats['waitlist']['wait_max'], 2.0 + 1e-9)
+
+    def test_manager_expires_before_seating(self):
+        """
+        Test: manager nie sadza z listy grupy, której minął WAITLIST_MAX_WAIT, tylko odsyła jej REJECTED
+        """
+        # długi MANAGER_POLL_TIMEOUT - koniec pętli nie wyrzuci grupy z listy przed CUSTOMER_DONE
+        with mock.patch("manager.WAITLIST_ENABLED", True), \
+             mock.patch("manager.WAITLIST_MAX_WAIT", 0.3 * clock.get_clock().scale), \
+             mock.patch("manager.MANAGER_POLL_TIMEOUT", 2.0), \
+             harness.running_manager() as (server_fd,):
+            clients = harness.BenchClients(2)
+            try:
+                # wolny zostaje tylko stolik 5 (3-osobowy)
+                for table_id in (1, 2, 3, 4, 6, 7, 8):
+                    TestLiveTables.send("CLOSE", table_id)
+                TestLiveTables.request(server_fd, 0, 3)
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 5))
+
+                TestLiveTables.request(server_fd, 1, 3) # czeka na liście
+                time.sleep(0.5)
+                TestLiveTables.request(server_fd, 0, 3, protocol.CUSTOMER_DONE, 5)
+                (customer_id, reply), = clients.replies(1)
+                self.assertEqual((customer_id, reply[0]), (1, protocol.REJECTED))
+            finally:
+                clients.close()
+
+
+class TestPolicies(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestPolicies
+    """
+
+    def test_best_fit_shares_instead_of_opening_a_table(self):
+        """
+        Test: first_fit daje jedynkę pustemu stolikowi 3-osobowemu, best_fit dosadza ją do jedynek przy 4-osobowym
+        """
+        for policy, expected_capacity in (("first_fit", 3), ("best_fit", 4), ("lookahead", 4)):
+            # stolik 3-osobowy pusty, przy 4-osobowym siedzi jedynka
+            store = TableStore({3: 1, 4: 1})
+            for _ in range(4):
+                store.seat(1)
+            for _ in range(3):
+                store.release(1, 1)
+            store.policy = make_policy(policy)
+            self.assertEqual(store.seat(1)['capacity'], expected_capacity, policy)
+
+        with self.assertRaises(ValueError):
+            make_policy("random")
+
+    def test_same_arrivals_for_every_policy(self):
+        """
+        Test: harness porównania przepuszcza ten sam strumień przyjść, a zajęte miejsca w czasie zgadzają się z wykorzystaniem
+        """
+        results = compare_policies(("first_fit", "best_fit", "lookahead"), 5000, seed=3, interval=50.0,
+                                   arrival_interval=(0.05, 0.1), fire_interval=(100, 200))
+        arrivals = set()
+        for policy, result in results.items():
+            stats = result['stats']
+            accepted = sum(stats['group_accepted'].values())
+            rejected = sum(stats['group_rejected'].values())
+            arrivals.add((accepted + rejected + stats['evacuated'], stats['virtual_seconds'], stats['fires']))
+            occupied = result['seats_occupied']
+            self.assertGreater(len(occupied), 1)
+            seat_seconds = sum(duration * seats for _, duration, seats in occupied)
+            self.assertAlmostEqual(seat_seconds / stats['virtual_seconds'] / 20,
+                                   stats['seat_utilisation'], delta=0.001, msg=policy)
+        self.assertEqual(len(arrivals), 1)
+
+
+class TestCustomerPool(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestCustomerPool
+    """
+
+    def test_wait_for_slot_wakes_on_finished_groups(self):
+        """Test: main czeka na wolne miejsce w puli na warunku, budzą go grupy odrzucone przez managera"""
+        with harness.running_manager():
+            fire_event, close_event = Event(), Event()
+            pool = CustomerPool(1, fire_event, close_event)
+            try:
+                # 3-osobowe grupy mieszczą się przy 4 stolikach (pojemność 3 i 4), reszta dostaje REJECTED
+                for customer_id in range(12):
+                    pool.submit(3, customer_id)
+                start = time.monotonic()
+                self.assertTrue(pool.wait_for_slot(5, lambda: time.monotonic() - start > 10))
+                self.assertLess(pool.active(), 5)
+                self.assertFalse(pool.wait_for_slot(1, lambda: True))
+            finally:
+                close_event.set()
+                pool.join()
+
+class TestShards(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestShards
+    """
+
+    def test_tables_partition_and_hops_roundtrip(self):
+        stores = [TableStore({1: 2, 2: 2, 3: 2, 4: 2}, shard=shard, shards=2) for shard in range(2)]
+        self.assertEqual(sorted(stores[0].tables), [1, 3, 5, 7])
+        self.assertEqual(sorted(stores[1].tables), [2, 4, 6, 8])
+        self.assertTrue(all(protocol.table_shard(table_id, 2) == 1 for table_id in stores[1].tables))
+
+        for proto in ("text", "binary"):
+            data = protocol.encode_request(protocol.REQUEST_SEAT, 3, 9, 0, protocol.customer_fifo_path(9), protocol=proto, hops=1)
+            (msg,), _ = protocol.decode_requests(data, protocol=proto)
+            self.assertEqual((msg[0], msg[1], msg[2], msg[6]), (protocol.REQUEST_SEAT, 3, 9, 1))
+
+    def test_handoff_between_two_shards(self):
+        """
+        Test: shard 0 bez miejsca przekazuje grupę do shardu 1, a gdy oba są pełne, grupa dostaje REJECTED;
+        CUSTOMER_DONE trafia do shardu, który ma stolik
+        """
+        with harness.running_manager(shards=2) as server_fds:
+            clients = harness.BenchClients(6)
+            try:
+                # grupy 3-osobowe mieszczą się przy stolikach 5, 7 (shard 0) i 6, 8 (shard 1)
+                for customer_id in range(5):
+                    os.write(server_fds[0], protocol.encode_request(
+                        protocol.REQUEST_SEAT, 3, customer_id, 0, protocol.customer_fifo_path(customer_id)))
+                replies = dict(clients.replies(5))
+                seated = {reply[3] for reply in replies.values() if reply[0] == protocol.SEATED}
+                self.assertEqual(seated, {5, 6, 7, 8})
+                self.assertEqual([reply[0] for reply in replies.values()].count(protocol.REJECTED), 1)
+
+                # CUSTOMER_DONE od grupy, która naprawdę siedzi przy stoliku 6 (inne manager pomija)
+                at_table_6, = (customer_id for customer_id, reply in replies.items() if reply[0] == protocol.SEATED and reply[3] == 6)
+                os.write(server_fds[protocol.table_shard(6, 2)], protocol.encode_request(
+                    protocol.CUSTOMER_DONE, 3, at_table_6, 6, protocol.customer_fifo_path(at_table_6)))
+                os.write(server_fds[0], protocol.encode_request(
+                    protocol.REQUEST_SEAT, 3, 5, 0, protocol.customer_fifo_path(5)))
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 6))
+            finally:
+                clients.close()
+
+
+def short_customer(seconds: float, customer_id: int, notify_conn):
+    # zamiast customer_process - zgłasza gotowość i wyjście jak prawdziwy klient
+    supervisor.notify(notify_conn, supervisor.READY, customer_id)
+    time.sleep(seconds)
+    supervisor.notify(notify_conn, supervisor.EXITING, customer_id)
+
+
+class TestSupervisor(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestSupervisor
+    """
+
+    def test_limit_reap_and_idle_wait(self):
+        """
+        Test: nigdy więcej niż max_customers żywych procesów, każdy zebrany (z metrykami),
+        a czekanie na wolne miejsce nie zajmuje procesora w main
+        """
+        registry = MetricsRegistry()
+        sup = supervisor.CustomerSupervisor(3, registry)
+        try:
+            max_alive = 0
+            cpu = 0.0
+            for customer_id in range(9):
+                cpu_before = time.process_time()
+                self.assertTrue(sup.wait_for_slot(lambda: False))
+                cpu += time.process_time() - cpu_before
+                sup.spawn(short_customer, (0.3, customer_id), f"Customer-{customer_id}", customer_id)
+                max_alive = max(max_alive, sum(1 for p, _ in sup.procs.values() if p.is_alive()))
+            sup.join_all()
+
+            self.assertLessEqual(max_alive, 3)
+            self.assertEqual((sup.spawned_total.value, sup.reaped_total.value, len(sup)), (9, 9, 0))
+            self.assertEqual(sup.spawn_ready.count, 9)
+            self.assertEqual(sup.reap_lag.count, 9)
+            self.assertLess(sup.reap_lag.percentile(0.99), 0.1)
+            # ok. 0.6 s czekania na zakończenie klientów; odpytywanie is_alive() zużyłoby cały ten czas procesora
+            self.assertLess(cpu, 0.2)
+            self.assertIn("pizzeria_customers_reaped_total 9", registry.render())
+        finally:
+            sup.close()
+
+    def test_customer_from_forkserver(self):
+        """Test: customer_process startuje z forkserwera (CUSTOMER_START_METHOD) i zgłasza gotowość oraz wyjście"""
+        context = supervisor.customer_context("forkserver")
+        fire_event, close_event = context.Event(), context.Event()
+        close_event.set() # klient tylko prosi o stolik i wychodzi
+        with harness.running_manager():
+            sup = supervisor.CustomerSupervisor(1, context=context)
+            try:
+                sup.spawn(customer_process, (fire_event, close_event, 2, 0), "Customer-0", 0)
+                sup.join_all()
+                self.assertEqual((sup.spawn_ready.count, sup.reap_lag.count), (1, 1))
+            finally:
+                sup.close()
+
+
+class TestEvacuation(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestEvacuation
+    """
+
+    def test_done_when_seated_reported_and_leave_delivered(self):
+        client_fifo = os.path.join(tempfile.mkdtemp(), "Customer_fifo_1")
+        os.mkfifo(client_fifo)
+        selector = selectors.DefaultSelector()
+        outbox = ReplyOutbox(selector)
+        evacuation = Evacuation(signal_at=100.0, seated_groups=1, slo=0.5)
+
+        # klient jeszcze nie otworzył fifo - LEAVE czeka, więc nie wyszedł
+        evacuation.leave_sent(client_fifo)
+        outbox.send(client_fifo, protocol.encode_reply(protocol.LEAVE, 2, 1, 0), close_after=True)
+        evacuation.customer_out(100.2)
+        self.assertFalse(evacuation.update(outbox, 100.3))
+
+        fd = os.open(client_fifo, os.O_RDONLY | os.O_NONBLOCK)
+        outbox.maintain()
+        self.assertTrue(evacuation.update(outbox, 100.4))
+        self.assertAlmostEqual(evacuation.duration(), 0.4)
+        self.assertFalse(evacuation.breached())
+
+        # niepełna ewakuacja (ktoś się nie zgłosił do otwarcia) zawsze narusza SLO
+        unfinished = Evacuation(signal_at=100.0, seated_groups=1, slo=10)
+        unfinished.abandon(105.0)
+        self.assertTrue(unfinished.breached())
+        os.close(fd)
+        outbox.close_all()
+        selector.close()
+
+    def test_flush_requests_and_floor_fire(self):
+        r, w = os.pipe()
+        os.set_blocking(r, False)
+        data = b"".join(protocol.encode_request(protocol.REQUEST_SEAT, 2, customer_id, 0, protocol.customer_fifo_path(customer_id))
+                        for customer_id in range(3))
+        os.write(w, data[:-3])
+        messages, rest = flush_requests(r, b"", 4096, protocol.decode_requests)
+        self.assertEqual([msg[2] for msg in messages], [0, 1])
+        messages, rest = flush_requests(r, rest + data[-3:], 4096, protocol.decode_requests)
+        self.assertEqual(([msg[2] for msg in messages], rest), ([2], b""))
+        os.close(r)
+        os.close(w)
+
+        coalescer = FrameCoalescer()
+        coalescer.apply("FLOOR_FIRE", (1, 2, 3))
+        changes, _ = coalescer.take_changes()
+        self.assertEqual(changes, [(1, ("TABLE_FIRE",)), (2, ("TABLE_FIRE",)), (3, ("TABLE_FIRE",))])
+
+
+class TestTrace(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestTrace
+    """
+
+    def write_trace(self, path):
+        trace = runtrace.TraceWriter(path, truncate=True)
+        trace.header(1000.0)
+        for customer_id in range(4):
+            trace.arrival(customer_id, 1 + customer_id % 2, 1000.0 + 0.1 * customer_id)
+        trace.fire(1000.6)
+        trace.arrival(4, 2, 1000.7)
+        trace.fire_end(1001.0)
+        trace.arrival(5, 1, 1001.2)
+        trace.outcome(0, protocol.SEATED, 1, 0.002, 1000.002)
+        trace.close()
+
+    def test_load_and_diff(self):
+        path = os.path.join(tempfile.mkdtemp(), "trace.bin")
+        self.write_trace(path)
+        with open(path, "ab") as f:
+            f.write(b"\x01\x02") # urwany ostatni rekord (np. awaria) jest pomijany
+
+        run = runtrace.load_run(path)
+        self.assertEqual([customer_id for _, customer_id, _ in run['arrivals']], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(len(run['fires']), 1)
+        self.assertAlmostEqual(run['fires'][0][0], 0.6)
+        self.assertAlmostEqual(run['fires'][0][1], 1.0)
+        self.assertEqual(run['outcomes'][0][:2], (protocol.SEATED, 1))
+
+        other = dict(run, outcomes={0: (protocol.REJECTED, 0, 0.001, 0.001)})
+        diff = runtrace.diff_runs(run, other)
+        self.assertTrue(diff['same_workload'])
+        self.assertEqual(diff['changed'], [(0, "SEATED", "REJECTED")])
+        self.assertEqual(diff['counts']['other']['none'], 5)
+
+    def test_replay_is_repeatable(self):
+        path = os.path.join(tempfile.mkdtemp(), "trace.bin")
+        self.write_trace(path)
+        run = runtrace.load_run(path)
+
+        first = runtrace.replay(run, speed=4, out_path=os.path.join(os.path.dirname(path), "replay.bin"))
+        second = runtrace.replay(run, speed=4)
+        # każdy klient dostał odpowiedź, przyjście w czasie pożaru - LEAVE
+        self.assertEqual(sorted(first['outcomes']), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(first['outcomes'][4][0], protocol.LEAVE)
+        self.assertEqual(first['outcomes'][5][0], protocol.SEATED)
+        self.assertEqual(runtrace.diff_runs(first, second)['changed_outcome'], 0)
+        self.assertEqual(sorted(runtrace.load_run(os.path.join(os.path.dirname(path), "replay.bin"))['outcomes']), [0, 1, 2, 3, 4, 5])
+
+
+class TestClock(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestClock
+    """
+
+    def test_scale_from_environment(self):
+        self.assertEqual(clock.Clock(50).real(45), 0.9)
+        with self.assertRaises(ValueError):
+            clock.Clock(0)
+        # skala z PIZZERIA_TIME_SCALE trafia do procesów potomnych
+        output = subprocess.run([sys.executable, "-c", "from clock import get_clock; print(get_clock().real(10))"],
+                                env=dict(os.environ, PIZZERIA_TIME_SCALE="40"), capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), "0.25")
+
+    def test_soak_fire_cycles(self):
+        """Kilka pełnych cykli pożar -> ewakuacja -> otwarcie w 100x, bez błędów w logach i z czystym zamknięciem."""
+        proc = start_main(self, env={"PIZZERIA_TIME_SCALE": "100"}, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        reopened = 0
+        errors = []
+        deadline = time.time() + 30
+        for line in proc.stdout:
+            if "Reinicjalizacja stolików zakończona." in line:
+                reopened += 1
+                if reopened == 3:
+                    proc.send_signal(signal.SIGINT)
+            if "ERROR" in line or "Error:" in line:
+                errors.append(line.strip())
+            if time.time() > deadline:
+                proc.kill()
+                break
+        proc.wait(timeout=10)
+        proc.stdout.close()
+        self.assertGreaterEqual(reopened, 3)
+        # GUI bez ekranu (np. CI bez $DISPLAY) nie wystartuje - to nie błąd symulacji
+        self.assertEqual([line for line in errors if "TclError" not in line], [])
+
+
+class TestLoadgen(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestLoadgen
+    """
+
+    def test_ramp_against_manager(self):
+        steps = loadgen.ramp_steps(start=100, step=200, max_rate=300, step_seconds=1.0)
+        self.assertEqual(steps, [(0.0, 1.0, 100), (1.0, 2.0, 300)])
+
+        results = loadgen.run_load(steps, clients=64, eat_time=0.05)
+        for result, (_, _, rate) in zip(results, steps):
+            self.assertEqual(result['errors'], 0)
+            self.assertEqual(result['seated'] + result['rejected'], result['scheduled'])
+            self.assertGreater(result['replies_per_sec'], 0.5 * rate)
+        self.assertGreater(results[0]['seated'], 0)
+
+        # nasycenie: pierwszy schodek z błędami albo odpowiedziami wyraźnie poniżej zadanego tempa
+        slow = dict(results[1], replies_per_sec=100, offered_per_sec=300)
+        self.assertIsNone(loadgen.saturation(results[:1], max_p99_ms=1000))
+        self.assertIs(loadgen.saturation([results[0], slow], max_p99_ms=1000), slow)
+
+
+class TestLiveTables(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestLiveTables
+    """
+
+    def test_store_changes_in_place(self):
+        store = TableStore({1: 1, 2: 1})
+        table = store.add_table(6)
+        self.assertEqual((table['table_id'], store.capacities), (3, [1, 2, 6]))
+        self.assertEqual(store.seat(5)['table_id'], 3)
+
+        # zajęty stolik tylko się zamyka i znika razem z ostatnią grupą
+        self.assertIs(store.remove_table(3), False)
+        self.assertEqual(store.seat(1)['table_id'], 1)
+        store.release(3, 5)
+        self.assertNotIn(3, store)
+        self.assertIsNone(store.remove_table(3))
+
+        store.close_table(2)
+        self.assertIsNone(store.seat(2))
+        store.open_table(2)
+        self.assertEqual(store.seat(2)['table_id'], 2)
+
+        # clear_seats zwraca tylko stoliki, które były zajęte
+        self.assertEqual(sorted(t['table_id'] for t in store.clear_seats()), [1, 2])
+        self.assertEqual((store.clear_seats(), store.options(1)), ([], 2))
+
+        # zwolnienie od grupy, która już nie siedzi przy stoliku, niczego nie zmienia
+        table = store.seat(1, customer_id=7)
+        store.clear_seats()
+        store.seat(1, customer_id=8)
+        self.assertIsNone(store.release(table['table_id'], 1, customer_id=7))
+        self.assertEqual(table['used_seats'], 1)
+        self.assertIs(store.release(table['table_id'], 1, customer_id=8), table)
+
+        coalescer = FrameCoalescer()
+        coalescer.apply("TABLE_UPDATE", (1, 1, 1))
+        coalescer.apply("FLOOR_FIRE", (1, 2))
+        coalescer.take_changes()
+        coalescer.apply("FLOOR_OPEN", (1, 2))
+        changes, _ = coalescer.take_changes()
+        self.assertEqual(changes, [(1, ("TABLE_UPDATE", 1, 1))])
+
+    @staticmethod
+    def send(name, *args):
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                control.send_command(name, args, shards=1)
+                return
+            except OSError:
+                # manager otwiera fifo sterujące chwilę po SERVER_FIFO
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    @staticmethod
+    def request(server_fd, customer_id, group_size, msg_type=protocol.REQUEST_SEAT, table_id=0):
+        time.sleep(0.2) # polecenia idą osobnym fifo - niech manager je obsłuży przed prośbą
+        os.write(server_fd, protocol.encode_request(msg_type, group_size, customer_id, table_id, protocol.customer_fifo_path(customer_id)))
+
+    def test_commands_against_manager(self):
+        """
+        Test: ADD / CLOSE / REMOVE / OPEN przez fifo sterujące działającego managera
+        """
+        send = self.send
+        request = lambda *args, **kwargs: self.request(server_fd, *args, **kwargs)
+
+        commands, rest = control.decode_commands(control.encode_command("ADD", 4, 2) + b"NOPE 1\nREMOVE")
+        self.assertEqual((commands, rest), ([("ADD", (4, 2)), ("INVALID", ("NOPE 1",))], b"REMOVE"))
+
+        with harness.running_manager() as (server_fd,):
+            clients = harness.BenchClients(3)
+            try:
+                for table_id in range(1, 9):
+                    send("CLOSE", table_id)
+                send("ADD", 5)
+                request(0, 3)
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 9))
+
+                send("REMOVE", 9)
+                request(0, 3, protocol.CUSTOMER_DONE, 9)
+                send("OPEN", 5)
+                request(1, 3)
+                request(2, 3)
+                replies = dict(clients.replies(2))
+                self.assertEqual((replies[1][0], replies[1][3]), (protocol.SEATED, 5))
+                self.assertEqual(replies[2][0], protocol.REJECTED)
+            finally:
+                clients.close()
+
+    def test_reset_ignores_stale_done(self):
+        """
+        Test: CUSTOMER_DONE od grupy opróżnionej przez RESET nie zwalnia miejsc grupie posadzonej po RESET
+        """
+        with harness.running_manager() as (server_fd,):
+            clients = harness.BenchClients(3)
+            try:
+                self.request(server_fd, 0, 3)
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 5))
+
+                self.send("RESET")
+                self.request(server_fd, 1, 3)
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 5))
+
+                # klient 0 skończył jeść przy stoliku, który już zajmuje klient 1
+                self.request(server_fd, 0, 3, protocol.CUSTOMER_DONE, 5)
+                self.request(server_fd, 2, 3)
+                (_, reply), = clients.replies(1)
+                self.assertEqual((reply[0], reply[3]), (protocol.SEATED, 6))
+            finally:
+                clients.close()
+
+
+def spin(seconds: float):
+    # aktywne czekanie - tego profil ma szukać
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Uruchamianie: python -m unittest test.TestProfiling
+    """
+
+    def test_both_modes_and_merge(self):
+        old_cwd = os.getcwd()
+        os.chdir(tempfile.mkdtemp(prefix="pizzeria_profile_"))
+        try:
+            with mock.patch.dict(os.environ, {profiling.PROFILE_ENV: "sample"}):
+                profiling.profiled(spin)(0.3)
+            with mock.patch.dict(os.environ, {profiling.PROFILE_ENV: "cprofile"}):
+                profiling.profiled(spin)(0.1)
+            with mock.patch.dict(os.environ, {profiling.PROFILE_ENV: "gprof"}):
+                self.assertRaises(ValueError, profiling.profiled(spin), 0)
+
+            profiles = profiling.load_profiles()
+            self.assertEqual(len(profiles), 2)
+            sampled, = (profile for profile in profiles if profile['stacks'])
+            self.assertGreater(sampled['total'], 0.2)
+            merged = profiling.merge_profiles(profiles)
+            (name, _, _), = profiling.top(merged['own'], 1)
+            self.assertEqual(name, "test.py:spin")
+            self.assertTrue(profiling.top(merged['lines'], 1)[0][0].startswith("test.py:spin:"))
+
+            self.assertEqual(profiling.process_role("CustomerProcess-7-pid(123)"), "CustomerProcess")
+            self.assertEqual(profiling.process_role("Manager-1Process"), "ManagerProcess")
+        finally:
+            os.chdir(old_cwd)
+
+
 if __name__ == "__main__":
     # Uruchamianie testów
     unittest.main()
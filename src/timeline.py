@@ -0,0 +1,326 @@
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from config import TIMELINE_FILE, TIMELINE_MAX_BYTES, TIMELINE_BACKUPS
+
+"""
+Moduł timeline – przebieg symulacji w czasie, zapisywany na bieżąco (a nie tylko podsumowanie na końcu):
+- TimelineWriter: plik JSONL dopisywany linia po linii, z rotacją po przekroczeniu TIMELINE_MAX_BYTES
+  (plik -> plik.1 -> plik.2 ..., zostaje TIMELINE_BACKUPS starych plików); TimelineBuffer trzyma rekordy w pamięci
+- TimelineRecorder: manager zgłasza mu zdarzenia, a on co TIMELINE_INTERVAL sekund zapisuje jeden rekord
+  z tego odcinka czasu: przyjścia, przyjęte / odrzucone / odesłane grupy, zajętość i czas pobytu przy każdym
+  stoliku, wykorzystanie miejsc ważone czasem, czas zamknięcia i zdarzenia pożaru / otwarcia
+- read_timeline() + aggregate(): strumieniowe czytanie (również plików po rotacji) i sumowanie w stałej pamięci
+
+Uruchamianie: python timeline.py [pizzeria_timeline.jsonl] [--json]
+"""
+
+
+class TimelineWriter:
+    def __init__(self, path: str, max_bytes: int = TIMELINE_MAX_BYTES, backups: int = TIMELINE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = open(path, "a", encoding="utf-8")
+        self.size = self.file.tell()
+
+    def write(self, record: dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        size = len(line.encode("utf-8"))
+        if self.max_bytes and self.size and self.size + size > self.max_bytes:
+            self.rotate()
+        self.file.write(line)
+        # każdy rekord od razu trafia do pliku, więc awaria procesu nie zabiera wcześniejszych odcinków
+        self.file.flush()
+        self.size += size
+
+    def rotate(self):
+        self.file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+class TimelineBuffer:
+    """Zamiast pliku - rekordy zostają w pamięci (np. porównania w simulation.py)."""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record: dict):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class TimelineRecorder:
+    """
+    Zajętość stolików całkujemy w czasie: przy każdej zmianie used_seats dodajemy used_seats * czas od poprzedniej zmiany.
+    Czas pobytu: grupy przy jednym stoliku jedzą tyle samo, więc zwalniają miejsca w kolejności posadzenia.
+    writer = None - tylko liczenie, bez zapisu.
+    """
+
+    def __init__(self, writer, tables, group_sizes, interval: float, now: float):
+        self.writer = writer
+        self.interval = interval
+        self.group_sizes = list(group_sizes)
+        self.capacity = {t['table_id']: t['capacity'] for t in tables}
+        self.total_seats = sum(self.capacity.values())
+        self.used = {table_id: 0 for table_id in self.capacity}
+        self.changed_at = {table_id: now for table_id in self.capacity}
+        self.seated_at = {table_id: deque() for table_id in self.capacity}
+        self.closed_since = None
+        self.total_profit = 0
+        self._start_interval(now)
+
+    def _start_interval(self, now: float):
+        self.interval_start = now
+        self.arrivals = {size: 0 for size in self.group_sizes}
+        self.accepted = {size: 0 for size in self.group_sizes}
+        self.rejected = {size: 0 for size in self.group_sizes}
+        self.evacuated = 0
+        self.released = 0
+        self.fled = 0
+        self.profit = 0
+        self.seat_seconds = {table_id: 0.0 for table_id in self.capacity}
+        self.max_used = dict(self.used)
+        self.dwell_sum = {table_id: 0.0 for table_id in self.capacity}
+        self.dwell_count = {table_id: 0 for table_id in self.capacity}
+        self.closed_seconds = 0.0
+        self.events = []
+
+    def _set_used(self, table_id: int, used: int, now: float):
+        self.seat_seconds[table_id] += self.used[table_id] * (now - self.changed_at[table_id])
+        self.changed_at[table_id] = now
+        self.used[table_id] = used
+        if used > self.max_used[table_id]:
+            self.max_used[table_id] = used
+
+    # --- zmiany sali w trakcie działania (control.py) ---
+
+    def add_table(self, table: dict, now: float):
+        table_id = table['table_id']
+        self.capacity[table_id] = table['capacity']
+        self.total_seats += table['capacity']
+        self.used[table_id] = 0
+        self.changed_at[table_id] = now
+        self.seated_at[table_id] = deque()
+        self.seat_seconds[table_id] = 0.0
+        self.max_used[table_id] = 0
+        self.dwell_sum[table_id] = 0.0
+        self.dwell_count[table_id] = 0
+
+    def remove_table(self, table_id: int, now: float):
+        # zajętość usuniętego stolika do tej chwili przepada (odcinek liczy już tylko pozostałe stoliki)
+        self.total_seats -= self.capacity.pop(table_id, 0)
+        for values in (self.used, self.changed_at, self.seated_at, self.seat_seconds, self.max_used, self.dwell_sum, self.dwell_count):
+            values.pop(table_id, None)
+
+    def cleared(self, tables, now: float):
+        """Stoliki opróżnione poleceniem RESET (goście wychodzą bez CUSTOMER_DONE)."""
+        for table in tables:
+            table_id = table['table_id']
+            if table_id in self.capacity:
+                self.seated_at[table_id].clear()
+                self._set_used(table_id, 0, now)
+
+    # --- zdarzenia od managera ---
+
+    def arrival(self, group_size: int):
+        self.arrivals[group_size] = self.arrivals.get(group_size, 0) + 1
+
+    def seated(self, table: dict, group_size: int, profit: int, now: float):
+        table_id = table['table_id']
+        self.accepted[group_size] = self.accepted.get(group_size, 0) + 1
+        self.profit += profit
+        self.total_profit += profit
+        self._set_used(table_id, table['used_seats'], now)
+        self.seated_at[table_id].append(now)
+
+    def rejected_group(self, group_size: int):
+        self.rejected[group_size] = self.rejected.get(group_size, 0) + 1
+
+    def evacuated_group(self):
+        self.evacuated += 1
+
+    def released_group(self, table: dict, now: float):
+        table_id = table['table_id']
+        self.released += 1
+        if self.closed_since is not None or table_id not in self.capacity:
+            return # po pożarze stoliki i tak liczymy jako puste, aż do otwarcia
+        self._set_used(table_id, table['used_seats'], now)
+        if self.seated_at[table_id]:
+            self.dwell_sum[table_id] += now - self.seated_at[table_id].popleft()
+            self.dwell_count[table_id] += 1
+
+    def fire(self, now: float):
+        # wszyscy przy stolikach uciekają, pizzeria zamknięta
+        for table_id in self.capacity:
+            self.fled += len(self.seated_at[table_id])
+            self.seated_at[table_id].clear()
+            self._set_used(table_id, 0, now)
+        self.closed_since = now
+        self.events.append({'type': "fire", 't': now})
+
+    def reopen(self, now: float):
+        if self.closed_since is not None:
+            self.closed_seconds += now - max(self.closed_since, self.interval_start)
+            self.closed_since = None
+        self.events.append({'type': "reopen", 't': now})
+
+    # --- zapis ---
+
+    def maybe_write(self, now: float):
+        if now - self.interval_start >= self.interval:
+            self.write_interval(now)
+
+    def write_interval(self, now: float):
+        duration = now - self.interval_start
+        for table_id in self.capacity:
+            self._set_used(table_id, self.used[table_id], now)
+        closed = self.closed_seconds
+        if self.closed_since is not None:
+            closed += now - max(self.closed_since, self.interval_start)
+
+        tables = {}
+        for table_id, capacity in self.capacity.items():
+            tables[str(table_id)] = {
+                'capacity': capacity,
+                'occupancy': self.seat_seconds[table_id] / duration if duration > 0 else 0.0, # średnio zajętych miejsc
+                'max_used': self.max_used[table_id],
+                'dwell_sum': self.dwell_sum[table_id],
+                'dwell_count': self.dwell_count[table_id],
+            }
+        record = {
+            't': self.interval_start,
+            'duration': duration,
+            'arrivals': self.arrivals,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'evacuated': self.evacuated,
+            'released': self.released,
+            'fled': self.fled,
+            'profit': self.profit,
+            'total_profit': self.total_profit,
+            'utilisation': sum(self.seat_seconds.values()) / (self.total_seats * duration) if duration > 0 and self.total_seats else 0.0,
+            'closed_seconds': closed,
+            'events': self.events,
+            'tables': tables,
+        }
+        if self.writer is not None:
+            self.writer.write(record)
+        self._start_interval(now)
+
+    def close(self, now: float):
+        self.write_interval(now)
+        if self.writer is not None:
+            self.writer.close()
+
+
+def timeline_files(path: str) -> list:
+    # od najstarszego: plik.N, ..., plik.1, plik
+    backups = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        backups.append(f"{path}.{i}")
+        i += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_timeline(path: str):
+    """Generator rekordów ze wszystkich plików po kolei, linia po linii (uszkodzone linie są pomijane)."""
+    for name in timeline_files(path):
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue # np. urwana ostatnia linia po awarii
+
+
+def aggregate(records) -> dict:
+    """Sumuje dowolnie długi strumień rekordów; pamięć zależy tylko od liczby stolików i rozmiarów grup."""
+    result = {
+        'intervals': 0, 'start': None, 'end': None, 'duration': 0.0,
+        'arrivals': {}, 'accepted': {}, 'rejected': {},
+        'evacuated': 0, 'released': 0, 'fled': 0, 'profit': 0,
+        'fires': 0, 'closed_seconds': 0.0, 'utilisation': 0.0,
+        'tables': {},
+    }
+    weighted_utilisation = 0.0
+    for record in records:
+        result['intervals'] += 1
+        if result['start'] is None:
+            result['start'] = record['t']
+        result['end'] = record['t'] + record['duration']
+        result['duration'] += record['duration']
+        weighted_utilisation += record['utilisation'] * record['duration']
+        for key in ('arrivals', 'accepted', 'rejected'):
+            for size, count in record[key].items():
+                result[key][size] = result[key].get(size, 0) + count
+        for key in ('evacuated', 'released', 'fled', 'profit', 'closed_seconds'):
+            result[key] += record[key]
+        result['fires'] += sum(1 for event in record['events'] if event['type'] == "fire")
+        for table_id, t in record['tables'].items():
+            acc = result['tables'].setdefault(table_id, {
+                'capacity': t['capacity'], 'seat_seconds': 0.0, 'max_used': 0, 'dwell_sum': 0.0, 'dwell_count': 0,
+            })
+            acc['seat_seconds'] += t['occupancy'] * record['duration']
+            acc['max_used'] = max(acc['max_used'], t['max_used'])
+            acc['dwell_sum'] += t['dwell_sum']
+            acc['dwell_count'] += t['dwell_count']
+
+    if result['duration'] > 0:
+        result['utilisation'] = weighted_utilisation / result['duration']
+    for acc in result['tables'].values():
+        acc['occupancy'] = acc['seat_seconds'] / result['duration'] if result['duration'] > 0 else 0.0
+        acc['dwell_avg'] = acc['dwell_sum'] / acc['dwell_count'] if acc['dwell_count'] else 0.0
+    return result
+
+
+def print_summary(summary: dict):
+    print(f"[Timeline] Odcinków: {summary['intervals']}, czas: {summary['duration']:.1f} s, "
+          f"zamknięte: {summary['closed_seconds']:.1f} s, pożarów: {summary['fires']}")
+    print(f"[Timeline] Profit: {summary['profit']}, wykorzystanie miejsc: {summary['utilisation'] * 100:.1f}%")
+    print(f"[Timeline] Zwolnione={summary['released']}, odesłane przy pożarze={summary['evacuated']}, "
+          f"uciekły od stolika={summary['fled']}")
+    for size in sorted(summary['arrivals'], key=int):
+        print(f"  Grupa rozmiaru {size}: przyszła={summary['arrivals'][size]}, "
+              f"przyjęta={summary['accepted'].get(size, 0)}, odrzucona={summary['rejected'].get(size, 0)}")
+    for table_id in sorted(summary['tables'], key=int):
+        t = summary['tables'][table_id]
+        print(f"  Stolik {table_id} (pojemność {t['capacity']}): średnio zajętych {t['occupancy']:.2f}, "
+              f"maks. {t['max_used']}, średni pobyt {t['dwell_avg']:.2f} s ({t['dwell_count']} grup)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Podsumowanie przebiegu symulacji z pliku timeline")
+    parser.add_argument("path", nargs="?", default=TIMELINE_FILE)
+    parser.add_argument("--json", action="store_true", help="wynik jako JSON")
+    args = parser.parse_args()
+
+    if not args.path or not timeline_files(args.path):
+        print(f"[Timeline] Brak pliku {args.path}")
+        sys.exit(1)
+
+    summary = aggregate(read_timeline(args.path))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
@@ -0,0 +1,151 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from config import TIMER_EVENT_POLL
+
+"""
+Moduł timers – wspólne odliczanie czasu zamiast pętli kręcących się na time.time():
+- TimerHeap – kopiec terminów z anulowaniem (bez wątków, np. dla pętli z selectorem)
+- TimerScheduler – jeden wątek na proces, który budzi zarejestrowanych czekających
+  po upływie terminu albo gdy ustawi się któryś z obserwowanych eventów (pożar / zamknięcie)
+- get_scheduler() – scheduler bieżącego procesu (tworzony przy pierwszym użyciu)
+"""
+
+
+class TimerHeap:
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count() # kolejność dla równych terminów
+        self.active = 0
+
+    def __len__(self):
+        return self.active
+
+    def push(self, deadline: float, item):
+        # zwracamy wpis, który służy do anulowania
+        entry = [deadline, next(self.counter), item, True]
+        heapq.heappush(self.heap, entry)
+        self.active += 1
+        return entry
+
+    def cancel(self, entry):
+        if entry[3]:
+            entry[3] = False
+            self.active -= 1
+
+    def clear(self):
+        self.heap.clear()
+        self.active = 0
+
+    def next_deadline(self):
+        # anulowane wpisy wyrzucamy dopiero gdy dojdą na szczyt kopca
+        while self.heap and not self.heap[0][3]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_expired(self, now: float):
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if entry[3]:
+                entry[3] = False
+                self.active -= 1
+                expired.append(entry[2])
+        return expired
+
+
+class TimerScheduler:
+    def __init__(self, event_poll: float = TIMER_EVENT_POLL):
+        self.event_poll = event_poll
+        self.timers = TimerHeap()
+        self.watchers = [] # [eventy, callback] – callback gdy któryś event się ustawi
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="TimerScheduler", daemon=True)
+        self.thread.start()
+
+    def call_later(self, delay: float, callback):
+        with self.cond:
+            entry = self.timers.push(time.monotonic() + delay, callback)
+            self.cond.notify()
+        return entry
+
+    def cancel(self, entry):
+        with self.cond:
+            self.timers.cancel(entry)
+
+    def sleep(self, delay: float, interrupt_events=()) -> bool:
+        """
+        Czeka delay sekund albo do ustawienia któregoś z interrupt_events.
+        Zwraca True jeśli czas minął, False jeśli przerwał event.
+        """
+        if any(e.is_set() for e in interrupt_events):
+            return False
+
+        done = threading.Event()
+        result = []
+
+        def expired():
+            result.append(True)
+            done.set()
+
+        def interrupted():
+            result.append(False)
+            done.set()
+
+        entry = self.call_later(delay, expired)
+        watcher = [tuple(interrupt_events), interrupted]
+        if interrupt_events:
+            with self.cond:
+                self.watchers.append(watcher)
+                self.cond.notify()
+
+        done.wait()
+
+        with self.cond:
+            self.timers.cancel(entry)
+            if watcher in self.watchers:
+                self.watchers.remove(watcher)
+        return result[0]
+
+    def _run(self):
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                callbacks = self.timers.pop_expired(now)
+
+                for watcher in list(self.watchers):
+                    events, callback = watcher
+                    if any(e.is_set() for e in events):
+                        self.watchers.remove(watcher)
+                        callbacks.append(callback)
+
+                if not callbacks:
+                    # śpimy do najbliższego terminu; eventów międzyprocesowych nie da się
+                    # czekać razem z terminem, więc sprawdzamy je co event_poll
+                    timeout = None
+                    deadline = self.timers.next_deadline()
+                    if deadline is not None:
+                        timeout = max(0, deadline - now)
+                    if self.watchers:
+                        timeout = self.event_poll if timeout is None else min(timeout, self.event_poll)
+                    self.cond.wait(timeout)
+                    continue
+
+            for callback in callbacks:
+                callback()
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> TimerScheduler:
+    # po fork wątek schedulera nie istnieje w dziecku, więc tworzymy nowy per proces
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = TimerScheduler()
+            _scheduler_pid = os.getpid()
+        return _scheduler
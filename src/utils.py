@@ -1,15 +1,82 @@
-from multiprocessing import Queue
-import queue as queue_module
+import os
+import time
+import random
+from config import RANDOM_SEED
 
-# czyścimy żądania
-def flush_requests(queue: Queue):
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# czyścimy żądania przy pożarze: wszystko, co czeka w fifo managera, od razu i jedną paczką
+# decode - protocol.decode_requests; zwraca (wiadomości, niepełna końcówka jako nowy bufor)
+def flush_requests(fd: int, buffer: bytes, chunk_size: int, decode):
+    return decode(buffer + read_available(fd, chunk_size))
+
+# powtarzalne losowanie: przy RANDOM_SEED każdy proces (name) ma własny, zawsze taki sam strumień liczb
+def seed_random(name: str, seed=RANDOM_SEED):
+    if seed is not None:
+        random.seed(f"{seed}:{name}")
+
+# czytamy z nieblokującego deskryptora wszystko co jest dostępne
+def read_available(fd: int, chunk_size: int) -> bytes:
+    chunks = []
     while True:
         try:
-            msg_type, data = queue.get_nowait()
-        except queue_module.Empty:
+            data = os.read(fd, chunk_size)
+        except BlockingIOError:
+            break
+        if not data:
+            # EOF - nikt nie ma otwartego końca do zapisu
             break
-        if msg_type == "REQUEST_SEAT":
-            _, customer_id = data
-            # zmuszamy klientów do wyjścia
-            queue.put(("LEAVE", customer_id))
-        # jeśli "CUSTOMER_DONE", to ignorujemy no bo i tak wychodzą
+        chunks.append(data)
+        if len(data) < chunk_size:
+            break
+    return b"".join(chunks)
+
+# dzielimy bufor na pełne linie, niepełną końcówkę zostawiamy na następny odczyt
+def split_lines(buffer: bytes):
+    *lines, rest = buffer.split(b"\n")
+    return lines, rest
+
+# osobny plik dla każdego shardu managera: shard 0 używa samej ścieżki, pozostałe "nazwa-N.rozszerzenie"
+def shard_path(path: str, shard: int) -> str:
+    if shard == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{shard}{ext}"
+
+# procesy trzymające otwarte fifo wielu klientów podnoszą sobie limit deskryptorów
+def raise_fd_limit():
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+# statystyki na koniec symulacji (manager, a także symulacja bez procesów w simulation.py)
+def write_stats_log(path, start_time, end_time, total_profit, group_accepted, group_rejected, table_usage):
+    with open(path, "a", encoding="utf-8") as f:
+        simu_sec_count = end_time - start_time
+
+        f.write(f"\n=== Symulacja rozpoczęta o: {time.ctime(start_time)} ===\n")
+        f.write(f"=== Pizzeria zamknięta o {time.ctime(end_time)} ===\n")
+        f.write(f"=== Symulacja trwała: {simu_sec_count:.2f} sekund ===\n")
+
+        f.write("Całkowity profit: {}\n".format(total_profit))
+
+        f.write("\n--- Statystyki grup klientów ---\n")
+        for gsize in sorted(group_accepted.keys()):
+            acc = group_accepted[gsize]
+            rej = group_rejected[gsize]
+            f.write(f"  Grupa rozmiaru {gsize}: przyjęta={acc}, odrzucona={rej}\n")
+
+        f.write("\n--- Statystyki stolików ---\n")
+        for tsize in sorted(table_usage.keys()):
+            usage_count = table_usage[tsize]
+            f.write(f"  Stolik rozmiaru {tsize}: {usage_count} razy zajęty\n")
+
+        f.write("=======================================\n\n")
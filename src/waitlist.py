@@ -0,0 +1,118 @@
+from collections import deque
+from config import WAITLIST_MAX_PER_SIZE, WAITLIST_MAX_WAIT
+
+"""
+Moduł waitlist – ograniczona lista oczekujących zamiast natychmiastowego REJECTED:
+- osobna kolejka FIFO dla każdego rozmiaru grupy, najwyżej WAITLIST_MAX_PER_SIZE grup w kolejce
+- grupa czeka najwyżej WAITLIST_MAX_WAIT sekund, potem dostaje REJECTED
+- czekanie odbywa się przed zamówieniem: grupa płaci i dostaje pizzę dopiero gdy usiądzie,
+  więc nikt nie czeka z gorącą pizzą (zasada z README)
+- przy zwolnieniu miejsc pop_for(stolik) w stałym czasie (tyle kroków ile rozmiarów grup) wybiera
+  najdłużej czekającą grupę, która zmieści się przy tym stoliku
+- przy pożarze wszystkie czekające grupy są odsyłane (drain)
+
+Wpisy są dowolnymi obiektami (manager trzyma w nich customer_id i fifo, symulacja tylko czas przyjścia).
+"""
+
+
+class Waitlist:
+    def __init__(self, group_sizes, max_per_size: int = WAITLIST_MAX_PER_SIZE, max_wait: float = WAITLIST_MAX_WAIT):
+        self.max_per_size = max_per_size
+        self.max_wait = max_wait
+        self.queues = {size: deque() for size in sorted(group_sizes)} # rozmiar -> deque (czas dodania, wpis)
+        self.size = 0
+
+        # statystyki
+        self.added = 0
+        self.full = 0 # nie weszły, bo kolejka pełna
+        self.matched = 0
+        self.expired = 0
+        self.evacuated = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, group_size: int, item, now: float) -> bool:
+        """Dopisuje grupę na koniec kolejki. False - kolejka pełna (albo nie ma takiego rozmiaru)."""
+        queue = self.queues.get(group_size)
+        if queue is None or len(queue) >= self.max_per_size:
+            self.full += 1
+            return False
+        queue.append((now, item))
+        self.size += 1
+        self.added += 1
+        return True
+
+    def expire(self, now: float) -> list:
+        """Usuwa grupy czekające dłużej niż max_wait. Zwraca listę (group_size, wpis)."""
+        expired = []
+        if not self.size:
+            return expired
+        deadline = now - self.max_wait
+        for group_size, queue in self.queues.items():
+            # wszyscy czekają tyle samo, więc najstarsi są na początku kolejki
+            while queue and queue[0][0] <= deadline:
+                added_at, item = queue.popleft()
+                self._waited(self.max_wait) # czekała do terminu, reszta to opóźnienie sprawdzania
+                expired.append((group_size, item))
+        self.size -= len(expired)
+        self.expired += len(expired)
+        return expired
+
+    def pop_for(self, table: dict, now: float):
+        """
+        Najdłużej czekająca grupa, która zmieści się przy stoliku w jego obecnym stanie:
+        pusty stolik przyjmie każdą grupę do swojej pojemności, zajęty tylko grupę tej samej wielkości.
+        Zwraca (group_size, wpis, czas czekania) albo None.
+        """
+        if not self.size:
+            return None
+        capacity, used, seated_size = table['capacity'], table['used_seats'], table['group_size']
+        best = None
+        if used == 0:
+            for group_size, queue in self.queues.items():
+                if group_size > capacity:
+                    break
+                if queue and (best is None or queue[0][0] < self.queues[best][0][0]):
+                    best = group_size
+        elif capacity - used >= seated_size and self.queues.get(seated_size):
+            best = seated_size
+        if best is None:
+            return None
+
+        added_at, item = self.queues[best].popleft()
+        self.size -= 1
+        self.matched += 1
+        self._waited(now - added_at)
+        return best, item, now - added_at
+
+    def drain(self, now: float) -> list:
+        """Wszyscy czekający (np. przy pożarze). Zwraca listę (group_size, wpis)."""
+        drained = []
+        for group_size, queue in self.queues.items():
+            while queue:
+                added_at, item = queue.popleft()
+                self._waited(now - added_at)
+                drained.append((group_size, item))
+        self.size = 0
+        self.evacuated += len(drained)
+        return drained
+
+    def stats(self) -> dict:
+        waited = self.matched + self.expired + self.evacuated
+        return {
+            'added': self.added,
+            'full': self.full,
+            'matched': self.matched,
+            'expired': self.expired,
+            'evacuated': self.evacuated,
+            'wait_avg': self.wait_sum / waited if waited else 0.0,
+            'wait_max': self.wait_max,
+        }
+
+    def _waited(self, seconds: float):
+        self.wait_sum += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds